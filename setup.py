@@ -36,11 +36,15 @@ setup(name='python-systemd',
       package_dir={'systemd': 'systemd'},
       packages=packages,
       package_data={'systemd': data_files},
+      # systemd.aio looks up the running loop with asyncio.get_running_loop().
+      python_requires='>=3.7',
       classifiers=['Development Status :: 1 - Planning',
                    'Intended Audience :: Developers',
                    'License :: ',
 		   'Operating System :: POSIX :: Linux',
                    'Programming Language :: Python',
+                   'Programming Language :: Python :: 3',
+                   'Programming Language :: Python :: 3 :: Only',
                    'Topic :: Libraries :: Python Modules',]
       )
 
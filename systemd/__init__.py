@@ -1,14 +1,24 @@
-from .automount import Automount
-from .device import Device
-from .job import Job
-from .manager import Manager
-from .path import Path
-from .service import Service
-from .socket import Socket
-from .swap import Swap
-from .target import Target
-from .timer import Timer
-from .unit import Unit
+import importlib
+
+
+# Submodules are imported when one of their classes is first used, so that `import systemd` (ie: by setup.py, or by
+# a short-lived process needing one class) does not pay for importing all of them.
+_LAZY_ATTRIBUTES = {
+    'Automount': 'automount',
+    'Device': 'device',
+    'Job': 'job',
+    'Manager': 'manager',
+    'Path': 'path',
+    'Scope': 'scope',
+    'Service': 'service',
+    'Slice': 'slice',
+    'Snapshot': 'snapshot',
+    'Socket': 'socket',
+    'Swap': 'swap',
+    'Target': 'target',
+    'Timer': 'timer',
+    'Unit': 'unit',
+}
 
 
 VERSION = (0, 1, 0, 'planning', 0)
@@ -27,5 +37,19 @@ def get_version():
 
 __all__ = (
     'VERSION', 'get_version',
-    'Automount', 'Device', 'Job', 'Manager', 'Path', 'Service', 'Socket', 'Swap', 'Target', 'Timer', 'Unit',
+    'Automount', 'Device', 'Job', 'Manager', 'Path', 'Scope', 'Service', 'Slice', 'Snapshot', 'Socket', 'Swap',
+    'Target', 'Timer', 'Unit',
 )
+
+
+def __getattr__(name):
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    value = getattr(importlib.import_module('.' + module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
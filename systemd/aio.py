@@ -0,0 +1,351 @@
+"""asyncio counterparts of Manager, Unit and Job.
+
+Every method is a coroutine: the D-Bus call is sent right away with a reply handler and the caller awaits its
+reply, so any number of calls can be in flight without blocking the event loop or tying up a thread each.  Replies
+are dispatched by the GLib main loop, which is run in a background thread (see systemd.mainloop).
+
+    >>> manager = AsyncManager()
+    >>> job = await manager.start_unit('crond.service', 'replace')
+    >>> async for unit in manager.iter_units():
+    ...     properties = await unit.get_properties()
+"""
+
+import asyncio
+import collections
+import functools
+
+import dbus.exceptions
+
+from . import mainloop
+from .bus import registry, SYSTEMD_OBJECT_PATH, PROPERTIES_INTERFACE, MANAGER_INTERFACE
+from .decode import decoder
+from .events import EventStream
+from .exceptions import SystemdError
+from .job import JobRecord, JOB_INTERFACE, JOB_RESULT_UNKNOWN, _GONE_ERRORS, _GONE_GRACE, tracker as job_tracker
+from .property import CompactProperty, property_table
+from .unit import UnitRecord, UNIT_INTERFACE
+
+
+def _set_result(future, result):
+    if not future.done():
+        future.set_result(result)
+
+
+def _set_exception(future, exception):
+    if not future.done():
+        future.set_exception(exception)
+
+
+def call_async(loop, interface, method, *args):
+    """Call method on interface with a reply handler and return an asyncio future for its reply.
+
+    A reply with one value resolves to that value, a reply with none to None and a longer one to a tuple.
+    D-Bus errors are raised as SystemdError.
+    """
+    future = loop.create_future()
+
+    def reply_handler(*result):
+        if not result:
+            value = None
+        elif len(result) == 1:
+            value = result[0]
+        else:
+            value = result
+        loop.call_soon_threadsafe(_set_result, future, value)
+
+    def error_handler(error):
+        if isinstance(error, dbus.exceptions.DBusException):
+            error = SystemdError(error)
+        loop.call_soon_threadsafe(_set_exception, future, error)
+
+    interface.get_dbus_method(method)(*args, reply_handler=reply_handler, error_handler=error_handler)
+    return future
+
+
+async def wait_jobs(loop, job_paths, timeout=None):
+    """asyncio counterpart of L{systemd.job.JobTracker.wait}."""
+    if not job_tracker.started():
+        await call_async(loop, registry.get_interface(SYSTEMD_OBJECT_PATH, MANAGER_INTERFACE), 'Subscribe')
+        job_tracker.start(subscribed=True)
+    futures = collections.OrderedDict((str(path), loop.create_future()) for path in job_paths)
+    callbacks = {}
+    for path, future in futures.items():
+        callbacks[path] = functools.partial(loop.call_soon_threadsafe, _set_result, future)
+        job_tracker.add_callback(path, callbacks[path])
+    try:
+        # Jobs that finished before the tracker started listening will never see their JobRemoved signal.
+        pending = [path for path, future in futures.items() if not future.done()]
+        checks = await asyncio.gather(
+            *[call_async(loop, registry.get_interface(path, PROPERTIES_INTERFACE), 'Get', JOB_INTERFACE, 'State')
+              for path in pending], return_exceptions=True)
+        gone = []
+        for path, check in zip(pending, checks):
+            if not isinstance(check, Exception):
+                continue
+            if getattr(check, 'dbus_name', None) not in _GONE_ERRORS:
+                raise check
+            gone.append(path)
+        if gone:
+            await asyncio.wait([futures[path] for path in gone], timeout=_GONE_GRACE)
+            for path in gone:
+                if not futures[path].done():
+                    job_tracker._resolve(path, JOB_RESULT_UNKNOWN)
+                    _set_result(futures[path], JOB_RESULT_UNKNOWN)
+
+        if futures:
+            await asyncio.wait(list(futures.values()), timeout=timeout)
+    finally:
+        # The tracker forgets the callbacks of the jobs it saw finish, but not of those still running (or if the
+        # wait was cancelled).
+        for path, future in futures.items():
+            job_tracker.remove_callback(path, callbacks[path])
+            future.cancel()
+    return collections.OrderedDict(
+        (path, future.result() if future.done() and not future.cancelled() else None)
+        for path, future in futures.items())
+
+
+class AsyncDbusObject(object):
+    """Base class of the asyncio objects; like systemd.base.SystemdDbusObject, without any property cache."""
+
+    # Must be set by subclass; e.g. 'org.freedesktop.systemd1.*'
+    __dbus_interace__ = None
+
+    def __init__(self, obj_path, loop=None, semaphore=None):
+        mainloop.start_thread()
+        self._path = str(obj_path)
+        self._loop = loop
+        self._semaphore = semaphore
+
+    def _get_loop(self):
+        # Looked up at each call rather than at construction, when there may be no running loop yet, or another one.
+        return self._loop or asyncio.get_running_loop()
+
+    @property
+    def _interface(self):
+        return registry.get_interface(self._path, self.__dbus_interace__)
+
+    @property
+    def _properties_interface(self):
+        return registry.get_interface(self._path, PROPERTIES_INTERFACE)
+
+    async def _call(self, method, *args, **kwargs):
+        interface = kwargs.pop('interface', None) or self._interface
+        if self._semaphore is None:
+            return await call_async(self._get_loop(), interface, method, *args)
+        async with self._semaphore:
+            return await call_async(self._get_loop(), interface, method, *args)
+
+    async def get_properties(self):
+        """Fetch every property with one GetAll.
+
+        @rtype: systemd.property.CompactProperty
+        """
+        properties = await self._call('GetAll', self.__dbus_interace__, interface=self._properties_interface)
+        return CompactProperty(
+            property_table(self.__dbus_interace__), decoder.decode_all(self.__dbus_interace__, properties))
+
+    async def get_property(self, name):
+        value = await self._call('Get', self.__dbus_interace__, name, interface=self._properties_interface)
+        return decoder.decode(self.__dbus_interace__, name, value)
+
+    def __repr__(self):
+        return '<%s %s>' % (self.__class__.__name__, self._path)
+
+
+class AsyncJob(AsyncDbusObject):
+    """asyncio counterpart of L{systemd.job.Job}."""
+
+    __dbus_interace__ = JOB_INTERFACE
+
+    async def cancel(self):
+        await self._call('Cancel')
+
+    async def wait(self, timeout=None):
+        """Wait for the job to finish, from its JobRemoved signal; see L{systemd.job.Job.wait}."""
+        return (await wait_jobs(self._get_loop(), [self._path], timeout))[self._path]
+
+
+class AsyncUnit(AsyncDbusObject):
+    """asyncio counterpart of L{systemd.unit.Unit}."""
+
+    __dbus_interace__ = UNIT_INTERFACE
+
+    def _job(self, job_path):
+        return AsyncJob(job_path, loop=self._loop, semaphore=self._semaphore)
+
+    async def start(self, mode):
+        return self._job(await self._call('Start', mode))
+
+    async def stop(self, mode):
+        return self._job(await self._call('Stop', mode))
+
+    async def reload(self, mode):
+        return self._job(await self._call('Reload', mode))
+
+    async def restart(self, mode):
+        return self._job(await self._call('Restart', mode))
+
+    async def try_restart(self, mode):
+        return self._job(await self._call('TryRestart', mode))
+
+    async def reload_or_restart(self, mode):
+        return self._job(await self._call('ReloadOrRestart', mode))
+
+    async def reload_or_try_restart(self, mode):
+        return self._job(await self._call('ReloadOrTryRestart', mode))
+
+    async def reset_failed(self):
+        await self._call('ResetFailed')
+
+
+class AsyncManager(AsyncDbusObject):
+    """asyncio counterpart of L{systemd.manager.Manager}.
+
+    @param loop: The asyncio event loop; by default, the one running when each call is made.
+    @param max_in_flight: If set, at most this many calls made through this manager (and the units and jobs it
+    returns) are awaiting a reply at any time.
+    """
+
+    __dbus_interace__ = MANAGER_INTERFACE
+
+    def __init__(self, loop=None, max_in_flight=None):
+        semaphore = asyncio.Semaphore(max_in_flight) if max_in_flight else None
+        super(AsyncManager, self).__init__(SYSTEMD_OBJECT_PATH, loop=loop, semaphore=semaphore)
+
+    def _unit(self, unit_path):
+        return AsyncUnit(unit_path, loop=self._loop, semaphore=self._semaphore)
+
+    def _job(self, job_path):
+        return AsyncJob(job_path, loop=self._loop, semaphore=self._semaphore)
+
+    async def subscribe(self):
+        """Subscribe to the signals of systemd and start tracking job results (see wait_jobs())."""
+        await self._call('Subscribe')
+        job_tracker.start(subscribed=True)
+
+    async def wait_jobs(self, jobs, timeout=None):
+        """Wait for the given jobs to finish; see L{systemd.manager.Manager.wait_jobs}.
+
+        @rtype: An ordered dict of each L{AsyncJob} to its result.
+        """
+        jobs = [job for job in jobs if job is not None]
+        results = await wait_jobs(self._get_loop(), [job._path for job in jobs], timeout)
+        return collections.OrderedDict((job, results[job._path]) for job in jobs)
+
+    def events(self, members=None, maxsize=4096, overflow='drop_oldest', coalesce=None):
+        """Return a stream of events for `async for` (after subscribe()); see L{systemd.manager.Manager.events}.
+
+        @rtype: L{systemd.events.EventStream}
+        """
+        return EventStream(members=members, maxsize=maxsize, overflow=overflow, coalesce=coalesce)
+
+    async def unsubscribe(self):
+        await self._call('Unsubscribe')
+
+    async def get_unit(self, name):
+        """@rtype: L{AsyncUnit}"""
+        return self._unit(await self._call('GetUnit', name))
+
+    async def get_unit_by_pid(self, pid):
+        """@rtype: L{AsyncUnit}"""
+        return self._unit(await self._call('GetUnitByPID', pid))
+
+    async def load_unit(self, name):
+        """@rtype: L{AsyncUnit}"""
+        return self._unit(await self._call('LoadUnit', name))
+
+    async def get_job(self, ID):
+        """@rtype: L{AsyncJob}"""
+        return self._job(await self._call('GetJob', ID))
+
+    async def start_unit(self, name, mode):
+        """@rtype: L{AsyncJob}"""
+        return self._job(await self._call('StartUnit', name, mode))
+
+    async def start_unit_replace(self, old_unit, new_unit, mode):
+        return self._job(await self._call('StartUnitReplace', old_unit, new_unit, mode))
+
+    async def stop_unit(self, name, mode):
+        return self._job(await self._call('StopUnit', name, mode))
+
+    async def reload_unit(self, name, mode):
+        return self._job(await self._call('ReloadUnit', name, mode))
+
+    async def restart_unit(self, name, mode):
+        return self._job(await self._call('RestartUnit', name, mode))
+
+    async def try_restart_unit(self, name, mode):
+        return self._job(await self._call('TryRestartUnit', name, mode))
+
+    async def reload_or_restart_unit(self, name, mode):
+        return self._job(await self._call('ReloadOrRestartUnit', name, mode))
+
+    async def reload_or_try_restart_unit(self, name, mode):
+        return self._job(await self._call('ReloadOrTryRestartUnit', name, mode))
+
+    async def kill_unit(self, name, who, signal):
+        await self._call('KillUnit', name, who, signal)
+
+    async def reset_failed_unit(self, name):
+        await self._call('ResetFailedUnit', name)
+
+    async def reset_failed(self):
+        await self._call('ResetFailed')
+
+    async def clear_jobs(self):
+        await self._call('ClearJobs')
+
+    async def reload(self):
+        await self._call('Reload')
+
+    async def reexecute(self):
+        await self._call('Reexecute')
+
+    async def list_units(self, records=False):
+        """List all units, inactive units too, with a single ListUnits call.
+
+        @rtype: A list of L{AsyncUnit}, or of L{systemd.unit.UnitRecord} if records is True.
+        """
+        units = await self._call('ListUnits')
+        if records:
+            return [UnitRecord.from_dbus(unit) for unit in units]
+        return [self._unit(unit[6]) for unit in units]
+
+    async def iter_units(self, records=False):
+        """Asynchronous iterator over all units; see list_units()."""
+        for unit in await self.list_units(records=records):
+            yield unit
+
+    async def list_jobs(self, records=False):
+        """@rtype: A list of L{AsyncJob}, or of L{systemd.job.JobRecord} if records is True."""
+        jobs = await self._call('ListJobs')
+        if records:
+            return [JobRecord.from_dbus(job) for job in jobs]
+        return [self._job(job[4]) for job in jobs]
+
+    async def iter_jobs(self, records=False):
+        """Asynchronous iterator over all jobs; see list_jobs()."""
+        for job in await self.list_jobs(records=records):
+            yield job
+
+    async def list_unit_files(self):
+        return await self._call('ListUnitFiles')
+
+    async def get_unit_file_state(self, file_):
+        return await self._call('GetUnitFileState', file_)
+
+    async def enable_unit_files(self, files, runtime=False, force=False):
+        return await self._call('EnableUnitFiles', files, runtime, force)
+
+    async def disable_unit_files(self, files, runtime=False):
+        return await self._call('DisableUnitFiles', files, runtime)
+
+    async def reenable_unit_files(self, files, runtime=False, force=False):
+        return await self._call('ReenableUnitFiles', files, runtime, force)
+
+    async def get_default_target(self):
+        return await self._call('GetDefaultTarget')
+
+    async def set_default_target(self, name, force=False):
+        return await self._call('SetDefaultTarget', name, force)
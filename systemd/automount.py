@@ -1,7 +1,7 @@
-from .base import SystemdDbusObject
+from .unit import Unit
 
 
-class Automount(SystemdDbusObject):
+class Automount(Unit):
     """Abstraction class to org.freedesktop.systemd1.Automount interface"""
 
     __dbus_interace__ = 'org.freedesktop.systemd1.Automount'
@@ -1,9 +1,27 @@
+import collections
+
 import dbus
-import dbus.mainloop.glib
-dbus.mainloop.glib.DBusGMainLoop(set_as_default=True)
 
-from systemd.property import Property
+from systemd.property import LazyProperty, CompactProperty, property_table
 from systemd.exceptions import SystemdError
+from systemd.bus import registry, PROPERTIES_INTERFACE
+from systemd.decode import decoder
+from systemd.signals import dispatcher
+
+
+# Errors meaning that an interface (or property) is not there, rather than that the call failed.
+_MISSING_ERRORS = (
+    'org.freedesktop.DBus.Error.UnknownInterface',
+    'org.freedesktop.DBus.Error.UnknownProperty',
+    'org.freedesktop.DBus.Error.InvalidArgs',
+)
+
+
+def _discard(properties, name):
+    try:
+        delattr(properties, name)
+    except AttributeError:
+        pass
 
 
 class SystemdDbusObject(object):
@@ -11,38 +29,149 @@ class SystemdDbusObject(object):
     # Must be set by subclass; e.g. 'org.freedesktop.systemd1.*'
     __dbus_interace__ = None
 
-    _on_properties_changed_match = None
+    # Interfaces whose properties are merged into self.properties, most specific first; (__dbus_interace__,) if
+    # None.  With more than one, all of them are fetched with a single GetAll('').
+    __dbus_property_interfaces__ = None
+
+    _watching = False
+
+    # Shared by every object: how PropertiesChanged signals were applied.
+    property_stats = collections.Counter()
     
-    def __init__(self, obj_path, watch=True):
+    def __init__(self, obj_path, watch=True, lazy=False):
+        """
+        @param obj_path: D-Bus object path of the object.
+        @param watch: If True, properties are kept up to date by listening to PropertiesChanged signals.
+        @param lazy: If False, every property is fetched with GetAll now.  If True (or 'all'), nothing is fetched
+        until `properties` is first read, and then all of them are fetched at once.  If 'each', each property is
+        fetched with Get the first time it is read.
+        """
         
-        self._bus = dbus.SystemBus()
-        self._proxy = self._bus.get_object('org.freedesktop.systemd1', obj_path)
-        self._interface = dbus.Interface(self._proxy, self.__dbus_interace__)
-        self._properties_interface = dbus.Interface(self._proxy, 'org.freedesktop.DBus.Properties')
+        self._path = obj_path
         
         if watch:
-            # @KK: How do we clean this up?  This becomes a call to self._bus.add_signal_receiver(); it returns an
-            # instance of 'dbus.connection.SignalMatch'.  BusConnection seems to do the bookkeeping for a "watch" based
-            # on each match, and calls watch.cancel() in _clean_up_signal_match().  That is called only from
-            # Connection.remove_signal_receiver(), and that is called only from SignalMatch.remove().
-            self._on_properties_changed_match = self._properties_interface.connect_to_signal('PropertiesChanged', self._on_properties_changed)
+            self.watch()
             
-        self._load_properties()
+        if lazy == 'each':
+            self.properties = LazyProperty(self._get_property)
+        elif not lazy:
+            self._load_properties()
+
+    def __getattr__(self, name):
+        # Only reached while 'properties' has not been loaded yet, ie: for lazy objects.
+        if name == 'properties':
+            self._load_properties()
+            return self.properties
+        raise AttributeError(name)
+
+    # The connection and proxies are shared by every object and looked up in the registry on use; see systemd.bus.
+    @property
+    def _bus(self):
+        return registry.get_connection()
+
+    @property
+    def _proxy(self):
+        return registry.get_proxy(self._path)
+
+    @property
+    def _interface(self):
+        return registry.get_interface(self._path, self.__dbus_interace__)
+
+    @property
+    def _property_interfaces(self):
+        return self.__dbus_property_interfaces__ or (self.__dbus_interace__,)
+
+    @property
+    def _properties_interface(self):
+        return registry.get_interface(self._path, PROPERTIES_INTERFACE)
 
     def __del__(self):
         self._cleanup()
 
+    def watch(self):
+        """Keep self.properties up to date with the PropertiesChanged signals of this object.
+
+        No match rule is added on the bus: signals are routed to the object by systemd.signals.dispatcher.
+        """
+        dispatcher.watch(self)
+        self._watching = True
+
+    def unwatch(self):
+        if self._watching:
+            dispatcher.unwatch(self)
+            self._watching = False
+
     def _cleanup(self):
-        if self._on_properties_changed_match is not None:
-            self._on_properties_changed_match.remove()
-            self._on_properties_changed_match = None
+        self.unwatch()
         
-    def _on_properties_changed(self, *args, **kargs):
-        self._load_properties()
+    def _mark_stale(self):
+        """Forget the loaded properties, which may have missed changes; they are fetched again when next read."""
+        properties = self.__dict__.get('properties')
+        if properties is None:
+            return
+        if isinstance(properties, LazyProperty):
+            self.properties = LazyProperty(self._get_property)
+        else:
+            del self.properties
+        self.property_stats['marked_stale'] += 1
+
+    def _on_properties_changed(self, interface, changed, invalidated):
+        """Merge a PropertiesChanged signal into self.properties.
+
+        Changed values are applied in place; only the properties listed as invalidated (ie: whose new value systemd
+        did not send) are fetched again, one Get each.
+        """
+        if interface not in self._property_interfaces:
+            return
+        properties = self.__dict__.get('properties')
+        if properties is None:
+            # Not loaded yet (lazy); the first read will fetch current values anyway.
+            return
+        for key, value in decoder.decode_all(interface, changed).items():
+            setattr(properties, key, value)
+        for key in invalidated:
+            if isinstance(properties, LazyProperty):
+                _discard(properties, key)
+                continue
+            self.property_stats['fallback_fetches'] += 1
+            try:
+                # From the interface of the signal, not each one merged in turn until it is found.
+                setattr(properties, key, self._get_property(key, (interface,)))
+            except AttributeError:
+                _discard(properties, key)
+        self.property_stats['deltas_applied'] += 1
 
     def _load_properties(self):
-        properties = self._properties_interface.GetAll(self._interface.dbus_interface)
-        attr_property = Property()
-        for key, value in properties.items():
-            setattr(attr_property, key, value)
-        setattr(self, 'properties', attr_property)
+        interfaces = self._property_interfaces
+        if len(interfaces) == 1:
+            properties = self._properties_interface.GetAll(interfaces[0])
+        else:
+            properties = self._get_all_merged(interfaces)
+        # Objects merging the same interfaces share a table; with one interface it is keyed by its name.
+        setattr(self, 'properties', CompactProperty(
+            property_table(','.join(interfaces)), decoder.decode_all(self.__dbus_interace__, properties)))
+
+    def _get_all_merged(self, interfaces):
+        """Return the properties of all of interfaces, the first one winning on a name clash."""
+        try:
+            # An empty interface name asks for the properties of every interface of the object at once.
+            return self._properties_interface.GetAll('')
+        except dbus.exceptions.DBusException as error:
+            if error.get_dbus_name() not in _MISSING_ERRORS:
+                raise
+        self.property_stats['merged_fallbacks'] += 1
+        properties = {}
+        for interface in reversed(interfaces):
+            properties.update(self._properties_interface.GetAll(interface))
+        return properties
+
+    def _get_property(self, name, interfaces=None):
+        for interface in interfaces or self._property_interfaces:
+            try:
+                value = self._properties_interface.Get(interface, name)
+            except dbus.exceptions.DBusException as error:
+                if error.get_dbus_name() in _MISSING_ERRORS:
+                    continue
+                raise
+            return decoder.decode(self.__dbus_interace__, name, value)
+        raise AttributeError(name)
@@ -0,0 +1,281 @@
+import collections
+import threading
+
+import dbus
+import dbus.bus
+import dbus.connection
+import dbus.exceptions
+
+from . import mainloop
+from .schema import SchemaInterface
+
+
+SYSTEMD_BUS_NAME = 'org.freedesktop.systemd1'
+SYSTEMD_OBJECT_PATH = '/org/freedesktop/systemd1'
+PROPERTIES_INTERFACE = 'org.freedesktop.DBus.Properties'
+MANAGER_INTERFACE = 'org.freedesktop.systemd1.Manager'
+
+# The socket on which systemd (PID 1) accepts peer-to-peer D-Bus connections from root, without a bus daemon.
+SYSTEMD_PRIVATE_ADDRESS = 'unix:path=/run/systemd/private'
+
+CONNECTION_MODES = ('bus', 'private', 'auto')
+
+# Errors connecting to the private socket that no retry will get past (ie: not root); the 'auto' mode then stays on
+# the bus until configure() is called again.
+_PRIVATE_DENIED_ERRORS = (
+    'org.freedesktop.DBus.Error.AccessDenied',
+    'org.freedesktop.DBus.Error.AuthFailed',
+)
+
+# Enough to keep every unit of a large host resident without letting the cache grow without limit.
+DEFAULT_MAX_PROXIES = 8192
+
+
+class BusRegistry(object):
+    """Process-wide registry of the connection to systemd and of the proxies built on it.
+
+    Every SystemdDbusObject asks the registry for its proxy and interfaces instead of building its own, so walking
+    thousands of units costs one connection lookup and at most one proxy construction per object path.  Proxies are
+    kept in a bounded LRU cache; the number of hits, misses and evictions is counted in `stats`.
+
+    Proxies are built without introspection and bound to the unique name of systemd, which is looked up once per
+    connection, so building one costs no round trip at all; method signatures come from systemd.schema instead.
+
+    In the 'private' and 'auto' modes (see configure()), the connection is made straight to the private socket of
+    systemd instead of through the bus daemon, which saves a hop and a policy check on every call.  Such a
+    peer-to-peer connection (`peer` is then True) has no bus names: messages carry no destination and signals no
+    sender.
+    """
+
+    def __init__(self, max_proxies=DEFAULT_MAX_PROXIES):
+        self.max_proxies = max_proxies
+        self.stats = collections.Counter()
+        self._address = None
+        self._mode = 'bus'
+        self._private_address = SYSTEMD_PRIVATE_ADDRESS
+        self._peer = False
+        # Set in the 'auto' mode once the private socket refused us for good, see _PRIVATE_DENIED_ERRORS.
+        self._private_denied = False
+        self._connection = None
+        self._connection_main_loop = False
+        self._owner = None
+        # Connections whose disconnection the main loop has yet to finish dispatching; see _on_disconnected().
+        self._disconnecting = set()
+        self._replaced_callbacks = []
+        self._entries = collections.OrderedDict()
+        self._lock = threading.RLock()
+
+    def configure(self, address=None, max_proxies=None, mode='bus', private_address=SYSTEMD_PRIVATE_ADDRESS):
+        """Change the connection parameters; cached proxies are dropped.
+
+        @param address: D-Bus address of the bus to use instead of the system bus (ie: for tests).
+        @param max_proxies: Maximum number of object paths kept in the proxy cache.
+        @param mode: 'bus' to go through the bus; 'private' to connect straight to private_address, which only root
+        may do; 'auto' to try private_address first and fall back to the bus if it cannot be connected to.  Both of
+        the latter attach the connection to the main loop from the start (see systemd.mainloop), so need GLib.  Unless
+        access to it was denied, 'auto' tries the private socket again on the next connection and whenever systemd
+        gets a new owner (ie: after daemon-reexec).
+        @param private_address: D-Bus address of the private socket of systemd.
+
+        The callbacks given to call_on_replaced() are called once the connection is closed.
+        """
+        if mode not in CONNECTION_MODES:
+            raise ValueError('mode must be one of %s' % ', '.join(CONNECTION_MODES))
+        with self._lock:
+            self._address = address
+            self._mode = mode
+            self._private_address = private_address
+            self._private_denied = False
+            if max_proxies is not None:
+                self.max_proxies = max_proxies
+            self._close()
+            callbacks = list(self._replaced_callbacks)
+        for callback in callbacks:
+            callback()
+
+    def call_on_replaced(self, callback):
+        """Call callback() whenever configure() closes the connection, or the 'auto' mode moves it from the bus to the
+        private socket, so that what was attached to it (ie: the match rules of systemd.signals.dispatcher) can move to
+        the next one."""
+        with self._lock:
+            self._replaced_callbacks.append(callback)
+
+    def _close(self):
+        # Closed rather than left to the garbage collector: a peer-to-peer connection is one that systemd serves
+        # until it is closed.
+        if self._connection is not None:
+            if self._connection_main_loop:
+                self._disconnecting.add(self._connection)
+            self._connection.close()
+        self._connection = None
+        self._owner = None
+        self._entries.clear()
+
+    def get_connection(self):
+        """Return the connection, made on first use.
+
+        A connection made before systemd.mainloop.enable() cannot dispatch signals, so it is closed and replaced
+        (along with the cached proxies) by one attached to the main loop once that is enabled.  A connection that was
+        lost is replaced the same way.
+        """
+        with self._lock:
+            if self._connection is not None and mainloop.enabled() and not self._connection_main_loop:
+                self.stats['main_loop_reconnects'] += 1
+                self._close()
+            if self._connection is not None and not self._connection.get_is_connected():
+                self.connection_lost(self._connection)
+            if self._connection is None:
+                # A connection of our own rather than the shared dbus.SystemBus(), which might have been made
+                # without a main loop by somebody else.
+                self._use(self._connect())
+            return self._connection
+
+    def _use(self, connection):
+        self._connection = connection
+        self._connection_main_loop = mainloop.enabled()
+        # libdbus would otherwise exit the process when the bus goes away; see connection_lost().
+        self._connection.set_exit_on_disconnect(False)
+        if self._connection_main_loop:
+            self._connection.call_on_disconnection(self._on_disconnected)
+
+    def _connect(self):
+        if self._mode != 'bus' and not self._private_denied:
+            # Attached to the main loop from the start, so that it is never replaced by another one.
+            mainloop.enable()
+            connection = self._connect_private()
+            if connection is not None:
+                return connection
+        self._peer = False
+        return dbus.bus.BusConnection(dbus.bus.BusConnection.TYPE_SYSTEM if self._address is None else self._address)
+
+    def _connect_private(self):
+        """Return a connection to the private socket, or None to fall back to the bus in the 'auto' mode."""
+        try:
+            connection = dbus.connection.Connection(self._private_address)
+        except dbus.exceptions.DBusException as error:
+            if self._mode == 'private':
+                raise
+            if error.get_dbus_name() in _PRIVATE_DENIED_ERRORS:
+                self._private_denied = True
+                self.stats['private_denied'] += 1
+            else:
+                # ie: systemd is re-executing; tried again later, see _retry_private().
+                self.stats['private_fallbacks'] += 1
+            return None
+        self._peer = True
+        self.stats['private_connections'] += 1
+        return connection
+
+    def _retry_private(self):
+        # Moves a connection that fell back to the bus over to the private socket, if that can be connected to now.
+        with self._lock:
+            if self._mode != 'auto' or self._private_denied or self._peer or self._connection is None:
+                return
+            connection = self._connect_private()
+            if connection is None:
+                return
+            self.stats['private_retries'] += 1
+            self._close()
+            self._use(connection)
+            callbacks = list(self._replaced_callbacks)
+        for callback in callbacks:
+            callback()
+
+    @property
+    def peer(self):
+        """True if the connection is a peer-to-peer one to the private socket of systemd."""
+        with self._lock:
+            self.get_connection()
+            return self._peer
+
+    def _on_disconnected(self, connection):
+        # Kept until the main loop is done dispatching the disconnection: dbus-python fails the handlers still to be
+        # called for it (and the next replies and signals it dispatches) if the last reference to the connection
+        # goes away meanwhile, ie: once the signal dispatcher has forgotten it.
+        with self._lock:
+            self._disconnecting.add(connection)
+        mainloop.call_later(0, self._release, connection)
+
+    def _release(self, connection):
+        with self._lock:
+            self._disconnecting.discard(connection)
+
+    def connection_lost(self, connection):
+        """Forget connection, which was disconnected, along with its proxies; the next use makes a new one."""
+        with self._lock:
+            if connection is self._connection:
+                self.stats['connections_lost'] += 1
+                self._connection = None
+                self._owner = None
+                self._entries.clear()
+
+    def owner_changed(self, owner):
+        """Forget the proxies bound to the previous owner of org.freedesktop.systemd1 (ie: after daemon-reexec).
+
+        @param owner: The new unique name, or '' if systemd left the bus.
+        """
+        with self._lock:
+            self._owner = str(owner) or None
+            self._entries.clear()
+            self.stats['owner_changes'] += 1
+            retry = self._owner is not None and self._mode == 'auto' and not self._peer
+        if retry:
+            # Not from within the handler of the signal: moving to another connection removes its match rules.
+            mainloop.call_later(0, self._retry_private)
+
+    def get_owner(self):
+        """Return the unique bus name currently owning org.freedesktop.systemd1, or None on a peer-to-peer
+        connection."""
+        with self._lock:
+            if self.peer:
+                return None
+            if self._owner is None:
+                self._owner = self.get_connection().activate_name_owner(SYSTEMD_BUS_NAME)
+                self.stats['owner_lookups'] += 1
+            return self._owner
+
+    def _get_entry(self, obj_path):
+        entry = self._entries.get(obj_path)
+        if entry is not None:
+            self.stats['hits'] += 1
+            self._entries.move_to_end(obj_path)
+            return entry
+        self.stats['misses'] += 1
+        proxy = self.get_connection().get_object(self.get_owner(), obj_path, introspect=False)
+        entry = self._entries[obj_path] = (proxy, {})
+        while len(self._entries) > self.max_proxies:
+            self._entries.popitem(last=False)
+            self.stats['evictions'] += 1
+        return entry
+
+    def get_proxy(self, obj_path):
+        with self._lock:
+            return self._get_entry(obj_path)[0]
+
+    def get_interface(self, obj_path, interface):
+        """Return a (cached) SchemaInterface for the given object path and interface name."""
+        with self._lock:
+            proxy, interfaces = self._get_entry(obj_path)
+            try:
+                return interfaces[interface]
+            except KeyError:
+                iface = interfaces[interface] = SchemaInterface(proxy, interface)
+                return iface
+
+    def invalidate(self, obj_path=None):
+        """Drop the cached proxy for obj_path, or every cached proxy if obj_path is None."""
+        with self._lock:
+            if obj_path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(obj_path, None)
+
+    def hit_rate(self):
+        lookups = self.stats['hits'] + self.stats['misses']
+        return float(self.stats['hits']) / lookups if lookups else 0.0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+registry = BusRegistry()
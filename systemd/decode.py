@@ -0,0 +1,124 @@
+"""Conversion of property values from dbus-python types to native Python ones.
+
+dbus-python returns its own wrappers (dbus.String, dbus.UInt64, dbus.Array, dbus.Struct, ...), which are heavier than
+the native types and which every consumer ends up converting again.  Values are converted here, once, as they are
+received:
+
+    - strings, object paths and signatures to str, integers to int, booleans to bool, doubles to float;
+    - arrays to tuples, byte arrays to bytes, structs to tuples and dictionaries to dicts;
+    - realtime timestamps (ie: ActiveEnterTimestamp, in microseconds since the epoch) to UTC datetimes, and monotonic
+      ones (ie: ActiveEnterTimestampMonotonic) to timedeltas since boot, None when 0 (never happened);
+    - durations (ie: TimeoutStartUSec, CPUUsageNSec) to timedeltas, None when infinite.
+
+The converter of each property is chosen from its name the first time it is seen and remembered per interface.
+"""
+
+import datetime
+
+import dbus
+
+
+UINT64_MAX = 2 ** 64 - 1
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+# Time properties whose name does not follow the Timestamp/USec conventions.
+_REALTIME = frozenset(['NextElapseUSecRealtime', 'LastTriggerUSec'])
+_MONOTONIC = frozenset(['NextElapseUSecMonotonic', 'LastTriggerUSecMonotonic'])
+
+
+def native(value):
+    """Return value with every dbus-python type in it replaced by the matching native type."""
+    # Boolean first: dbus.Boolean is an int.
+    if isinstance(value, dbus.Boolean):
+        return bool(value)
+    if isinstance(value, str):
+        return str(value)
+    if isinstance(value, int):
+        return int(value)
+    if isinstance(value, float):
+        return float(value)
+    if isinstance(value, bytes):
+        return bytes(value)
+    if isinstance(value, dict):
+        return dict((native(key), native(item)) for key, item in value.items())
+    if isinstance(value, dbus.Array) and getattr(value, 'signature', None) == 'y':
+        return bytes(bytearray(value))
+    if isinstance(value, (list, tuple)):
+        return tuple(native(item) for item in value)
+    return value
+
+
+def realtime(value):
+    if not isinstance(value, int):
+        return native(value)
+    value = int(value)
+    if value == 0 or value == UINT64_MAX:
+        return None
+    return _EPOCH + datetime.timedelta(microseconds=value)
+
+
+def monotonic(value):
+    if not isinstance(value, int):
+        return native(value)
+    value = int(value)
+    if value == 0 or value == UINT64_MAX:
+        return None
+    return datetime.timedelta(microseconds=value)
+
+
+def usec(value):
+    if not isinstance(value, int):
+        return native(value)
+    value = int(value)
+    if value == UINT64_MAX:
+        return None
+    return datetime.timedelta(microseconds=value)
+
+
+def nsec(value):
+    if not isinstance(value, int):
+        return native(value)
+    value = int(value)
+    if value == UINT64_MAX:
+        return None
+    return datetime.timedelta(microseconds=value / 1000.0)
+
+
+def converter(name):
+    """Return the function converting the value of the property called name."""
+    if name in _REALTIME or name.endswith('Timestamp'):
+        return realtime
+    if name in _MONOTONIC or name.endswith('TimestampMonotonic'):
+        return monotonic
+    if name.endswith('USec'):
+        return usec
+    if name.endswith('NSec'):
+        return nsec
+    return native
+
+
+class PropertyDecoder(object):
+    """Converters of the properties of each interface, chosen once per property name."""
+
+    def __init__(self):
+        self._interfaces = {}
+
+    def _converter(self, interface, name):
+        converters = self._interfaces.get(interface)
+        if converters is None:
+            converters = self._interfaces[interface] = {}
+        convert = converters.get(name)
+        if convert is None:
+            convert = converters[name] = converter(name)
+        return convert
+
+    def decode(self, interface, name, value):
+        return self._converter(interface, name)(value)
+
+    def decode_all(self, interface, properties):
+        """Return a dict of the converted values of a GetAll reply (or PropertiesChanged payload)."""
+        return dict((str(name), self._converter(interface, name)(value)) for name, value in properties.items())
+
+
+decoder = PropertyDecoder()
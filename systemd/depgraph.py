@@ -0,0 +1,284 @@
+"""An index of the dependencies between units, for questions about the whole graph.
+
+    >>> graph = manager.dependency_graph()
+    >>> graph.affected_by_stop('dbus.service')
+    >>> graph.reverse_dependencies('network-online.target', kinds=('Wants',))
+    >>> graph.order(['sshd.service', 'network.target', 'sysinit.target'])
+
+The graph is built from one ListUnits call and one pipelined sweep of GetAll calls (see
+L{systemd.manager.Manager.fetch_properties}), then kept current from signals instead of being rebuilt: changed
+dependencies carried by PropertiesChanged are applied as they arrive, UnitRemoved drops a unit, and the units reported
+by UnitNew or whose dependencies were invalidated are fetched in one batch when the graph is next queried.  A daemon
+reload (or re-exec, or reconnection) can change any dependency, so it marks the whole graph for rebuilding on the next
+query.
+"""
+
+import collections
+import heapq
+import threading
+import weakref
+
+from .decode import decoder
+from .events import UNIT_PATH_PREFIX
+from .signals import dispatcher
+from .unit import UNIT_INTERFACE, unit_name
+
+
+# Properties of org.freedesktop.systemd1.Unit listing the units a unit depends on or is ordered against.  Their
+# reverse (RequiredBy, WantedBy, ...) is not fetched: it is computed here from these.
+DEPENDENCY_PROPERTIES = (
+    'Requires', 'Requisite', 'Wants', 'BindsTo', 'PartOf', 'Upholds', 'Conflicts', 'Before', 'After', 'OnFailure',
+    'OnSuccess', 'Triggers', 'PropagatesReloadTo', 'PropagatesStopTo', 'JoinsNamespaceOf',
+)
+
+# Dependencies that pull the units they list in when the unit starts.
+REQUIREMENT_KINDS = ('Requires', 'Requisite', 'Wants', 'BindsTo')
+
+# A unit with one of these on X is stopped when X stops.
+STOP_KINDS = ('Requires', 'Requisite', 'BindsTo', 'PartOf')
+
+
+class DependencyCycle(Exception):
+    """Raised by L{DependencyGraph.order} when the ordering dependencies of the units form a cycle."""
+
+    def __init__(self, units):
+        super(DependencyCycle, self).__init__('ordering cycle between %s' % ', '.join(units))
+        self.units = units
+
+
+class DependencyGraph(object):
+    """The dependencies between the loaded units, with reverse lookups, transitive closures and ordering.
+
+    @param manager: The L{systemd.manager.Manager} whose units are indexed.
+    @param watch: If True, the graph is kept current from signals; otherwise it is a snapshot refreshed by build().
+    @param max_in_flight: At most this many GetAll calls await their reply at any time while fetching.
+
+    Units are named by their id (ie: 'sshd.service').  A unit that is referenced but not loaded has no dependencies
+    of its own but still shows up in reverse lookups.  Counters are kept in `stats` (builds, fetched, units_new,
+    units_removed, deltas_applied, refetches).
+    """
+
+    def __init__(self, manager, watch=True, max_in_flight=256):
+        self._manager = weakref.ref(manager)
+        self.max_in_flight = max_in_flight
+        self.stats = collections.Counter()
+        self._edges = {}
+        self._reverse = dict((kind, {}) for kind in DEPENDENCY_PROPERTIES)
+        self._pending = set()
+        self._stale = True
+        self._lock = threading.RLock()
+        self._watching = watch
+        if watch:
+            dispatcher.connect('UnitNew', self._on_unit_new)
+            dispatcher.connect('UnitRemoved', self._on_unit_removed)
+            dispatcher.connect('Reloading', self._on_reloading)
+            dispatcher.connect('Reconnected', self._on_reconnected)
+            dispatcher.connect('PropertiesChanged', self._on_properties_changed)
+
+    def close(self):
+        """Stop following signals; the graph is then only refreshed by build()."""
+        if self._watching:
+            dispatcher.disconnect('UnitNew', self._on_unit_new)
+            dispatcher.disconnect('UnitRemoved', self._on_unit_removed)
+            dispatcher.disconnect('Reloading', self._on_reloading)
+            dispatcher.disconnect('Reconnected', self._on_reconnected)
+            dispatcher.disconnect('PropertiesChanged', self._on_properties_changed)
+            self._watching = False
+
+    def build(self):
+        """Index every loaded unit again, from one ListUnits call and one sweep of GetAll calls."""
+        paths = [str(unit[6]) for unit in self._manager()._list_units()]
+        with self._lock:
+            self._edges.clear()
+            for reverse in self._reverse.values():
+                reverse.clear()
+            self._pending.clear()
+            self._stale = False
+        self._fetch(paths)
+        self.stats['builds'] += 1
+
+    def _fetch(self, paths):
+        results = self._manager().fetch_properties(paths, max_in_flight=self.max_in_flight)
+        with self._lock:
+            for path, properties in results.items():
+                if isinstance(properties, Exception):
+                    # Gone since it was listed or announced.
+                    self._remove(unit_name(path))
+                    continue
+                self._set(properties.get('Id') or unit_name(path), properties)
+        self.stats['fetched'] += len(paths)
+
+    def _refresh(self):
+        with self._lock:
+            if self._stale:
+                pending = None
+            else:
+                pending = list(self._pending)
+                self._pending.clear()
+        if pending is None:
+            self.build()
+        elif pending:
+            self.stats['refetches'] += 1
+            self._fetch(pending)
+
+    def _set(self, name, properties):
+        """Replace the dependencies of name by those found in properties (only the kinds present there)."""
+        edges = self._edges.setdefault(name, {})
+        for kind in DEPENDENCY_PROPERTIES:
+            if kind not in properties:
+                continue
+            reverse = self._reverse[kind]
+            for other in edges.get(kind, ()):
+                reverse[other].discard(name)
+            edges[kind] = tuple(properties[kind])
+            for other in edges[kind]:
+                reverse.setdefault(other, set()).add(name)
+
+    def _remove(self, name):
+        edges = self._edges.pop(name, None)
+        if edges is None:
+            return
+        for kind, others in edges.items():
+            for other in others:
+                self._reverse[kind][other].discard(name)
+
+    def _on_unit_new(self, name, path):
+        with self._lock:
+            self._pending.add(str(path))
+        self.stats['units_new'] += 1
+
+    def _on_unit_removed(self, name, path):
+        with self._lock:
+            self._pending.discard(str(path))
+            self._remove(str(name))
+        self.stats['units_removed'] += 1
+
+    def _on_reloading(self, active):
+        if not active:
+            self._stale = True
+
+    def _on_reconnected(self, cause):
+        # Like a reload: daemon-reexec reads the unit files again, and signals may have been missed meanwhile.
+        self._stale = True
+
+    def _on_properties_changed(self, interface, changed, invalidated, path):
+        if interface != UNIT_INTERFACE or not path.startswith(UNIT_PATH_PREFIX):
+            return
+        changed = dict((str(key), value) for key, value in changed.items() if key in DEPENDENCY_PROPERTIES)
+        invalidated = [key for key in invalidated if key in DEPENDENCY_PROPERTIES]
+        if not changed and not invalidated:
+            return
+        name = unit_name(path)
+        with self._lock:
+            if name not in self._edges:
+                # Not indexed yet; it is fetched whole when it is.
+                return
+            if changed:
+                self._set(name, decoder.decode_all(interface, changed))
+            if invalidated:
+                self._pending.add(str(path))
+        self.stats['deltas_applied'] += 1
+
+    def __len__(self):
+        self._refresh()
+        return len(self._edges)
+
+    def __contains__(self, name):
+        self._refresh()
+        return name in self._edges
+
+    def units(self):
+        """@rtype: sorted list of the names of the indexed (ie: loaded) units"""
+        self._refresh()
+        with self._lock:
+            return sorted(self._edges)
+
+    def dependencies(self, name, kinds=REQUIREMENT_KINDS):
+        """@rtype: set of the units name lists in one of kinds (ie: its Requires and Wants)"""
+        self._refresh()
+        with self._lock:
+            return self._forward(name, kinds)
+
+    def reverse_dependencies(self, name, kinds=REQUIREMENT_KINDS):
+        """@rtype: set of the units listing name in one of kinds (ie: its RequiredBy and WantedBy)"""
+        self._refresh()
+        with self._lock:
+            return self._backward(name, kinds)
+
+    def _forward(self, name, kinds):
+        edges = self._edges.get(name, {})
+        return set(other for kind in kinds for other in edges.get(kind, ()))
+
+    def _backward(self, name, kinds):
+        return set(other for kind in kinds for other in self._reverse[kind].get(name, ()))
+
+    def _closure(self, names, neighbours):
+        seen = set()
+        queue = collections.deque(names)
+        while queue:
+            for other in neighbours(queue.popleft()):
+                if other not in seen:
+                    seen.add(other)
+                    queue.append(other)
+        return seen.difference(names)
+
+    def closure(self, names, kinds=REQUIREMENT_KINDS, reverse=False):
+        """Return every unit reachable from names through dependencies of the given kinds.
+
+        @param names: Unit names, or a single one.
+        @param reverse: If True, follow the dependencies backwards: the units depending on names, transitively.
+        @rtype: set of unit names, not including names themselves
+        """
+        if isinstance(names, str):
+            names = [names]
+        self._refresh()
+        with self._lock:
+            step = self._backward if reverse else self._forward
+            return self._closure(names, lambda name: step(name, kinds))
+
+    def affected_by_stop(self, name):
+        """@rtype: set of the units that systemd stops too when name stops, transitively"""
+        self._refresh()
+        with self._lock:
+            return self._closure([name], lambda other: (
+                self._backward(other, STOP_KINDS) | self._forward(other, ('PropagatesStopTo',))))
+
+    def order(self, names):
+        """Return names sorted the way systemd orders their start jobs: each unit after those it is ordered After.
+
+        Only the ordering between names themselves is considered (After and Before, from either side); units that
+        are not ordered against each other keep their relative position.
+
+        @raise DependencyCycle: Raised when the ordering dependencies between names form a cycle.
+
+        @rtype: list of unit names
+        """
+        names = list(collections.OrderedDict.fromkeys(names))
+        self._refresh()
+        wanted = set(names)
+        with self._lock:
+            before = dict((name, set()) for name in names)  # name -> the units that must come first
+            for name in names:
+                before[name].update(wanted.intersection(self._forward(name, ('After',))))
+                for other in wanted.intersection(self._forward(name, ('Before',))):
+                    before[other].add(name)
+        # Kahn's algorithm, taking the first ready unit in the order given each time.
+        position = dict((name, i) for i, name in enumerate(names))
+        after = dict((name, []) for name in names)
+        for name, firsts in before.items():
+            for first in firsts:
+                after[first].append(name)
+        waiting = dict((name, len(firsts)) for name, firsts in before.items())
+        ready = [position[name] for name in names if not waiting[name]]
+        heapq.heapify(ready)
+        ordered = []
+        while ready:
+            name = names[heapq.heappop(ready)]
+            ordered.append(name)
+            for other in after[name]:
+                waiting[other] -= 1
+                if not waiting[other]:
+                    heapq.heappush(ready, position[other])
+        if len(ordered) < len(names):
+            raise DependencyCycle([name for name in names if waiting[name]])
+        return ordered
@@ -1,7 +1,7 @@
-from .base import SystemdDbusObject
+from .unit import Unit
 
 
-class Device(SystemdDbusObject):
+class Device(Unit):
     """Abstraction class to org.freedesktop.systemd1.Device interface"""
 
     __dbus_interace__ = 'org.freedesktop.systemd1.Device'
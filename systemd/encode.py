@@ -0,0 +1,177 @@
+"""Conversion of unit properties to the D-Bus types systemd expects, for StartTransientUnit and SetUnitProperties.
+
+Properties are sent as an array of (name, variant) and systemd rejects a value whose type inside the variant is not
+exactly the one of the property (ie: MemoryMax must be a uint64, not the int32 dbus-python would guess for 512).  The
+type of each property is taken from PROPERTY_SIGNATURES, or from its name for durations, and values are accepted in
+the native forms systemd.decode produces:
+
+    - durations (ie: RuntimeMaxUSec) as timedeltas or microseconds, limits (ie: MemoryMax, TasksMax) as integers;
+      None means infinity for both;
+    - commands (ie: ExecStart) as an argv list, or a list of them, or of (path, argv, ignore_failure) tuples;
+    - lists as any iterable.
+
+CPUQuota is accepted as a percentage ('150%' or 150) and sent as CPUQuotaPerSecUSec, as systemctl does.  Values that
+already are dbus-python types are sent as they are, which is how to set a property not listed here.
+"""
+
+import datetime
+
+import dbus
+
+
+UINT64_MAX = 2 ** 64 - 1
+
+_COMMAND = 'a(sasb)'
+
+PROPERTY_SIGNATURES = {
+    # org.freedesktop.systemd1.Unit
+    'Description': 's', 'Documentation': 'as', 'SourcePath': 's', 'DefaultDependencies': 'b',
+    'StopWhenUnneeded': 'b', 'RefuseManualStart': 'b', 'RefuseManualStop': 'b', 'AddRef': 'b', 'CollectMode': 's',
+    'Requires': 'as', 'Requisite': 'as', 'Wants': 'as', 'BindsTo': 'as', 'PartOf': 'as', 'Conflicts': 'as',
+    'Before': 'as', 'After': 'as', 'OnFailure': 'as', 'OnSuccess': 'as', 'JobTimeoutUSec': 't',
+    # Services and scopes
+    'Type': 's', 'RemainAfterExit': 'b', 'Restart': 's', 'KillMode': 's', 'KillSignal': 'i', 'SendSIGHUP': 'b',
+    'ExecStart': _COMMAND, 'ExecStartPre': _COMMAND, 'ExecStartPost': _COMMAND, 'ExecReload': _COMMAND,
+    'ExecStop': _COMMAND, 'ExecStopPost': _COMMAND, 'PIDs': 'au', 'Slice': 's', 'Delegate': 'b',
+    'User': 's', 'Group': 's', 'WorkingDirectory': 's', 'RootDirectory': 's', 'Environment': 'as',
+    'UnsetEnvironment': 'as', 'StandardInput': 's', 'StandardOutput': 's', 'StandardError': 's', 'Nice': 'i',
+    'OOMScoreAdjust': 'i', 'NoNewPrivileges': 'b', 'PrivateTmp': 'b', 'DynamicUser': 'b', 'SyslogIdentifier': 's',
+    'LimitNOFILE': 't', 'LimitNPROC': 't', 'LimitCORE': 't', 'LimitMEMLOCK': 't',
+    # Resource control
+    'CPUAccounting': 'b', 'CPUWeight': 't', 'StartupCPUWeight': 't', 'CPUShares': 't', 'CPUQuotaPerSecUSec': 't',
+    'CPUQuotaPeriodUSec': 't', 'AllowedCPUs': 'ay', 'MemoryAccounting': 'b', 'MemoryMin': 't', 'MemoryLow': 't',
+    'MemoryHigh': 't', 'MemoryMax': 't', 'MemorySwapMax': 't', 'MemoryLimit': 't', 'TasksAccounting': 'b',
+    'TasksMax': 't', 'IOAccounting': 'b', 'IOWeight': 't', 'StartupIOWeight': 't', 'BlockIOAccounting': 'b',
+    'BlockIOWeight': 't', 'IPAccounting': 'b',
+    # Timers
+    'OnCalendar': 's', 'OnActiveUSec': 't', 'OnBootUSec': 't', 'OnStartupUSec': 't', 'OnUnitActiveUSec': 't',
+    'OnUnitInactiveUSec': 't', 'AccuracyUSec': 't', 'RandomizedDelayUSec': 't', 'Persistent': 'b',
+    'WakeSystem': 'b', 'RemainAfterElapse': 'b',
+}
+
+_BASIC_TYPES = {
+    'y': dbus.Byte, 'b': dbus.Boolean, 'n': dbus.Int16, 'q': dbus.UInt16, 'i': dbus.Int32, 'u': dbus.UInt32,
+    'x': dbus.Int64, 't': dbus.UInt64, 'd': dbus.Double, 's': dbus.String, 'o': dbus.ObjectPath,
+    'g': dbus.Signature,
+}
+
+_DBUS_TYPES = tuple(set(_BASIC_TYPES.values())) + (dbus.Array, dbus.Struct, dbus.Dictionary)
+
+
+def complete_types(signature):
+    """Split a signature into its complete types (ie: 'sa(sv)' -> ['s', 'a(sv)'])."""
+    types = []
+    start = 0
+    while start < len(signature):
+        end = start
+        while signature[end] == 'a':
+            end += 1
+        if signature[end] in '({':
+            depth = 0
+            while True:
+                if signature[end] in '({':
+                    depth += 1
+                elif signature[end] in ')}':
+                    depth -= 1
+                end += 1
+                if not depth:
+                    break
+        else:
+            end += 1
+        types.append(signature[start:end])
+        start = end
+    return types
+
+
+def typed(signature, value):
+    """Return value as the dbus-python type of signature (one complete type), so that a variant carries that type."""
+    if signature in _BASIC_TYPES:
+        return _BASIC_TYPES[signature](value)
+    if signature == 'v':
+        return value
+    if signature == 'ay':
+        return dbus.Array([dbus.Byte(byte) for byte in bytearray(value)], signature='y')
+    if signature.startswith('a{'):
+        key, item = complete_types(signature[2:-1])
+        return dbus.Dictionary(dict((typed(key, k), typed(item, v)) for k, v in value.items()),
+                               signature=signature[2:-1])
+    if signature.startswith('a'):
+        return dbus.Array([typed(signature[1:], item) for item in value], signature=signature[1:])
+    if signature.startswith('('):
+        items = complete_types(signature[1:-1])
+        if len(items) != len(value):
+            raise ValueError('%r does not have the %d members of %s' % (value, len(items), signature))
+        return dbus.Struct(tuple(typed(item, v) for item, v in zip(items, value)), signature=signature[1:-1])
+    raise ValueError('unsupported signature %r' % signature)
+
+
+def signature(name, value):
+    """Return the signature of property name, guessed from value for a property that is not known."""
+    known = PROPERTY_SIGNATURES.get(name)
+    if known is not None:
+        return known
+    if name.endswith('USec') or name.endswith('NSec'):
+        return 't'
+    if isinstance(value, bool):
+        return 'b'
+    if isinstance(value, str):
+        return 's'
+    if isinstance(value, (list, tuple)) and all(isinstance(item, str) for item in value):
+        return 'as'
+    # Integers have too many candidate types to guess from.
+    raise ValueError('unknown property %s; pass its value as a dbus-python type (ie: dbus.UInt64)' % name)
+
+
+def _command(command):
+    if isinstance(command, str):
+        raise ValueError('a command is an argv list, not a string: %r' % command)
+    command = tuple(command)
+    if len(command) == 3 and not isinstance(command[1], str):
+        return command
+    return (command[0], command, False)
+
+
+def _normalize(name, signature, value):
+    if signature == 't':
+        if value is None:
+            return UINT64_MAX
+        if isinstance(value, datetime.timedelta):
+            factor = 1000 if name.endswith('NSec') else 1
+            return (value.days * 86400 + value.seconds) * 1000000 * factor + value.microseconds * factor
+    if signature == _COMMAND:
+        commands = list(value)
+        # A single argv list rather than a list of commands.
+        if commands and isinstance(commands[0], str):
+            commands = [commands]
+        return [_command(command) for command in commands]
+    return value
+
+
+def encode_value(name, value):
+    """Return (name, value) with name resolved and value converted to the D-Bus type systemd expects."""
+    if name == 'CPUQuota':
+        name = 'CPUQuotaPerSecUSec'
+        if value is not None:
+            percent = float(value[:-1] if isinstance(value, str) and value.endswith('%') else value)
+            value = int(percent * 10000)
+    if isinstance(value, _DBUS_TYPES):
+        return name, value
+    sig = signature(name, value)
+    return name, typed(sig, _normalize(name, sig, value))
+
+
+def encode_properties(properties):
+    """Return properties (a dict, or (name, value) pairs) as the a(sv) array of StartTransientUnit and
+    SetUnitProperties."""
+    if isinstance(properties, dict):
+        properties = properties.items()
+    return dbus.Array([dbus.Struct(encode_value(name, value), signature='sv') for name, value in properties],
+                      signature='(sv)')
+
+
+def encode_aux(aux):
+    """Return auxiliary units (a dict or (name, properties) pairs) as the a(sa(sv)) array of StartTransientUnit."""
+    if isinstance(aux, dict):
+        aux = aux.items()
+    return dbus.Array([dbus.Struct((name, encode_properties(properties)), signature='sa(sv)')
+                       for name, properties in aux], signature='(sa(sv))')
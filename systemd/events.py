@@ -0,0 +1,248 @@
+"""A stream of the changes systemd signals, as typed events.
+
+    >>> with manager.events(coalesce=0.2, maxsize=1000, overflow='drop_oldest') as events:
+    ...     for event in events:
+    ...         if isinstance(event, JobRemoved):
+    ...             print(event.unit_name, event.result)
+
+The same stream is an asynchronous iterator (`async for event in events`), in which case signals are dispatched by
+the main loop thread of systemd.mainloop.
+"""
+
+import collections
+import threading
+import time
+
+from . import mainloop
+from .decode import decoder
+from .signals import dispatcher
+
+
+UNIT_PATH_PREFIX = '/org/freedesktop/systemd1/unit/'
+
+OVERFLOW_POLICIES = ('drop_oldest', 'drop_newest', 'raise')
+
+
+class EventOverflow(Exception):
+    """Raised once by a stream with the 'raise' overflow policy after events had to be dropped."""
+
+
+class UnitNew(collections.namedtuple('UnitNew', ('name', 'unit_path'))):
+    __slots__ = ()
+
+
+class UnitRemoved(collections.namedtuple('UnitRemoved', ('name', 'unit_path'))):
+    __slots__ = ()
+
+
+class JobNew(collections.namedtuple('JobNew', ('id', 'job_path', 'unit_name'))):
+    __slots__ = ()
+
+
+class JobRemoved(collections.namedtuple('JobRemoved', ('id', 'job_path', 'unit_name', 'result'))):
+    __slots__ = ()
+
+
+class Reloading(collections.namedtuple('Reloading', ('active',))):
+    __slots__ = ()
+
+
+class Reconnected(collections.namedtuple('Reconnected', ('cause',))):
+    """The connection to systemd was restored after systemd re-executed ('owner_changed'), after the connection was
+    lost ('reconnected') or once the registry replaced it ('replaced'); signals may have been missed meanwhile."""
+
+    __slots__ = ()
+
+
+class PropertiesChanged(collections.namedtuple('PropertiesChanged', (
+        'unit_path', 'interface', 'changed', 'invalidated'))):
+    """Properties of a unit that changed (with their new values) or were invalidated (names only)."""
+
+    __slots__ = ()
+
+    def merge(self, newer):
+        """Return the event equivalent to this one followed by newer."""
+        changed = dict((key, value) for key, value in self.changed.items() if key not in newer.invalidated)
+        changed.update(newer.changed)
+        invalidated = [name for name in self.invalidated if name not in newer.changed and name not in newer.invalidated]
+        return self._replace(changed=changed, invalidated=invalidated + list(newer.invalidated))
+
+
+EVENT_TYPES = (UnitNew, UnitRemoved, JobNew, JobRemoved, Reloading, Reconnected, PropertiesChanged)
+
+
+class EventStream(object):
+    """A bounded queue of the events of systemd, fed by the signals of the dispatcher.
+
+    @param members: Names of the event types to receive; all of EVENT_TYPES by default.
+    @param maxsize: Most events queued at once; once reached, the overflow policy applies.
+    @param overflow: 'drop_oldest' (the default) drops the oldest queued event, 'drop_newest' drops the incoming one,
+    and 'raise' drops the incoming one and raises L{EventOverflow} from the next read so the consumer can resync.
+    @param coalesce: If set, a PropertiesChanged event is held back this many seconds after it arrives and later
+    changes of the same unit and interface are merged into it, so a storm costs one event per unit.  Events are
+    still delivered in order, so a held event delays the events behind it.
+
+    Counters are kept in `stats` (received, delivered, coalesced, dropped) and the largest queue length seen in
+    `high_water`.  The signals of systemd are only received once the Manager has subscribed to them, which it does
+    when constructed.
+    """
+
+    def __init__(self, members=None, maxsize=4096, overflow='drop_oldest', coalesce=None):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError('overflow must be one of %s' % ', '.join(OVERFLOW_POLICIES))
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.coalesce = coalesce
+        self.stats = collections.Counter()
+        self.high_water = 0
+        self._queue = collections.deque()
+        self._held = {}
+        self._overflowed = False
+        self._closed = False
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._loop = None
+        self._async_ready = None
+        self._members = [event_type.__name__ for event_type in EVENT_TYPES] if members is None else list(members)
+        for member in self._members:
+            dispatcher.connect(member, getattr(self, '_on_' + member))
+
+    def close(self):
+        """Stop receiving signals; iteration ends once the events already queued are consumed."""
+        for member in self._members:
+            dispatcher.disconnect(member, getattr(self, '_on_' + member))
+        self._closed = True
+        self._wake()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self._queue)
+
+    def _on_UnitNew(self, name, path):
+        self._put(UnitNew(str(name), str(path)))
+
+    def _on_UnitRemoved(self, name, path):
+        self._put(UnitRemoved(str(name), str(path)))
+
+    def _on_JobNew(self, ID, path, unit):
+        self._put(JobNew(int(ID), str(path), str(unit)))
+
+    def _on_JobRemoved(self, ID, path, unit, result):
+        self._put(JobRemoved(int(ID), str(path), str(unit), str(result)))
+
+    def _on_Reloading(self, active):
+        self._put(Reloading(bool(active)))
+
+    def _on_Reconnected(self, cause):
+        self._put(Reconnected(cause))
+
+    def _on_PropertiesChanged(self, interface, changed, invalidated, path):
+        if not path.startswith(UNIT_PATH_PREFIX):
+            return
+        event = PropertiesChanged(str(path), str(interface), decoder.decode_all(interface, changed),
+                                  [str(name) for name in invalidated])
+        self._put(event, key=(event.unit_path, event.interface) if self.coalesce is not None else None)
+
+    def _put(self, event, key=None):
+        with self._lock:
+            if self._closed:
+                return
+            self.stats['received'] += 1
+            entry = self._held.get(key) if key is not None else None
+            if entry is not None:
+                entry[0] = entry[0].merge(event)
+                self.stats['coalesced'] += 1
+                return
+            if len(self._queue) >= self.maxsize:
+                self.stats['dropped'] += 1
+                if self.overflow != 'drop_oldest':
+                    self._overflowed = self.overflow == 'raise'
+                    return
+                dropped = self._queue.popleft()
+                if dropped[2] is not None:
+                    del self._held[dropped[2]]
+            entry = [event, time.time() + (self.coalesce if key is not None else 0), key]
+            self._queue.append(entry)
+            if key is not None:
+                self._held[key] = entry
+            self.high_water = max(self.high_water, len(self._queue))
+        self._wake()
+
+    def _wake(self):
+        self._ready.set()
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._async_ready.set)
+
+    def _pop(self):
+        """Return (event, None) if one is due, else (None, seconds until the first one is due or None)."""
+        with self._lock:
+            if self._overflowed:
+                self._overflowed = False
+                raise EventOverflow('%d events dropped' % self.stats['dropped'])
+            if not self._queue:
+                self._ready.clear()
+                return None, None
+            entry = self._queue[0]
+            wait = entry[1] - time.time()
+            if wait > 0:
+                self._ready.clear()
+                return None, wait
+            self._queue.popleft()
+            if entry[2] is not None:
+                del self._held[entry[2]]
+            self.stats['delivered'] += 1
+            return entry[0], None
+
+    def get(self, timeout=None):
+        """Return the next event, or None if there is none within timeout seconds or the stream is closed.
+
+        Without the main loop thread of systemd.mainloop, the default GLib main context is iterated while waiting.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            event, wait = self._pop()
+            if event is not None:
+                return event
+            if self._closed and wait is None:
+                return None
+            if deadline is not None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                wait = remaining if wait is None else min(wait, remaining)
+            mainloop.wait_event(self._ready, wait)
+
+    def __iter__(self):
+        while True:
+            event = self.get()
+            if event is None:
+                return
+            yield event
+
+    def __aiter__(self):
+        # asyncio is imported here rather than with the module: it is slow to import and only needed here.
+        import asyncio
+        if self._loop is None:
+            mainloop.start_thread()
+            self._loop = asyncio.get_event_loop()
+            self._async_ready = asyncio.Event()
+        return self
+
+    async def __anext__(self):
+        import asyncio
+        while True:
+            event, wait = self._pop()
+            if event is not None:
+                return event
+            if self._closed and wait is None:
+                raise StopAsyncIteration
+            self._async_ready.clear()
+            try:
+                await asyncio.wait_for(self._async_ready.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
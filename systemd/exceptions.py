@@ -1,11 +1,13 @@
 import functools
+import inspect
 
 import dbus.exceptions
 
 
 class SystemdError(Exception):
     def __init__(self, error):
-        self.name = error.get_dbus_name().split('.')[3]
+        self.dbus_name = error.get_dbus_name()
+        self.name = self.dbus_name.split('.')[3]
         self.message = error.get_dbus_message()
 
     def __str__(self):
@@ -16,7 +18,19 @@ class SystemdError(Exception):
 
 
 def raises_systemd_error(fn):
-    """If the wrapped function raises DBusException, it is wrapped in SystemdError and re-raised."""
+    """If the wrapped function raises DBusException, it is wrapped in SystemdError and re-raised.
+
+    The body of a generator function only runs as it is iterated, so the errors it raises while iterated are wrapped.
+    """
+    if inspect.isgeneratorfunction(fn):
+        @functools.wraps(fn)
+        def _generator_wrapper(*args, **kwargs):
+            try:
+                return (yield from fn(*args, **kwargs))
+            except dbus.exceptions.DBusException as exc:
+                raise SystemdError(exc)
+        return _generator_wrapper
+
     @functools.wraps(fn)
     def _wrapper(*args, **kwargs):
         try:
@@ -1,9 +1,31 @@
+import collections
+import threading
+
 import dbus
-import dbus.mainloop.glib
-dbus.mainloop.glib.DBusGMainLoop(set_as_default=True)
 
+from . import mainloop
 from .base import SystemdDbusObject
+from .bus import registry, SYSTEMD_OBJECT_PATH, PROPERTIES_INTERFACE, MANAGER_INTERFACE
 from .exceptions import SystemdError, raises_systemd_error
+from .pipeline import Pipeline
+from .signals import dispatcher
+
+
+JOB_INTERFACE = 'org.freedesktop.systemd1.Job'
+
+# Result of a job that was gone before its JobRemoved signal could be seen.
+JOB_RESULT_UNKNOWN = 'unknown'
+
+# How long to wait for the JobRemoved signal of a job that no longer exists (it may still be in flight).
+_GONE_GRACE = 0.1
+
+# Errors of a Get on the path of a job that no longer exists; older versions of systemd answer UnknownInterface (see
+# job_if_exists()).  Any other error (ie: a timeout) says nothing about the job.
+_GONE_ERRORS = frozenset([
+    'org.freedesktop.DBus.Error.UnknownObject',
+    'org.freedesktop.DBus.Error.UnknownMethod',
+    'org.freedesktop.DBus.Error.UnknownInterface',
+])
 
 
 def job_if_exists(job_path):
@@ -15,11 +37,197 @@ def job_if_exists(job_path):
         raise
     
 
+class JobTracker(object):
+    """Record the results of finished jobs from the JobRemoved signal and call back those waiting for them.
+
+    Results are remembered (the last `max_results` of them) from the moment the tracker is started, so a job that
+    finishes before anybody waits for it is still resolved without a round trip.
+    """
+
+    def __init__(self, max_results=4096):
+        self.max_results = max_results
+        self.results = collections.OrderedDict()
+        self._callbacks = {}
+        self._listening = False
+        # The connection the tracker subscribed on; systemd only sends JobRemoved to subscribed connections.
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def started(self):
+        """Return True if the tracker is subscribed on the current connection."""
+        return self._connection is not None and self._connection is registry.get_connection()
+
+    def start(self, subscribed=False):
+        """Start recording JobRemoved signals; Subscribe() first unless the caller already did.
+
+        Once started, this does nothing until the connection changes; see started().
+        """
+        with self._lock:
+            listening, self._listening = self._listening, True
+        if not listening:
+            # Before looking up the connection: connecting the dispatcher may replace it (see systemd.bus).
+            dispatcher.connect('JobRemoved', self._on_job_removed)
+            dispatcher.connect('Reconnected', self._on_reconnected)
+        connection = registry.get_connection()
+        with self._lock:
+            if self._connection is connection:
+                return
+            self._connection = connection
+        if not subscribed:
+            try:
+                registry.get_interface(SYSTEMD_OBJECT_PATH, MANAGER_INTERFACE).Subscribe()
+            except dbus.exceptions.DBusException as error:
+                if not error.get_dbus_name().endswith('AlreadySubscribed'):
+                    with self._lock:
+                        self._connection = None
+                    raise
+
+    def _on_job_removed(self, ID, path, unit, result):
+        path, result = str(path), str(result)
+        with self._lock:
+            self.results[path] = result
+            while len(self.results) > self.max_results:
+                self.results.popitem(last=False)
+            callbacks = self._callbacks.pop(path, [])
+        for callback in callbacks:
+            callback(result)
+
+    def _on_reconnected(self, cause):
+        # A new connection, or a new systemd, has no record of our subscription.
+        with self._lock:
+            self._connection = None
+        try:
+            self.start()
+        except dbus.exceptions.DBusException:
+            # Retried by the next start().
+            pass
+        # JobRemoved signals may have been missed while disconnected, and a re-exec'd systemd forgets running jobs
+        # altogether: look up the jobs still awaited with pipelined Gets, without blocking the main loop.
+        with self._lock:
+            paths = list(self._callbacks)
+        if not paths:
+            return
+        pipeline = Pipeline()
+        for path in paths:
+            pipeline.call(path, PROPERTIES_INTERFACE, 'Get', (JOB_INTERFACE, 'State'),
+                          callback=lambda call, path=path: self._on_job_checked(path, call))
+
+    def _on_job_checked(self, path, call):
+        if call.error is not None and call.error.get_dbus_name() in _GONE_ERRORS:
+            self._resolve(path, JOB_RESULT_UNKNOWN)
+
+    def _resolve(self, path, result):
+        with self._lock:
+            callbacks = self._callbacks.pop(path, [])
+        for callback in callbacks:
+            callback(result)
+
+    def add_callback(self, job_path, callback):
+        """Call callback(result) when the job is removed, or right away if it already was."""
+        path = str(job_path)
+        with self._lock:
+            result = self.results.get(path)
+            if result is None:
+                self._callbacks.setdefault(path, []).append(callback)
+                return
+        callback(result)
+
+    def remove_callback(self, job_path, callback):
+        with self._lock:
+            callbacks = self._callbacks.get(str(job_path), [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+                if not callbacks:
+                    del self._callbacks[str(job_path)]
+
+    def wait(self, job_paths, timeout=None):
+        """Wait until the given jobs are removed.
+
+        @rtype: dict of each job path to its result ('done', 'failed', 'canceled', 'timeout', ...), None if it was
+        still running when timeout (in seconds) expired, or JOB_RESULT_UNKNOWN if it had vanished without its
+        JobRemoved signal being seen.
+        """
+        self.start()
+        results = collections.OrderedDict((str(path), None) for path in job_paths)
+        pending = set(results)
+        done = threading.Event()
+
+        def callback(path):
+            def set_result(result):
+                results[path] = result
+                pending.discard(path)
+                if not pending:
+                    done.set()
+            return set_result
+
+        callbacks = dict((path, callback(path)) for path in results)
+        for path in list(results):
+            self.add_callback(path, callbacks[path])
+        if not pending:
+            done.set()
+
+        try:
+            # Jobs that finished before this tracker started listening will never see their JobRemoved signal; find
+            # them with one pipelined Get per job still pending.
+            pipeline = Pipeline()
+            checks = [(path, pipeline.call(path, PROPERTIES_INTERFACE, 'Get', (JOB_INTERFACE, 'State')))
+                      for path in list(pending)]
+            pipeline.wait()
+            gone = []
+            for path, check in checks:
+                if check.error is None:
+                    continue
+                if check.error.get_dbus_name() not in _GONE_ERRORS:
+                    raise check.error
+                gone.append(path)
+            if gone:
+                mainloop.wait_event(done, _GONE_GRACE)
+                for path in gone:
+                    if path in pending:
+                        self._resolve(path, JOB_RESULT_UNKNOWN)
+
+            mainloop.wait_event(done, timeout)
+        finally:
+            # pending is changed by the callbacks, from the main loop thread if there is one.
+            for path in list(pending):
+                self.remove_callback(path, callbacks[path])
+        return results
+
+
+tracker = JobTracker()
+
+
 class Job(SystemdDbusObject):
     """Abstraction class to org.freedesktop.systemd1.Job interface"""
 
-    __dbus_interace__ = 'org.freedesktop.systemd1.Job'
+    __dbus_interace__ = JOB_INTERFACE
 
     @raises_systemd_error
     def cancel(self):
         self._interface.Cancel()
+
+    def wait(self, timeout=None):
+        """Wait for the job to finish, from its JobRemoved signal (no polling).
+
+        @param timeout: Seconds to wait at most; None to wait forever.
+
+        @rtype: The job result ('done', 'canceled', 'timeout', 'failed', 'dependency' or 'skipped'), None if the
+        timeout expired, or JOB_RESULT_UNKNOWN if the job vanished without its JobRemoved signal being seen.
+        """
+        return tracker.wait([self._path], timeout)[self._path]
+
+
+class JobRecord(collections.namedtuple('JobRecord', ('id', 'unit_name', 'job_type', 'state', 'job_path', 'unit_path'))):
+    """One entry of the ListJobs reply, with native values and no proxy behind it."""
+
+    __slots__ = ()
+
+    @classmethod
+    def from_dbus(cls, job):
+        return cls(int(job[0]), str(job[1]), str(job[2]), str(job[3]), str(job[4]), str(job[5]))
+
+    def materialize(self, watch=True, lazy=False, manager=None):
+        """Return the L{Job} this record describes, from the identity map of manager if one is given."""
+        if manager is not None:
+            return manager._get_object(Job, self.job_path, watch=watch, lazy=lazy)
+        return Job(self.job_path, watch=watch, lazy=lazy)
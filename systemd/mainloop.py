@@ -0,0 +1,125 @@
+"""The GLib main loop that dispatches D-Bus replies and signals.
+
+Asynchronous calls (reply_handler/error_handler) and signals are only delivered while a GLib main loop runs.
+Applications built around GLib run their own; others (ie: asyncio applications, see systemd.aio) can have one run in
+a background thread with start_thread().
+
+Nothing here happens at import time: the connection to systemd is only attached to GLib once enable() is called,
+which the features needing signals (watched objects, Manager(signals=True), job waits, event streams) do
+themselves.  A short-lived process making a few blocking calls never loads GLib.
+"""
+
+import threading
+import time
+
+import dbus.mainloop.glib
+
+
+_lock = threading.Lock()
+_thread = None
+_loop = None
+_enabled = False
+_GLib = None
+
+
+def _require_glib():
+    """Import GLib on first use; it is slow to import and only needed to run a main loop."""
+    global _GLib
+    if _GLib is None:
+        try:
+            from gi.repository import GLib
+        except ImportError:  # Older systems only have the static bindings.
+            try:
+                import gobject as GLib
+            except ImportError:
+                raise ImportError('PyGObject (gi.repository.GLib) is required to run a main loop')
+        _GLib = GLib
+    return _GLib
+
+
+def enable():
+    """Make GLib the default main loop of dbus-python, so that signals and asynchronous replies can be dispatched.
+
+    The registry replaces a connection made before this (see L{systemd.bus.BusRegistry.get_connection}).
+    """
+    global _enabled
+    with _lock:
+        if not _enabled:
+            dbus.mainloop.glib.DBusGMainLoop(set_as_default=True)
+            _enabled = True
+
+
+def enabled():
+    return _enabled
+
+
+def call_later(delay, callback, *args):
+    """Call callback(*args) once from the default GLib main context, after delay seconds."""
+    GLib = _require_glib()
+
+    def run():
+        callback(*args)
+        return False
+    return GLib.timeout_add(int(delay * 1000), run)
+
+
+def start_thread():
+    """Run the default GLib main loop in a daemon thread, unless it already runs there.
+
+    Do not call this if the application itself runs the default GLib main context in another thread.
+    """
+    global _thread, _loop
+    GLib = _require_glib()
+    enable()
+    with _lock:
+        if _thread is not None and _thread.is_alive():
+            return _thread
+        dbus.mainloop.glib.threads_init()
+        _loop = GLib.MainLoop()
+        _thread = threading.Thread(target=_loop.run, name='systemd-mainloop')
+        _thread.daemon = True
+        _thread.start()
+        return _thread
+
+
+def stop_thread():
+    global _thread, _loop
+    with _lock:
+        if _loop is not None:
+            _loop.quit()
+        if _thread is not None and _thread is not threading.current_thread():
+            _thread.join()
+        _thread = _loop = None
+
+
+def in_thread():
+    """Return True if the main loop runs in the thread started by start_thread()."""
+    return _thread is not None and _thread.is_alive()
+
+
+def wait_event(event, timeout=None):
+    """Wait for a threading.Event set from a D-Bus callback and return whether it is set.
+
+    If the main loop runs in the thread of start_thread() this simply waits; otherwise the default GLib main context
+    is iterated here, so that the signal or reply that sets the event gets dispatched.
+    """
+    if in_thread():
+        return event.wait(timeout)
+    GLib = _require_glib()
+    enable()
+    context = GLib.MainContext.default()
+    deadline = None if timeout is None else time.time() + timeout
+    while not event.is_set():
+        if deadline is None:
+            context.iteration(True)
+            continue
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            break
+        # Wake the blocking iteration up when the timeout expires.
+        fired = []
+        source = GLib.timeout_add(int(remaining * 1000) + 1, lambda: fired.append(True))
+        context.iteration(True)
+        if not fired:
+            GLib.source_remove(source)
+    return event.is_set()
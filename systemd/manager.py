@@ -17,46 +17,169 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 
+import collections
+import fnmatch
+import weakref
+
 import dbus
-import dbus.mainloop.glib
-dbus.mainloop.glib.DBusGMainLoop(set_as_default=True)
 
-from systemd.unit import Unit
-from systemd.job import Job
-from systemd.property import Property
+from systemd.unit import UnitRecord, UNIT_INTERFACE, unit_path
+from systemd.job import Job, JobRecord, tracker as job_tracker
+from systemd.property import Property, CompactProperty
 from systemd.exceptions import SystemdError
 
+from . import mainloop
 from .base import SystemdDbusObject
+from .bus import SYSTEMD_OBJECT_PATH, MANAGER_INTERFACE, PROPERTIES_INTERFACE
+from .decode import decoder
+from .signals import dispatcher
+from .pipeline import Pipeline
+from .unitfiles import UnitFileCache
+from .unittypes import unit_class
+from .depgraph import DependencyGraph
+from .encode import encode_properties, encode_aux, encode_value
+from .transient import TransientLauncher
+from .events import EventStream
 from .exceptions import SystemdError, raises_systemd_error
 
 
+# Errors meaning that a unit lacks an interface or property, rather than that fetching it failed.
+_MISSING_PROPERTY_ERRORS = (
+    'org.freedesktop.DBus.Error.UnknownInterface',
+    'org.freedesktop.DBus.Error.UnknownProperty',
+)
+
+
+def _same_value(properties, name, value):
+    """Return True if the cached property name already has value (as encoded by L{systemd.encode})."""
+    try:
+        cached = getattr(properties, name)
+    except AttributeError:
+        return False
+    try:
+        return encode_value(name, cached) == (name, value)
+    except ValueError:
+        return False
+
+
+def _filter_units(units, states=(), patterns=(), names=()):
+    """Filter ListUnits records the way the daemon does: states match any of the load, active or sub state, and
+    patterns are shell globs."""
+    if names:
+        units = [unit for unit in units if unit[0] in names]
+    if states:
+        units = [unit for unit in units if unit[2] in states or unit[3] in states or unit[4] in states]
+    if patterns:
+        units = [unit for unit in units if any(fnmatch.fnmatchcase(unit[0], p) for p in patterns)]
+    return units
+
+
 class Manager(SystemdDbusObject):
     """Abstraction class to org.freedesktop.systemd1.Manager interface.
 
     The dbus interface is documented at https://wiki.freedesktop.org/www/Software/systemd/dbus/
+
+    @param cache_unit_files: If True, list_unit_files() and get_unit_file_state() are answered from a
+    L{systemd.unitfiles.UnitFileCache} (see `unit_file_cache`) until unit files change; with signals=False, only
+    inotify tells it so.
+    @param signals: If True (the default), subscribe to the signals of systemd and keep the returned objects up to
+    date from them, which needs a GLib main loop (see systemd.mainloop).  If False, nothing is subscribed or watched,
+    GLib is not loaded and the properties of the manager are only fetched when first used, so that a short-lived
+    process pays for nothing but the calls it makes.
     """
+
+    __dbus_interace__ = MANAGER_INTERFACE
     
-    def __init__(self):
+    def __init__(self, cache_unit_files=False, signals=True):
         # XXX: For the time being, at least, we do NOT call the parent class's constructor because of the call to self.subscribe() here.
         # super(Manager, self).__init__('/org/freedesktop/systemd1')
         
-        self._bus = dbus.SystemBus()
-        self._proxy = self._bus.get_object('org.freedesktop.systemd1', '/org/freedesktop/systemd1')
-        self._interface = dbus.Interface(self._proxy, 'org.freedesktop.systemd1.Manager')
-        self.subscribe()
+        self._path = SYSTEMD_OBJECT_PATH
+        self._signals = signals
+
+        # Identity map: the live Unit/Job object of each object path, so lookups of the same path return the same
+        # object instead of building (and watching) another one.
+        self._objects = weakref.WeakValueDictionary()
+        self.identity_stats = collections.Counter()
 
-        self._properties_interface = dbus.Interface(self._proxy, 'org.freedesktop.DBus.Properties')
-        self._on_properties_changed_match = self._properties_interface.connect_to_signal('PropertiesChanged', self._on_properties_changed)
+        # Which method list_units() used, and how often; see _list_units().
+        self.last_list_method = None
+        self.list_stats = collections.Counter()
+        self._unsupported_methods = set()
+        self.unit_file_cache = UnitFileCache(signals=signals) if cache_unit_files else None
+        self._dependency_graph = None
+        self.property_write_stats = collections.Counter()
+        if not signals:
+            return
+
+        self.subscribe()
+        dispatcher.connect('Reconnected', self._on_reconnected)
+        dispatcher.connect('UnitRemoved', self._on_unit_removed)
+        dispatcher.connect('JobRemoved', self._on_job_removed)
+        job_tracker.start(subscribed=True)
+        self.watch()
         self._load_properties()
 
     def __del__(self):
-        self.unsubscribe()
+        if self._signals:
+            self.unsubscribe()
         super(Manager, self).__del__()
 
+    def _get_object(self, cls, path, watch=True, lazy=False):
+        """Return the live cls object for path from the identity map, or build and remember a new one.
+
+        A remembered object that is not watched is not kept up to date, so it is reloaded unless lazy is set.
+        """
+        path = str(path)
+        watch = watch and self._signals
+        obj = self._objects.get(path)
+        if obj is not None and isinstance(obj, cls):
+            self.identity_stats['hits'] += 1
+            if not obj._watching:
+                if watch:
+                    obj.watch()
+                if not lazy:
+                    obj._load_properties()
+            return obj
+        self.identity_stats['misses'] += 1
+        obj = cls(path, watch=watch, lazy=lazy)
+        self._objects[path] = obj
+        return obj
+
+    def _forget(self, path):
+        if self._objects.pop(str(path), None) is not None:
+            self.identity_stats['evictions'] += 1
+
+    def _on_reconnected(self, cause):
+        # A new systemd, or a new connection, has no record of our subscription.
+        try:
+            self.subscribe()
+        except SystemdError as error:
+            if error.name != 'AlreadySubscribed':
+                raise
+
+    def _on_unit_removed(self, name, path):
+        self._forget(path)
+
+    def _on_job_removed(self, ID, path, unit, result):
+        self._forget(path)
+
     @raises_systemd_error
     def subscribe(self):
+        # Subscribe on the connection that will receive the signals; see systemd.bus.BusRegistry.get_connection().
+        mainloop.enable()
         self._interface.Subscribe()
 
+    def events(self, members=None, maxsize=4096, overflow='drop_oldest', coalesce=None):
+        """Return a stream of the UnitNew, UnitRemoved, JobNew, JobRemoved, Reloading, Reconnected and PropertiesChanged
+        events.
+
+        The stream is an iterator (and an asynchronous one); see L{systemd.events.EventStream} for the arguments.
+
+        @rtype: L{systemd.events.EventStream}
+        """
+        return EventStream(members=members, maxsize=maxsize, overflow=overflow, coalesce=coalesce)
+
     @raises_systemd_error
     def clear_jobs(self):
         self._interface.ClearJobs()
@@ -85,7 +208,7 @@ class Manager(SystemdDbusObject):
         @rtype: systemd.job.Job
         """
         job_path = self._interface.GetJob(ID)
-        job = Job(job_path)
+        job = self._get_object(Job, job_path)
         return job
 
     @raises_systemd_error
@@ -99,7 +222,7 @@ class Manager(SystemdDbusObject):
         @rtype: systemd.unit.Unit
         """
         unit_path = self._interface.GetUnit(name)
-        unit = Unit(unit_path)
+        unit = self._get_object(unit_class(name), unit_path)
         return unit
 
     @raises_systemd_error
@@ -113,7 +236,7 @@ class Manager(SystemdDbusObject):
         @rtype: systemd.unit.Unit
         """
         unit_path = self._interface.GetUnitByPID(pid)
-        unit = Unit(unit_path)
+        unit = self._get_object(unit_class(path=unit_path), unit_path)
         return unit
 
     @raises_systemd_error
@@ -141,27 +264,89 @@ class Manager(SystemdDbusObject):
         self._interface.KillUnit(name, who, mode, signal)
 
     @raises_systemd_error
-    def list_jobs(self):
+    def list_jobs(self, lazy=True, records=False):
         """List all jobs.
+
+        With lazy=True (the default) this costs a single ListJobs call; the properties of each job are fetched when
+        they are first read.  See L{systemd.base.SystemdDbusObject} for the other values of lazy.
+
+        With records=True, L{systemd.job.JobRecord}s built from the ListJobs reply are returned instead of Jobs.
         
         @raise SystemdError, IndexError: Raised when dbus error or index error
         is raised.
         
         @rtype: A list of L{systemd.unit.Job}
         """
+        if records:
+            return [JobRecord.from_dbus(job) for job in self._interface.ListJobs()]
         jobs = []
         for job in self._interface.ListJobs():
-            jobs.append(Job(job[4]))
+            jobs.append(self._get_object(Job, job[4], lazy=lazy))
         return jobs
 
+    def _list_units(self, states=None, patterns=None, names=None):
+        """Return the ListUnits reply, filtered by the daemon if it can and on this side otherwise.
+
+        The method used is recorded in self.last_list_method and counted in self.list_stats; methods the daemon
+        lacks (UnknownMethod) are remembered and not tried again.
+        """
+        states = list(states or ())
+        patterns = list(patterns or ())
+        names = list(names or ())
+        if names:
+            method, args = 'ListUnitsByNames', (names,)
+        elif patterns:
+            method, args = 'ListUnitsByPatterns', (states, patterns)
+        elif states:
+            method, args = 'ListUnitsFiltered', (states,)
+        else:
+            method, args = 'ListUnits', ()
+
+        if method != 'ListUnits' and method not in self._unsupported_methods:
+            try:
+                units = getattr(self._interface, method)(*args)
+            except dbus.exceptions.DBusException as error:
+                if error.get_dbus_name() != 'org.freedesktop.DBus.Error.UnknownMethod':
+                    raise
+                self._unsupported_methods.add(method)
+            else:
+                self.last_list_method = method
+                self.list_stats[method] += 1
+                if names:
+                    # ListUnitsByNames takes neither states nor patterns.
+                    units = _filter_units(units, states=states, patterns=patterns)
+                return units
+
+        units = self._interface.ListUnits()
+        if method == 'ListUnits':
+            self.last_list_method = method
+        else:
+            units = _filter_units(units, states=states, patterns=patterns, names=names)
+            self.last_list_method = 'client'
+        self.list_stats[self.last_list_method] += 1
+        return units
+
     @raises_systemd_error
-    def list_units(self, watch=True):
+    def list_units(self, watch=True, lazy=True, records=False, states=None, patterns=None, names=None):
         """List all units, inactive units too.
 
-        Warning: each Unit object listens to the corresponding D-Bus object (to be notified of changes).  There is a
-        limit on the number of things that a single D-Bus client can monitor, so if there are too many systemd units,
-        this function will fail.  You can either pass watch=False (to avoid watching for changes to each unit) or use
-        iter_units() instead.
+        The listing can be filtered by the daemon (ListUnitsFiltered, ListUnitsByPatterns or ListUnitsByNames, on
+        systemd versions that have them) so that units that are not wanted are neither sent nor decoded:
+
+        @param states: Only units whose load, active or sub state is one of these (ie: ['active', 'failed']).
+        @param patterns: Only units whose name matches one of these shell globs (ie: ['sshd*', '*.socket']).
+        @param names: Only these units (ListUnitsByNames also loads units that are not loaded yet).
+
+        Older daemons filter on this side instead; see self.last_list_method and self.list_stats.
+
+        With watch=True each Unit object is notified of changes to the corresponding D-Bus object.  This does not add
+        a match rule per unit (see L{systemd.signals.SignalDispatcher}), so it works on hosts with many units.
+
+        With lazy=True (the default) the properties of each unit are fetched when they are first read rather than
+        with one GetAll per unit here.
+
+        With records=True, L{systemd.unit.UnitRecord}s built from the ListUnits reply are returned instead of Units:
+        names, states and job of every unit for a single call and no proxy at all.
         
         @raise SystemdError: Raised when dbus error or index error
         is raised.
@@ -169,16 +354,22 @@ class Manager(SystemdDbusObject):
         @rtype: A list of L{systemd.unit.Unit}
 
         """
+        if records:
+            return [UnitRecord.from_dbus(unit) for unit in self._list_units(states, patterns, names)]
         units = []
-        for unit in self._interface.ListUnits():
-            units.append(Unit(unit[6], watch=watch))
+        for unit in self._list_units(states, patterns, names):
+            units.append(self._get_object(unit_class(unit[0]), unit[6], watch=watch, lazy=lazy))
         return units
 
     @raises_systemd_error
-    def iter_units(self, watch=True):
+    def iter_units(self, watch=True, lazy=True, records=False, states=None, patterns=None, names=None):
         """Return an iterator over all units, including inactive ones.
 
         Iff watch is True, each object will not listen to the underlying D-Bus object for changes.
+
+        With lazy=True (the default) the properties of each unit are fetched when they are first read.  With
+        records=True, L{systemd.unit.UnitRecord}s are yielded instead of Units.  states, patterns and names filter
+        the units as in list_units().
         
         @raise SystemdError: Raised when dbus error or index error
         is raised.
@@ -186,8 +377,11 @@ class Manager(SystemdDbusObject):
         @rtype: An iterator over L{systemd.unit.Unit} objects
 
         """
-        for unit in self._interface.ListUnits():
-            yield Unit(unit[6], watch=watch)
+        for unit in self._list_units(states, patterns, names):
+            if records:
+                yield UnitRecord.from_dbus(unit)
+            else:
+                yield self._get_object(unit_class(unit[0]), unit[6], watch=watch, lazy=lazy)
 
     @raises_systemd_error
     def load_unit(self, name):
@@ -200,7 +394,7 @@ class Manager(SystemdDbusObject):
         @rtype: L{systemd.unit.Unit}
         """
         unit_path = self._interface.LoadUnit(name)
-        unit = Unit(unit_path)
+        unit = self._get_object(unit_class(name), unit_path)
         return unit
 
     @raises_systemd_error
@@ -231,7 +425,7 @@ class Manager(SystemdDbusObject):
         @rtype: L{systemd.job.Job}
         """
         job_path = self._interface.ReloadOrRestartUnit(name, mode)
-        job = Job(job_path)
+        job = self._get_object(Job, job_path)
         return job
 
     @raises_systemd_error
@@ -246,7 +440,7 @@ class Manager(SystemdDbusObject):
         @rtype: L{systemd.job.Job}
         """
         job_path = self._interface.ReloadOrTryRestartUnit(name, mode)
-        job = Job(job_path)
+        job = self._get_object(Job, job_path)
         return job
 
     @raises_systemd_error
@@ -262,7 +456,7 @@ class Manager(SystemdDbusObject):
         @rtype: L{systemd.job.Job}
         """
         job_path = self._interface.ReloadUnit(name, mode)
-        job = Job(job_path)
+        job = self._get_object(Job, job_path)
         return job
 
     @raises_systemd_error
@@ -285,9 +479,132 @@ class Manager(SystemdDbusObject):
         @rtype: L{systemd.job.Job}
         """
         job_path = self._interface.RestartUnit(name, mode)
-        job = Job(job_path)
+        job = self._get_object(Job, job_path)
         return job
 
+    def _bulk_unit_jobs(self, method, names, mode, max_in_flight):
+        pipeline = Pipeline(max_in_flight=max_in_flight)
+        calls = [(name, pipeline.call(self._path, MANAGER_INTERFACE, method, (name, mode))) for name in names]
+        pipeline.wait()
+        results = collections.OrderedDict()
+        for name, call in calls:
+            if call.error is not None:
+                results[name] = SystemdError(call.error)
+            else:
+                results[name] = self._get_object(Job, call.result, lazy=True)
+        return results
+
+    @raises_systemd_error
+    def start_units(self, names, mode, max_in_flight=None):
+        """Start many units at once.
+
+        The StartUnit calls are pipelined (see L{systemd.pipeline.Pipeline}), so this takes about one round trip
+        whatever the number of units.  The returned Jobs are lazy: their properties are fetched when first read.
+
+        @param names: Unit names (ie: network.service).
+        @param mode: Must be one of fail or replace.
+        @param max_in_flight: If set, at most this many calls await their reply at any time.
+
+        @rtype: An ordered dict of each name to its L{systemd.job.Job}, or to the L{SystemdError} it failed with.
+        """
+        return self._bulk_unit_jobs('StartUnit', names, mode, max_in_flight)
+
+    @raises_systemd_error
+    def stop_units(self, names, mode, max_in_flight=None):
+        """Stop many units at once; see start_units()."""
+        return self._bulk_unit_jobs('StopUnit', names, mode, max_in_flight)
+
+    @raises_systemd_error
+    def restart_units(self, names, mode, max_in_flight=None):
+        """Restart many units at once; see start_units()."""
+        return self._bulk_unit_jobs('RestartUnit', names, mode, max_in_flight)
+
+    @raises_systemd_error
+    def reload_units(self, names, mode, max_in_flight=None):
+        """Reload many units at once; see start_units()."""
+        return self._bulk_unit_jobs('ReloadUnit', names, mode, max_in_flight)
+
+    @raises_systemd_error
+    def try_restart_units(self, names, mode, max_in_flight=None):
+        """Try restart many units at once; see start_units()."""
+        return self._bulk_unit_jobs('TryRestartUnit', names, mode, max_in_flight)
+
+    @raises_systemd_error
+    def reload_or_restart_units(self, names, mode, max_in_flight=None):
+        """Reload or restart many units at once; see start_units()."""
+        return self._bulk_unit_jobs('ReloadOrRestartUnit', names, mode, max_in_flight)
+
+    @raises_systemd_error
+    def wait_jobs(self, jobs, timeout=None):
+        """Wait for the given jobs to finish, from their JobRemoved signals (no polling).
+
+        Results of jobs that finished before this call are remembered since the Manager was created, so there is no
+        race between starting a job and waiting for it.
+
+        @param jobs: L{systemd.job.Job} objects (None, as returned for units without a job, is ignored).
+        @param timeout: Seconds to wait at most; None to wait forever.
+
+        @rtype: An ordered dict of each job to its result; see L{systemd.job.Job.wait}.
+        """
+        jobs = [job for job in jobs if job is not None]
+        results = job_tracker.wait([job._path for job in jobs], timeout)
+        return collections.OrderedDict((job, results[job._path]) for job in jobs)
+
+    def dependency_graph(self):
+        """Return the L{systemd.depgraph.DependencyGraph} of the loaded units.
+
+        It is built on first use, from one sweep of pipelined GetAll calls, and then kept current from signals
+        (unless the Manager was built with signals=False, in which case call its build() to refresh it).
+        """
+        if self._dependency_graph is None:
+            self._dependency_graph = DependencyGraph(self, watch=self._signals)
+        return self._dependency_graph
+
+    @raises_systemd_error
+    def fetch_properties(self, units, interfaces=(UNIT_INTERFACE,), names=None, max_in_flight=256):
+        """Fetch the properties of many units at once.
+
+        The GetAll (or Get) calls are pipelined (see L{systemd.pipeline.Pipeline}), so this takes a few round trips
+        whatever the number of units instead of one per unit.
+
+        @param units: Unit names (ie: network.service) or object paths.
+        @param interfaces: The interfaces whose properties are fetched.  A unit lacking one of them (ie: the
+        Service interface of a socket unit) simply has none of its properties.
+        @param names: If given, only these properties are fetched, with one Get per name and interface, instead of
+        everything with GetAll.
+        @param max_in_flight: At most this many calls await their reply at any time.
+
+        @rtype: An ordered dict of each unit (as given) to a dict of its properties, or to the L{SystemdError} it
+        failed with.
+        """
+        pipeline = Pipeline(max_in_flight=max_in_flight)
+        calls = collections.OrderedDict()
+        for unit in units:
+            path = unit if unit.startswith('/') else unit_path(unit)
+            if names is None:
+                calls[unit] = [(interface, None, pipeline.call(path, PROPERTIES_INTERFACE, 'GetAll', (interface,)))
+                               for interface in interfaces]
+            else:
+                calls[unit] = [(interface, name, pipeline.call(path, PROPERTIES_INTERFACE, 'Get', (interface, name)))
+                               for interface in interfaces for name in names]
+        pipeline.wait()
+
+        results = collections.OrderedDict()
+        for unit, unit_calls in calls.items():
+            properties = {}
+            for interface, name, call in unit_calls:
+                if call.error is not None:
+                    if call.error.get_dbus_name() in _MISSING_PROPERTY_ERRORS:
+                        continue
+                    properties = SystemdError(call.error)
+                    break
+                if name is None:
+                    properties.update(decoder.decode_all(interface, call.result))
+                else:
+                    properties[name] = decoder.decode(interface, name, call.result)
+            results[unit] = properties
+        return results
+
     @raises_systemd_error
     def set_environment(self, names):
         self._interface.SetEnvironment(names)
@@ -304,7 +621,7 @@ class Manager(SystemdDbusObject):
         @rtype: L{systemd.job.Job}
         """
         job_path = self._interface.StartUnit(name, mode)
-        job = Job(job_path)
+        job = self._get_object(Job, job_path)
         return job
 
     @raises_systemd_error
@@ -320,7 +637,7 @@ class Manager(SystemdDbusObject):
         @rtype: L{systemd.job.Job}
         """
         job_path = self._interface.StartUnitReplace(old_unit, new_unit, mode)
-        job = Job(job_path)
+        job = self._get_object(Job, job_path)
         return job
 
     @raises_systemd_error
@@ -335,7 +652,7 @@ class Manager(SystemdDbusObject):
         @rtype: L{systemd.job.Job}
         """
         job_path = self._interface.StopUnit(name, mode)
-        job = Job(job_path)
+        job = self._get_object(Job, job_path)
         return job
 
     @raises_systemd_error
@@ -350,7 +667,7 @@ class Manager(SystemdDbusObject):
         @rtype: L{systemd.job.Job}
         """
         job_path = self._interface.TryRestartUnit(name, mode)
-        job = Job(job_path)
+        job = self._get_object(Job, job_path)
         return job
 
     @raises_systemd_error
@@ -361,6 +678,11 @@ class Manager(SystemdDbusObject):
     def unsubscribe(self):
         self._interface.Unsubscribe()
 
+    def _unit_files_changed(self):
+        # Do not wait for inotify or UnitFilesChanged to notice our own changes.
+        if self.unit_file_cache is not None:
+            self.unit_file_cache.invalidate()
+
     @raises_systemd_error
     def enable_unit_files(self, files, runtime=False, force=False):
         """
@@ -375,6 +697,7 @@ class Manager(SystemdDbusObject):
             a(sss)  changes
         """
         carries_install_info, changes = self._interface.EnableUnitFiles(files, runtime, force)
+        self._unit_files_changed()
         return carries_install_info, changes
         
     @raises_systemd_error
@@ -388,6 +711,7 @@ class Manager(SystemdDbusObject):
         @rtype: a(sss) changes
         """
         changes = self._interface.DisableUnitFiles(files, runtime)
+        self._unit_files_changed()
         return changes
         
     @raises_systemd_error
@@ -407,6 +731,7 @@ class Manager(SystemdDbusObject):
             a(sss)  changes
         """
         carries_install_info, changes = self._interface.ReenableUnitFiles(files, runtime, force)
+        self._unit_files_changed()
         return carries_install_info, changes
 
     @raises_systemd_error
@@ -417,7 +742,10 @@ class Manager(SystemdDbusObject):
 
         @rtype: list of 2-tuples of (unit file path, enablement status)
         """
-        return self._interface.ListUnitFiles()
+        if self.unit_file_cache is not None:
+            return self.unit_file_cache.list_unit_files()
+        # Native values, as the cache returns them.
+        return [(str(path), str(state)) for path, state in self._interface.ListUnitFiles()]
 
     @raises_systemd_error
     def get_unit_file_state(self, file_):
@@ -429,7 +757,9 @@ class Manager(SystemdDbusObject):
 
         @rtype: enablement status; one of {'enabled', 'disabled', 'static', ...}
         """
-        return self._interface.GetUnitFileState(file_)
+        if self.unit_file_cache is not None:
+            return self.unit_file_cache.get_unit_file_state(file_)
+        return str(self._interface.GetUnitFileState(file_))
         
     # def link_unit_files(self, files, runtime, force):
     #     pass
@@ -444,8 +774,9 @@ class Manager(SystemdDbusObject):
     #     pass
 
     @raises_systemd_error
-    def set_default_target(self, name):
-        changes = self._interface.SetDefaultTarget(name)
+    def set_default_target(self, name, force=False):
+        changes = self._interface.SetDefaultTarget(name, force)
+        self._unit_files_changed()
         return changes
 
     @raises_systemd_error
@@ -455,7 +786,116 @@ class Manager(SystemdDbusObject):
         """
         return self._interface.GetDefaultTarget()
     
-    # def set_unit_properties(name, runtime, properties):
+    @raises_systemd_error
+    def set_unit_properties(self, name, runtime, properties):
+        """Set properties of a unit (ie: its resource limits), as systemctl set-property does.
+
+        @param name: Unit name (ie: network.service).
+        @param runtime: If True, the change is lost at the next reboot.
+        @param properties: dict (or (name, value) pairs) of unit properties, converted to the D-Bus types systemd
+        expects (ie: {'CPUQuota': '150%', 'MemoryMax': 2 ** 30, 'TasksMax': None}); see L{systemd.encode}.
+
+        @raise SystemdError: Raised when no unit is found with the given name or a property is refused.
+        @raise ValueError: Raised when a property cannot be converted to its D-Bus type.
+        """
+        self._interface.SetUnitProperties(name, runtime, encode_properties(properties))
+
+    @raises_systemd_error
+    def set_units_properties(self, updates, runtime=False, skip_unchanged=True, max_in_flight=None):
+        """Set properties of many units at once; see set_unit_properties().
+
+        The SetUnitProperties calls are pipelined (see L{systemd.pipeline.Pipeline}), so this takes about one round
+        trip whatever the number of units.  With skip_unchanged, properties equal to those cached on the Unit objects
+        of this Manager are not sent, and a unit left with nothing to set costs no call.  Only watched units (see
+        list_units()) are trusted to hold current values; the cache of a unit is updated once its call succeeded.
+        What was written and skipped is counted in self.property_write_stats.
+
+        @param updates: dict (or (name, properties) pairs) of unit names to their properties to set.
+        @param max_in_flight: If set, at most this many calls await their reply at any time.
+
+        @raise ValueError: Raised, before anything is sent, when a property cannot be converted to its D-Bus type.
+
+        @rtype: An ordered dict of each unit name to the names of the properties written (empty if all were
+        skipped), or to the L{SystemdError} it failed with.
+        """
+        if isinstance(updates, dict):
+            updates = updates.items()
+        writes = collections.OrderedDict()
+        for name, properties in updates:
+            if isinstance(properties, dict):
+                properties = properties.items()
+            encoded = [encode_value(key, value) for key, value in properties]
+            if skip_unchanged:
+                cached = self._cached_properties(name)
+                if cached is not None:
+                    changed = [(key, value) for key, value in encoded if not _same_value(cached, key, value)]
+                    self.property_write_stats['skipped'] += len(encoded) - len(changed)
+                    encoded = changed
+            writes[name] = encoded
+
+        pipeline = Pipeline(max_in_flight=max_in_flight)
+        calls = collections.OrderedDict()
+        for name, encoded in writes.items():
+            if encoded:
+                arguments = (name, runtime, encode_properties(encoded))
+                calls[name] = pipeline.call(self._path, MANAGER_INTERFACE, 'SetUnitProperties', arguments)
+        pipeline.wait()
+
+        results = collections.OrderedDict()
+        for name, encoded in writes.items():
+            call = calls.get(name)
+            if call is not None and call.error is not None:
+                results[name] = SystemdError(call.error)
+                self.property_write_stats['errors'] += 1
+                continue
+            if call is not None:
+                self.property_write_stats['calls'] += 1
+                self.property_write_stats['written'] += len(encoded)
+                self._update_cached_properties(name, encoded)
+            results[name] = [key for key, value in encoded]
+        return results
+
+    def _cached_properties(self, name):
+        """Return the loaded properties of the live, watched Unit object of name, or None if there is none."""
+        obj = self._objects.get(unit_path(name))
+        if obj is None or not obj._watching:
+            return None
+        properties = obj.__dict__.get('properties')
+        # Lazily fetched ones (lazy='each') would cost a Get per property compared.
+        return properties if isinstance(properties, CompactProperty) else None
+
+    def _update_cached_properties(self, name, encoded):
+        obj = self._objects.get(unit_path(name))
+        properties = obj.__dict__.get('properties') if obj is not None else None
+        if properties is None:
+            return
+        # Only the values already loaded: looking the others up would fetch them (ie: from a LazyProperty).
+        loaded = vars(properties)
+        for key, value in encoded:
+            if key in loaded:
+                setattr(properties, key, decoder.decode(obj.__dbus_interace__, key, value))
+
+    @raises_systemd_error
+    def start_transient_unit(self, name, mode, properties, aux=()):
+        """Create and start a transient unit, as systemd-run does.
+
+        @param name: Unit name (ie: run-backup.service, or run-1234.scope with the PIDs property).
+        @param mode: Must be one of fail or replace.
+        @param properties: dict (or (name, value) pairs) of unit properties, converted to the D-Bus types systemd
+        expects (ie: {'ExecStart': ['/bin/backup', '--full'], 'MemoryMax': 2 ** 30}); see L{systemd.encode}.
+        @param aux: Auxiliary units created along with it, as a dict (or pairs) of their name to their properties.
+
+        @raise SystemdError: Raised when the unit exists already or a property is refused.
+        @raise ValueError: Raised when a property cannot be converted to its D-Bus type.
+
+        @rtype: L{systemd.job.Job}
+        """
+        job_path = self._interface.StartTransientUnit(name, mode, encode_properties(properties), encode_aux(aux))
+        # Lazy: the job of a transient unit (ie: a scope) is often over before its properties could be fetched.
+        job = self._get_object(Job, job_path, lazy=True)
+        return job
 
-    # def start_transient_unit(name, mode, properties, aux):
+    def transient_launcher(self, mode='fail', max_in_flight=64):
+        """Return a L{systemd.transient.TransientLauncher}, to start many transient units with pipelined calls."""
+        return TransientLauncher(mode=mode, max_in_flight=max_in_flight)
     
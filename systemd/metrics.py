@@ -0,0 +1,189 @@
+"""Opt-in instrumentation of the D-Bus calls made to systemd.
+
+Every method call (including the Get/GetAll calls that load properties) goes through systemd.schema.SchemaInterface
+or systemd.pipeline.Pipeline; while at least one hook is registered, each completed call is reported to every hook as
+a L{CallRecord}.  With no hook registered nothing is measured.
+
+    >>> collector = metrics.enable()
+    >>> manager.list_units()
+    >>> collector.report()['org.freedesktop.systemd1.Manager.ListUnits']['calls']
+    1
+
+dbus-python does not expose the size of messages, so byte counts are not available; the number of properties decoded
+by Get and GetAll replies is counted instead.
+"""
+
+import bisect
+import collections
+import threading
+import time
+
+import dbus.exceptions
+
+# Not imported from systemd.bus, which imports this module (through systemd.schema).
+PROPERTIES_INTERFACE = 'org.freedesktop.DBus.Properties'
+
+# Upper bounds of the latency histogram buckets, in seconds; the last bucket counts everything slower.
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class CallRecord(collections.namedtuple('CallRecord', (
+        'path', 'interface', 'method', 'duration', 'error', 'properties'))):
+    """One completed call: `duration` in seconds, `error` the D-Bus error name or None, `properties` the number of
+    properties in its reply (Get and GetAll only)."""
+
+    __slots__ = ()
+
+
+_hooks = []
+_lock = threading.Lock()
+
+
+def add_hook(hook):
+    """Call hook(record) with a L{CallRecord} after each D-Bus call to systemd; hooks run in the calling thread, or
+    in the main loop thread for asynchronous calls, and must be quick."""
+    with _lock:
+        _hooks.append(hook)
+
+
+def remove_hook(hook):
+    with _lock:
+        if hook in _hooks:
+            _hooks.remove(hook)
+
+
+def active():
+    return bool(_hooks)
+
+
+def _count_properties(method, reply):
+    if method == 'GetAll':
+        return len(reply)
+    if method == 'Get':
+        return 1
+    return 0
+
+
+def record(path, interface, method, duration, error=None, reply=None):
+    if isinstance(error, dbus.exceptions.DBusException):
+        error = error.get_dbus_name()
+    elif error is not None:
+        error = type(error).__name__
+    properties = _count_properties(method, reply) if error is None and interface == PROPERTIES_INTERFACE else 0
+    call = CallRecord(path, interface, method, duration, error, properties)
+    for hook in list(_hooks):
+        hook(call)
+
+
+class MeasuredMethod(object):
+    """Wrap a proxy method so that each call, blocking or with reply_handler/error_handler, is recorded."""
+
+    def __init__(self, method, path, interface, member):
+        self._method = method
+        self._path = path
+        self._interface = interface
+        self._member = member
+
+    def __call__(self, *args, **kwargs):
+        start = time.perf_counter()
+        reply_handler = kwargs.get('reply_handler')
+        if reply_handler is not None:
+            error_handler = kwargs.get('error_handler')
+
+            def on_reply(*result):
+                record(self._path, self._interface, self._member, time.perf_counter() - start,
+                       reply=result[0] if len(result) == 1 else None)
+                reply_handler(*result)
+
+            def on_error(error):
+                record(self._path, self._interface, self._member, time.perf_counter() - start, error=error)
+                if error_handler is not None:
+                    error_handler(error)
+
+            kwargs['reply_handler'] = on_reply
+            kwargs['error_handler'] = on_error
+            return self._method(*args, **kwargs)
+        try:
+            reply = self._method(*args, **kwargs)
+        except Exception as error:
+            record(self._path, self._interface, self._member, time.perf_counter() - start, error=error)
+            raise
+        record(self._path, self._interface, self._member, time.perf_counter() - start, reply=reply)
+        return reply
+
+
+class MethodStats(object):
+    """Aggregated calls of one method."""
+
+    __slots__ = ('calls', 'errors', 'total_time', 'max_time', 'histogram', 'properties')
+
+    def __init__(self, n_buckets):
+        self.calls = 0
+        self.errors = collections.Counter()
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.histogram = [0] * (n_buckets + 1)
+        self.properties = 0
+
+
+class CallMetrics(object):
+    """A hook aggregating calls per interface and method: count, latency histogram, errors by D-Bus error name and
+    properties decoded.
+
+    @param buckets: Upper bounds of the latency histogram buckets, in seconds.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.methods = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, call):
+        key = '%s.%s' % (call.interface, call.method)
+        with self._lock:
+            stats = self.methods.get(key)
+            if stats is None:
+                stats = self.methods[key] = MethodStats(len(self.buckets))
+            stats.calls += 1
+            stats.total_time += call.duration
+            stats.max_time = max(stats.max_time, call.duration)
+            stats.histogram[bisect.bisect_left(self.buckets, call.duration)] += 1
+            stats.properties += call.properties
+            if call.error is not None:
+                stats.errors[call.error] += 1
+
+    def reset(self):
+        with self._lock:
+            self.methods.clear()
+
+    def report(self):
+        """Return the statistics as plain dicts (ie: for JSON), keyed by 'interface.method', slowest total first."""
+        with self._lock:
+            items = sorted(self.methods.items(), key=lambda item: item[1].total_time, reverse=True)
+            return collections.OrderedDict((key, {
+                'calls': stats.calls,
+                'errors': dict(stats.errors),
+                'total_time': stats.total_time,
+                'mean_time': stats.total_time / stats.calls,
+                'max_time': stats.max_time,
+                'histogram': collections.OrderedDict(
+                    [('%g' % bound, count) for bound, count in zip(self.buckets, stats.histogram)] +
+                    [('+inf', stats.histogram[-1])]),
+                'properties': stats.properties,
+            }) for key, stats in items)
+
+
+def enable(buckets=LATENCY_BUCKETS):
+    """Register a new L{CallMetrics} hook and return it."""
+    collector = CallMetrics(buckets)
+    add_hook(collector)
+    return collector
+
+
+def disable(collector=None):
+    """Unregister collector, or every hook if None."""
+    if collector is not None:
+        remove_hook(collector)
+        return
+    with _lock:
+        del _hooks[:]
@@ -1,7 +1,7 @@
-from .base import SystemdDbusObject
+from .unit import Unit
 
 
-class Mount(SystemdDbusObject):
+class Mount(Unit):
     """Abstraction class to org.freedesktop.systemd1.Mount interface"""
 
     __dbus_interace__ = 'org.freedesktop.systemd1.Mount'
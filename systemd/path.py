@@ -1,8 +1,7 @@
-from .base import SystemdDbusObject
+from .unit import Unit
 
 
-class Path(SystemdDbusObject):
+class Path(Unit):
     """Abstraction class to org.freedesktop.systemd1.Path interface"""
 
     __dbus_interace__ = 'org.freedesktop.systemd1.Path'
-
@@ -0,0 +1,125 @@
+import collections
+import threading
+import time
+
+import dbus.exceptions
+import dbus.lowlevel
+
+from . import metrics
+from .bus import registry
+from .schema import get_signature
+
+
+# Notified as replies are handled, for the calls waited for from another thread than the one handling their reply (ie:
+# while the main loop runs in the thread of systemd.mainloop.start_thread()).
+_handled = threading.Condition()
+
+
+class PipelinedCall(object):
+    """A method call sent by a Pipeline; its reply is available once `done` is True.
+
+    The callback, if any, is called with the call once its reply arrived, and before `done` is set; it reads the reply
+    from `values` and `error` (waiting for the call from there would never end).
+    """
+
+    __slots__ = ('path', 'interface', 'method', 'values', 'error', 'done', 'callback', '_pending', '_started')
+
+    def __init__(self, path, interface, method, callback=None):
+        self.path = path
+        self.interface = interface
+        self.method = method
+        self.callback = callback
+        self.values = None
+        self.error = None
+        self.done = False
+        self._pending = None
+        self._started = time.perf_counter() if metrics.active() else None
+
+    def _on_reply(self, message):
+        try:
+            if isinstance(message, dbus.lowlevel.ErrorMessage):
+                self.error = dbus.exceptions.DBusException(*message.get_args_list(), name=message.get_error_name())
+            else:
+                self.values = message.get_args_list()
+            if self._started is not None:
+                reply = self.values[0] if self.values and len(self.values) == 1 else None
+                metrics.record(self.path, self.interface, self.method, time.perf_counter() - self._started,
+                               error=self.error, reply=reply)
+            if self.callback is not None:
+                self.callback(self)
+        finally:
+            # Even if the callback failed, or waiting for the call would never end.
+            with _handled:
+                self.done = True
+                self._pending = None
+                _handled.notify_all()
+
+    def wait(self):
+        pending = self._pending
+        if self.done or pending is None:
+            return
+        pending.block()
+        # block() returns once the reply is received, but the main loop thread may still be handling it.
+        if not self.done:
+            with _handled:
+                _handled.wait_for(lambda: self.done)
+
+    @property
+    def result(self):
+        """The reply: its only value, None if it has none, or a tuple.  Raises the D-Bus error if the call failed."""
+        self.wait()
+        if self.error is not None:
+            raise self.error
+        if not self.values:
+            return None
+        if len(self.values) == 1:
+            return self.values[0]
+        return tuple(self.values)
+
+
+class Pipeline(object):
+    """Send many method calls to systemd without waiting for each reply in turn.
+
+    Calls are written to the connection as soon as they are made and their replies are collected with wait(), so N
+    calls cost about one round trip instead of N.  This works with or without a main loop: replies are read by
+    blocking on the pending calls (dbus.lowlevel.PendingCall.block()) when no main loop dispatches them first.
+
+    @param max_in_flight: If set, at most this many calls await their reply; making another one first waits for
+    the oldest.
+    @param timeout: Reply timeout of each call, in seconds; -1 for the libdbus default.
+    """
+
+    def __init__(self, max_in_flight=None, timeout=-1):
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self._in_flight = collections.deque()
+
+    def call(self, path, interface, method, args=(), signature=None, callback=None):
+        """Send interface.method(*args) to path and return its L{PipelinedCall}.
+
+        The signature comes from systemd.schema unless given; callback(call) is called when the reply arrives.
+        """
+        if self.max_in_flight:
+            self._in_flight = collections.deque(call for call in self._in_flight if not call.done)
+            while len(self._in_flight) >= self.max_in_flight:
+                self._in_flight.popleft().wait()
+        if signature is None:
+            signature = get_signature(interface, method)
+        message = dbus.lowlevel.MethodCallMessage(registry.get_owner(), path, interface, method)
+        if signature is None:
+            message.append(*args)
+        else:
+            message.append(signature=signature, *args)
+        call = PipelinedCall(path, interface, method, callback)
+        call._pending = registry.get_connection().send_message_with_reply(
+            message, call._on_reply, self.timeout, require_main_loop=False)
+        self._in_flight.append(call)
+        return call
+
+    def wait(self):
+        """Wait for the reply of every call made so far."""
+        while self._in_flight:
+            self._in_flight.popleft().wait()
+
+    def __len__(self):
+        return sum(1 for call in self._in_flight if not call.done)
@@ -1,2 +1,128 @@
-class Property(object):
+import abc
+import copy
+
+
+class Property(object, metaclass=abc.ABCMeta):
     pass
+
+
+class LazyProperty(Property):
+    """A Property whose values are fetched one at a time, the first time each one is read.
+
+    @param loader: Callable taking a property name and returning its value; it must raise AttributeError for
+    properties that do not exist.
+    """
+
+    def __init__(self, loader):
+        self._loader = loader
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        value = self._loader(name)
+        setattr(self, name, value)
+        return value
+
+
+class PropertyTable(object):
+    """The names of the properties of one interface and their positions, shared by every CompactProperty of it."""
+
+    def __init__(self):
+        self.index = {}
+        self.names = []
+
+    def position(self, name):
+        position = self.index.get(name)
+        if position is None:
+            position = self.index[name] = len(self.names)
+            self.names.append(name)
+        return position
+
+
+_tables = {}
+
+# Value of a property a CompactProperty does not have (ie: added to the table by another object).
+_MISSING = object()
+
+
+def property_table(interface):
+    """Return the L{PropertyTable} shared by the CompactProperty objects of interface."""
+    table = _tables.get(interface)
+    if table is None:
+        table = _tables.setdefault(interface, PropertyTable())
+    return table
+
+
+class CompactProperty(object):
+    """Property values stored in a list indexed by a table of names shared by every object of the same interface.
+
+    Attributes are read, set and deleted as on L{Property} (which it is registered as), but an object costs a list
+    of values instead of a __dict__ holding its own copy of every key, which matters when the ~80 properties of
+    thousands of units are kept in memory.
+    """
+
+    __slots__ = ('_table', '_values')
+
+    def __init__(self, table, properties=None):
+        object.__setattr__(self, '_table', table)
+        object.__setattr__(self, '_values', [])
+        if properties:
+            positions = [table.position(name) for name in properties]
+            values = [_MISSING] * len(table.names)
+            for position, value in zip(positions, properties.values()):
+                values[position] = value
+            object.__setattr__(self, '_values', values)
+
+    def __getattr__(self, name):
+        # Only called for names that are not slots; a missing slot (ie: while copy or pickle rebuilds the object)
+        # must not be looked up in the table, which is itself a slot.
+        if name.startswith('_'):
+            raise AttributeError(name)
+        position = self._table.index.get(name)
+        if position is None or position >= len(self._values) or self._values[position] is _MISSING:
+            raise AttributeError(name)
+        return self._values[position]
+
+    def __setattr__(self, name, value):
+        if name in CompactProperty.__slots__:
+            object.__setattr__(self, name, value)
+            return
+        position = self._table.position(name)
+        values = self._values
+        if position >= len(values):
+            values.extend([_MISSING] * (position + 1 - len(values)))
+        values[position] = value
+
+    def __delattr__(self, name):
+        position = self._table.index.get(name)
+        if position is None or position >= len(self._values) or self._values[position] is _MISSING:
+            raise AttributeError(name)
+        self._values[position] = _MISSING
+
+    def _asdict(self):
+        return dict((name, value) for name, value in zip(self._table.names, self._values) if value is not _MISSING)
+
+    @property
+    def __dict__(self):
+        """A copy of the values, by name, so that vars() works as on Property; changing it changes nothing."""
+        return self._asdict()
+
+    # Copies share the table of the original; a pickled object brings a copy of its table along.
+
+    def __copy__(self):
+        return CompactProperty(self._table, self._asdict())
+
+    def __deepcopy__(self, memo):
+        return CompactProperty(self._table, copy.deepcopy(self._asdict(), memo))
+
+    def __reduce__(self):
+        return CompactProperty, (self._table, self._asdict())
+
+    def __dir__(self):
+        return sorted(self._asdict())
+
+    def __repr__(self):
+        return '<%s %s>' % (self.__class__.__name__, self._asdict())
+
+
+Property.register(CompactProperty)
@@ -0,0 +1,167 @@
+"""Static description of the systemd D-Bus interfaces.
+
+Proxies are built with introspection turned off (see systemd.bus), so the argument signatures that dbus-python would
+otherwise learn from an Introspect round trip are taken from here instead.  Each interface maps a method name to a
+2-tuple of (in_signature, out_signature), as documented at https://www.freedesktop.org/wiki/Software/systemd/dbus/
+"""
+
+import dbus
+
+from . import metrics
+
+
+_UNIT_LIST = 'a(ssssssouso)'
+_JOB_LIST = 'a(usssoo)'
+_CHANGES = 'a(sss)'
+_PROCESSES = 'a(sus)'
+
+_PROCESS_METHODS = {
+    'GetProcesses': ('', _PROCESSES),
+    'AttachProcesses': ('sau', ''),
+}
+
+INTERFACES = {
+    'org.freedesktop.DBus.Properties': {
+        'Get': ('ss', 'v'),
+        'GetAll': ('s', 'a{sv}'),
+        'Set': ('ssv', ''),
+    },
+    'org.freedesktop.systemd1.Manager': {
+        'GetUnit': ('s', 'o'),
+        'GetUnitByPID': ('u', 'o'),
+        'LoadUnit': ('s', 'o'),
+        'StartUnit': ('ss', 'o'),
+        'StartUnitReplace': ('sss', 'o'),
+        'StopUnit': ('ss', 'o'),
+        'ReloadUnit': ('ss', 'o'),
+        'RestartUnit': ('ss', 'o'),
+        'TryRestartUnit': ('ss', 'o'),
+        'ReloadOrRestartUnit': ('ss', 'o'),
+        'ReloadOrTryRestartUnit': ('ss', 'o'),
+        'KillUnit': ('ssi', ''),
+        'ResetFailedUnit': ('s', ''),
+        'SetUnitProperties': ('sba(sv)', ''),
+        'StartTransientUnit': ('ssa(sv)a(sa(sv))', 'o'),
+        'GetUnitProcesses': ('s', _PROCESSES),
+        'GetJob': ('u', 'o'),
+        'CancelJob': ('u', ''),
+        'ClearJobs': ('', ''),
+        'ResetFailed': ('', ''),
+        'ListUnits': ('', _UNIT_LIST),
+        'ListUnitsFiltered': ('as', _UNIT_LIST),
+        'ListUnitsByPatterns': ('asas', _UNIT_LIST),
+        'ListUnitsByNames': ('as', _UNIT_LIST),
+        'ListJobs': ('', _JOB_LIST),
+        'Subscribe': ('', ''),
+        'Unsubscribe': ('', ''),
+        'CreateSnapshot': ('sb', 'o'),
+        'RemoveSnapshot': ('s', ''),
+        'Reload': ('', ''),
+        'Reexecute': ('', ''),
+        'Exit': ('', ''),
+        'Reboot': ('', ''),
+        'PowerOff': ('', ''),
+        'Halt': ('', ''),
+        'KExec': ('', ''),
+        'SwitchRoot': ('ss', ''),
+        'SetEnvironment': ('as', ''),
+        'UnsetEnvironment': ('as', ''),
+        'UnsetAndSetEnvironment': ('asas', ''),
+        'ListUnitFiles': ('', 'a(ss)'),
+        'ListUnitFilesByPatterns': ('asas', 'a(ss)'),
+        'GetUnitFileState': ('s', 's'),
+        'EnableUnitFiles': ('asbb', 'b' + _CHANGES),
+        'DisableUnitFiles': ('asb', _CHANGES),
+        'ReenableUnitFiles': ('asbb', 'b' + _CHANGES),
+        'LinkUnitFiles': ('asbb', _CHANGES),
+        'PresetUnitFiles': ('asbb', 'b' + _CHANGES),
+        'MaskUnitFiles': ('asbb', _CHANGES),
+        'UnmaskUnitFiles': ('asb', _CHANGES),
+        'SetDefaultTarget': ('sb', _CHANGES),
+        'GetDefaultTarget': ('', 's'),
+    },
+    'org.freedesktop.systemd1.Unit': {
+        'Start': ('s', 'o'),
+        'Stop': ('s', 'o'),
+        'Reload': ('s', 'o'),
+        'Restart': ('s', 'o'),
+        'TryRestart': ('s', 'o'),
+        'ReloadOrRestart': ('s', 'o'),
+        'ReloadOrTryRestart': ('s', 'o'),
+        'Kill': ('si', ''),
+        'ResetFailed': ('', ''),
+        'SetProperties': ('ba(sv)', ''),
+        'Ref': ('', ''),
+        'Unref': ('', ''),
+    },
+    'org.freedesktop.systemd1.Job': {
+        'Cancel': ('', ''),
+        'GetAfter': ('', _JOB_LIST),
+        'GetBefore': ('', _JOB_LIST),
+    },
+    'org.freedesktop.systemd1.Snapshot': {
+        'Remove': ('', ''),
+    },
+    'org.freedesktop.systemd1.Service': dict(_PROCESS_METHODS),
+    'org.freedesktop.systemd1.Socket': dict(_PROCESS_METHODS),
+    'org.freedesktop.systemd1.Mount': dict(_PROCESS_METHODS),
+    'org.freedesktop.systemd1.Swap': dict(_PROCESS_METHODS),
+    'org.freedesktop.systemd1.Scope': dict(_PROCESS_METHODS, Abandon=('', '')),
+    'org.freedesktop.systemd1.Slice': dict(_PROCESS_METHODS),
+    'org.freedesktop.systemd1.Timer': {},
+    'org.freedesktop.systemd1.Path': {},
+    'org.freedesktop.systemd1.Device': {},
+    'org.freedesktop.systemd1.Automount': {},
+    'org.freedesktop.systemd1.Target': {},
+}
+
+
+def get_signature(interface, method):
+    """Return the in_signature of interface.method, or None if it is not described here."""
+    try:
+        return INTERFACES[interface][method][0]
+    except KeyError:
+        return None
+
+
+def count_arguments(signature):
+    """Return the number of complete types (ie: arguments) in a D-Bus signature."""
+    return len(list(dbus.Signature(signature)))
+
+
+class _SignedMethod(object):
+    """Call a proxy method with the signature from the schema instead of a guessed one.
+
+    If the number of arguments does not match the schema (ie: an older or newer systemd with a different signature),
+    the signature is left for dbus-python to guess, as it would without introspection data.
+    """
+
+    def __init__(self, method, signature):
+        self._method = method
+        self._signature = signature
+        self._n_args = count_arguments(signature)
+
+    def __call__(self, *args, **kwargs):
+        if 'signature' not in kwargs and len(args) == self._n_args:
+            kwargs['signature'] = self._signature
+        return self._method(*args, **kwargs)
+
+
+class SchemaInterface(dbus.Interface):
+    """A dbus.Interface whose methods are called with the signatures from INTERFACES."""
+
+    def get_dbus_method(self, member, dbus_interface=None):
+        if dbus_interface is None:
+            dbus_interface = self.dbus_interface
+        method = self._obj.get_dbus_method(member, dbus_interface)
+        signature = get_signature(dbus_interface, member)
+        if signature is not None:
+            method = _SignedMethod(method, signature)
+        if metrics.active():
+            method = metrics.MeasuredMethod(method, self._obj.object_path, dbus_interface, member)
+        return method
+
+    def __getattr__(self, member):
+        if member.startswith('__') and member.endswith('__'):
+            raise AttributeError(member)
+        return self.get_dbus_method(member)
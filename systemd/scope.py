@@ -0,0 +1,7 @@
+from .unit import Unit
+
+
+class Scope(Unit):
+    """Abstraction class to org.freedesktop.systemd1.Scope interface"""
+
+    __dbus_interace__ = 'org.freedesktop.systemd1.Scope'
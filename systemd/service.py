@@ -1,7 +1,7 @@
-from .base import SystemdDbusObject
+from .unit import Unit
 
 
-class Service(SystemdDbusObject):
+class Service(Unit):
     """Abstraction class to org.freedesktop.systemd1.Service interface"""
 
     __dbus_interace__ = 'org.freedesktop.systemd1.Service'
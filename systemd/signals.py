@@ -0,0 +1,228 @@
+import collections
+import threading
+import time
+import weakref
+
+import dbus.exceptions
+
+from . import mainloop
+from .bus import registry, SYSTEMD_BUS_NAME, SYSTEMD_OBJECT_PATH, PROPERTIES_INTERFACE, MANAGER_INTERFACE
+
+
+DBUS_NAME = 'org.freedesktop.DBus'
+DBUS_PATH = '/org/freedesktop/DBus'
+
+# Seconds before trying to connect again once the connection was lost, doubled after each failure up to the maximum.
+RECONNECT_DELAY = 0.01
+RECONNECT_MAX_DELAY = 5.0
+
+
+def _weak_callback(callback):
+    if hasattr(callback, '__self__'):
+        return weakref.WeakMethod(callback)
+    return lambda: callback
+
+
+class SignalDispatcher(object):
+    """Route the signals of systemd to the live objects interested in them.
+
+    Instead of one match rule per watched object (which is what connect_to_signal() does, and what made
+    list_units(watch=True) fail on hosts with many units), a single receiver matches PropertiesChanged from
+    org.freedesktop.systemd1 on every path, and signals are handed to the watchers of their path.  Watchers are held
+    in weak sets, so an object that is garbage collected stops being notified without any bookkeeping on the bus.
+
+    A second receiver takes the signals of the Manager interface (UnitNew, JobRemoved, ...) and hands them to the
+    callbacks registered with connect(); bound methods are held weakly too.  Callbacks connected to
+    'PropertiesChanged' get that signal for every path, as (interface, changed, invalidated, path).
+
+    The dispatcher also follows the NameOwnerChanged signal of org.freedesktop.systemd1 and the state of the
+    connection.  When systemd gets a new owner (ie: after daemon-reexec) the registry drops the proxies bound to the
+    old one, and when the connection is lost a new one is made, retrying with a capped backoff; the same happens
+    right away when the registry replaces the connection (see L{systemd.bus.BusRegistry.configure}).  Either way the
+    match rules are added again if needed, the watched objects whose properties were loaded are marked stale (they
+    are fetched again when next read, so recovery costs no rescan) and the callbacks connected to 'Reconnected' are
+    called with the cause ('owner_changed', 'reconnected' or 'replaced'), which is where subscriptions are renewed.
+    Recoveries are counted in `stats` and the time the last one took is kept in `last_recovery`.
+    """
+
+    def __init__(self, registry):
+        self.stats = collections.Counter()
+        self._registry = registry
+        self._connection = None
+        self._matches = []
+        self._watchers = {}
+        self._listeners = {}
+        self._lock = threading.RLock()
+        self._reconnecting = False
+        # Bumped by each new round of reconnection attempts, so that those still scheduled from an older one stop.
+        self._attempt = 0
+        self.last_recovery = None
+        registry.call_on_replaced(self._on_replaced)
+
+    def _connect(self):
+        # Signals are only dispatched by a main loop.
+        mainloop.enable()
+        connection = self._registry.get_connection()
+        if connection is self._connection:
+            return
+        self._remove_matches()
+        self._connection = connection
+        # Signals have no sender on a peer-to-peer connection, where only systemd can send them anyway.
+        peer = self._registry.peer
+        sender = None if peer else SYSTEMD_BUS_NAME
+        self._matches.append(connection.add_signal_receiver(
+            self._on_properties_changed, 'PropertiesChanged', PROPERTIES_INTERFACE, sender, path_keyword='path'))
+        self._matches.append(connection.add_signal_receiver(
+            self._on_manager_signal, None, MANAGER_INTERFACE, sender, SYSTEMD_OBJECT_PATH, member_keyword='member'))
+        if not peer:
+            # A re-exec of systemd drops a peer-to-peer connection, so only the bus needs to report it.
+            self._matches.append(connection.add_signal_receiver(
+                self._on_name_owner_changed, 'NameOwnerChanged', DBUS_NAME, DBUS_NAME, DBUS_PATH,
+                arg0=SYSTEMD_BUS_NAME))
+        connection.call_on_disconnection(self._on_disconnected)
+
+    def _remove_matches(self):
+        for match in self._matches:
+            match.remove()
+        self._matches = []
+        self._connection = None
+
+    def _on_name_owner_changed(self, name, old_owner, new_owner):
+        self._registry.owner_changed(new_owner)
+        if new_owner:
+            self._recover('owner_changed')
+
+    def _on_disconnected(self, connection):
+        with self._lock:
+            if connection is not self._connection:
+                return
+            # The match rules went with the connection; there is nothing to remove them from.
+            self._matches = []
+            self._connection = None
+            if self._reconnecting:
+                return
+            self._reconnecting = True
+            self._attempt += 1
+            attempt = self._attempt
+        self.stats['disconnections'] += 1
+        self._registry.connection_lost(connection)
+        mainloop.call_later(RECONNECT_DELAY, self._reconnect, RECONNECT_DELAY, attempt, 'reconnected')
+
+    def _on_replaced(self):
+        # The registry closed the connection on purpose (ie: configure()).  Its Disconnected signal comes later, if
+        # at all, and nothing else would move the match rules and listeners to the new connection: do it now.
+        with self._lock:
+            if self._connection is None and not self._reconnecting:
+                # Never attached (so nothing to move), or already being reattached.
+                return
+            self._matches = []
+            self._connection = None
+            self._reconnecting = True
+            self._attempt += 1
+            attempt = self._attempt
+        self.stats['replacements'] += 1
+        self._reconnect(RECONNECT_DELAY, attempt, 'replaced')
+
+    def _reconnect(self, delay, attempt, cause):
+        with self._lock:
+            if attempt != self._attempt:
+                # Superseded by a later replacement.
+                return
+        self.stats['reconnect_attempts'] += 1
+        try:
+            with self._lock:
+                self._connect()
+            self._registry.get_owner()
+        except dbus.exceptions.DBusException:
+            delay = min(delay * 2, RECONNECT_MAX_DELAY)
+            mainloop.call_later(delay, self._reconnect, delay, attempt, cause)
+            return
+        with self._lock:
+            self._reconnecting = False
+        self._recover(cause)
+
+    def _recover(self, cause):
+        """Mark the loaded properties of every watched object stale and call the 'Reconnected' callbacks."""
+        started = time.perf_counter()
+        with self._lock:
+            objs = [obj for watchers in self._watchers.values() for obj in watchers]
+        for obj in objs:
+            obj._mark_stale()
+        self.stats['recoveries_%s' % cause] += 1
+        self._notify('Reconnected', (cause,))
+        self.last_recovery = time.perf_counter() - started
+
+    def watch(self, obj):
+        """Call obj._on_properties_changed() for each PropertiesChanged signal emitted on obj._path."""
+        with self._lock:
+            self._connect()
+            self._watchers.setdefault(obj._path, weakref.WeakSet()).add(obj)
+
+    def unwatch(self, obj):
+        with self._lock:
+            watchers = self._watchers.get(obj._path)
+            if watchers is None:
+                return
+            watchers.discard(obj)
+            if not watchers:
+                del self._watchers[obj._path]
+
+    def is_watched(self, obj):
+        watchers = self._watchers.get(obj._path)
+        return watchers is not None and obj in watchers
+
+    def connect(self, member, callback):
+        """Call callback(*args) for each `member` signal (ie: 'JobRemoved') of org.freedesktop.systemd1.Manager.
+
+        Signals of the Manager interface are only sent to subscribed clients; see L{systemd.manager.Manager}.  The
+        member 'Reconnected' is not a signal of systemd: see the recovery described above.
+        """
+        with self._lock:
+            self._connect()
+            self._listeners.setdefault(member, []).append(_weak_callback(callback))
+
+    def disconnect(self, member, callback):
+        with self._lock:
+            listeners = self._listeners.get(member, [])
+            listeners[:] = [ref for ref in listeners if ref() not in (None, callback)]
+
+    def _on_manager_signal(self, *args, **kwargs):
+        self._notify(kwargs['member'], args)
+
+    def _notify(self, member, args):
+        with self._lock:
+            listeners = self._listeners.get(member)
+            if not listeners:
+                return
+            listeners[:] = [ref for ref in listeners if ref() is not None]
+            callbacks = [ref() for ref in listeners]
+        self.stats[member] += 1
+        for callback in callbacks:
+            if callback is not None:
+                callback(*args)
+
+    def _on_properties_changed(self, interface, changed, invalidated, path=None):
+        with self._lock:
+            watchers = self._watchers.get(path)
+            objs = list(watchers) if watchers else []
+            listeners = self._listeners.get('PropertiesChanged')
+            if listeners:
+                listeners[:] = [ref for ref in listeners if ref() is not None]
+                callbacks = [ref() for ref in listeners]
+            else:
+                callbacks = []
+        if not objs and not callbacks:
+            self.stats['unwatched'] += 1
+            return
+        self.stats['dispatched'] += 1
+        for obj in objs:
+            obj._on_properties_changed(interface, changed, invalidated)
+        for callback in callbacks:
+            if callback is not None:
+                callback(interface, changed, invalidated, path)
+
+    def __len__(self):
+        return len(self._watchers)
+
+
+dispatcher = SignalDispatcher(registry)
@@ -0,0 +1,7 @@
+from .unit import Unit
+
+
+class Slice(Unit):
+    """Abstraction class to org.freedesktop.systemd1.Slice interface"""
+
+    __dbus_interace__ = 'org.freedesktop.systemd1.Slice'
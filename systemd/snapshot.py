@@ -1,10 +1,8 @@
-import dbus.exceptions
+from .unit import Unit
+from .exceptions import raises_systemd_error
 
-from .base import SystemdDbusObject
-from .exceptions import SystemdError, raises_systemd_error
 
-
-class Snapshot(SystemdDbusObject):
+class Snapshot(Unit):
     """Abstraction class to org.freedesktop.systemd1.Snapshot interface"""
 
     __dbus_interace__ = 'org.freedesktop.systemd1.Snapshot'
@@ -1,7 +1,7 @@
-from .base import SystemdDbusObject
+from .unit import Unit
 
 
-class Socket(SystemdDbusObject):
+class Socket(Unit):
     """Abstraction class to org.freedesktop.systemd1.Socket interface"""
 
     __dbus_interace__ = 'org.freedesktop.systemd1.Socket'
@@ -1,7 +1,7 @@
-from .base import SystemdDbusObject
+from .unit import Unit
 
 
-class Swap(SystemdDbusObject):
+class Swap(Unit):
     """Abstraction class to org.freedesktop.systemd1.Swap interface"""
 
     __dbus_interace__ = 'org.freedesktop.systemd1.Swap'
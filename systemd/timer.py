@@ -1,7 +1,7 @@
-from .base import SystemdDbusObject
+from .unit import Unit
 
 
-class Timer(SystemdDbusObject):
+class Timer(Unit):
     """Abstraction class to org.freedesktop.systemd1.Timer interface"""
 
     __dbus_interace__ = 'org.freedesktop.systemd1.Timer'
@@ -0,0 +1,152 @@
+"""Launching many transient units (the way systemd-run does) at a high rate.
+
+    >>> launcher = manager.transient_launcher(max_in_flight=64)
+    >>> for i, argv in enumerate(commands):
+    ...     launcher.launch('batch-%d.service' % i, {'ExecStart': argv, 'MemoryMax': 2 ** 30, 'CollectMode':
+    ...                     'inactive-or-failed'})
+    >>> unfinished = launcher.wait(timeout=60)
+
+The StartTransientUnit calls are pipelined (see L{systemd.pipeline.Pipeline}): launch() returns as soon as the call is
+written, unless max_in_flight calls already await their reply.  The job of each launch is followed by
+L{systemd.job.tracker}, from the JobRemoved signal, so completions cost no polling.
+"""
+
+import collections
+import threading
+import time
+
+from .bus import SYSTEMD_OBJECT_PATH, MANAGER_INTERFACE
+from .encode import encode_properties, encode_aux
+from .exceptions import SystemdError
+from .job import tracker as job_tracker
+from .pipeline import Pipeline
+
+
+class Launch(object):
+    """One StartTransientUnit call of a L{TransientLauncher}, and what became of it.
+
+    `latency` is the time from sending the call to its reply (None until then) and `duration` the time from sending
+    it to the end of its job (None until then); `error` is the L{SystemdError} the call failed with, and `result` the
+    result of the job ('done', 'failed', ...).
+    """
+
+    __slots__ = ('name', 'job_path', 'error', 'result', 'sent', 'replied', 'finished')
+
+    def __init__(self, name):
+        self.name = name
+        self.job_path = None
+        self.error = None
+        self.result = None
+        self.sent = time.perf_counter()
+        self.replied = None
+        self.finished = None
+
+    @property
+    def latency(self):
+        return self.replied - self.sent if self.replied is not None else None
+
+    @property
+    def duration(self):
+        return self.finished - self.sent if self.finished is not None else None
+
+    def __repr__(self):
+        return '<Launch %s job=%s error=%s result=%s>' % (self.name, self.job_path, self.error, self.result)
+
+
+class TransientLauncher(object):
+    """Start transient units with pipelined StartTransientUnit calls and follow their jobs.
+
+    @param mode: Job mode of the start jobs; one of fail, replace, ...
+    @param max_in_flight: At most this many calls await their reply at any time; launching another one first waits
+    for the oldest.
+    @param keep: How many of the last launches are kept in `launches` for inspection; None keeps them all.
+
+    Counters are kept in `stats`: launched, call_errors, and one per job result (done, failed, ...).
+    """
+
+    def __init__(self, mode='fail', max_in_flight=64, keep=4096):
+        self.mode = mode
+        self.stats = collections.Counter()
+        self.launches = collections.deque(maxlen=keep)
+        self._pipeline = Pipeline(max_in_flight=max_in_flight)
+        self._running = collections.OrderedDict()
+        self._lock = threading.Lock()
+        # Results of jobs that end before anybody waits for them are only seen if the tracker already listens.
+        job_tracker.start()
+
+    def launch(self, name, properties, aux=(), callback=None):
+        """Start the transient unit called name with the given properties.
+
+        @param properties: dict (or (name, value) pairs) of unit properties; see L{systemd.encode}.
+        @param aux: Auxiliary units created along with it, as a dict (or pairs) of their name to their properties.
+        @param callback: If given, callback(launch) is called when the job of the unit ends or the call fails.
+
+        @raise ValueError: Raised when a property cannot be converted to its D-Bus type.
+
+        @rtype: L{Launch}
+        """
+        args = (name, self.mode, encode_properties(properties), encode_aux(aux))
+        launch = Launch(name)
+        self.launches.append(launch)
+        with self._lock:
+            self._running[launch] = callback
+        self.stats['launched'] += 1
+        self._pipeline.call(SYSTEMD_OBJECT_PATH, MANAGER_INTERFACE, 'StartTransientUnit', args,
+                            callback=lambda call: self._on_reply(launch, call))
+        return launch
+
+    def launch_many(self, units, aux=()):
+        """Launch every (name, properties) pair of units; see launch().
+
+        @rtype: list of L{Launch}
+        """
+        return [self.launch(name, properties, aux) for name, properties in units]
+
+    def _on_reply(self, launch, call):
+        launch.replied = time.perf_counter()
+        if call.error is not None:
+            launch.error = SystemdError(call.error)
+            self.stats['call_errors'] += 1
+            self._done(launch)
+            return
+        launch.job_path = str(call.values[0])
+        job_tracker.add_callback(launch.job_path, lambda result: self._on_job_removed(launch, result))
+
+    def _on_job_removed(self, launch, result):
+        launch.finished = time.perf_counter()
+        launch.result = result
+        self.stats[result] += 1
+        self._done(launch)
+
+    def _done(self, launch):
+        with self._lock:
+            callback = self._running.pop(launch, None)
+        if callback is not None:
+            callback(launch)
+
+    def flush(self):
+        """Wait for the reply of every call made so far (but not for the jobs)."""
+        self._pipeline.wait()
+
+    def wait(self, timeout=None):
+        """Wait for the jobs of every launch so far to end.
+
+        @param timeout: Seconds to wait for the jobs, after all replies arrived.
+
+        @rtype: list of the L{Launch}es whose job had not ended yet (they are still followed)
+        """
+        self.flush()
+        with self._lock:
+            job_paths = [launch.job_path for launch in self._running if launch.job_path is not None]
+        if job_paths:
+            job_tracker.wait(job_paths, timeout)
+        with self._lock:
+            return list(self._running)
+
+    def __len__(self):
+        """Number of launches whose call or job has not ended yet."""
+        return len(self._running)
+
+    def latencies(self):
+        """@rtype: sorted list of the call latencies (in seconds) of the kept launches that got their reply"""
+        return sorted(launch.latency for launch in self.launches if launch.replied is not None)
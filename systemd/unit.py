@@ -17,22 +17,56 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 
+import collections
+import re
+
 import dbus
-import dbus.mainloop.glib
-dbus.mainloop.glib.DBusGMainLoop(set_as_default=True)
 
 from systemd.property import Property
 from systemd.exceptions import SystemdError
 from systemd.job import job_if_exists
 
 from .base import SystemdDbusObject
+from .bus import registry, SYSTEMD_OBJECT_PATH
+
+
+UNIT_INTERFACE = 'org.freedesktop.systemd1.Unit'
+
+
+def unit_path(name):
+    """Return the object path of a unit from its name, escaped the way systemd does (ie: 'sshd.service' ->
+    '/org/freedesktop/systemd1/unit/sshd_2eservice')."""
+    label = []
+    for i, c in enumerate(name):
+        if ('a' <= c <= 'z') or ('A' <= c <= 'Z') or (i > 0 and '0' <= c <= '9'):
+            label.append(c)
+        else:
+            label.append('_%02x' % ord(c))
+    return '%s/unit/%s' % (SYSTEMD_OBJECT_PATH, ''.join(label))
+
+
+def unit_name(path):
+    """Return the name of a unit from its object path; the reverse of L{unit_path}."""
+    label = str(path).rsplit('/', 1)[-1]
+    return re.sub('_([0-9a-f]{2})', lambda match: chr(int(match.group(1), 16)), label)
 
 
 class Unit(SystemdDbusObject):
     """Abstraction class to org.freedesktop.systemd1.Unit interface"""
 
-    __dbus_interace__ = 'org.freedesktop.systemd1.Unit'
-    
+    __dbus_interace__ = UNIT_INTERFACE
+
+    def __init_subclass__(cls, **kwargs):
+        # Typed units (ie: Service) have the properties of org.freedesktop.systemd1.Unit merged into theirs.
+        super(Unit, cls).__init_subclass__(**kwargs)
+        if '__dbus_property_interfaces__' not in cls.__dict__:
+            cls.__dbus_property_interfaces__ = (cls.__dbus_interace__, UNIT_INTERFACE)
+
+    # The methods below belong to org.freedesktop.systemd1.Unit, which is not __dbus_interace__ on typed units.
+    @property
+    def _unit_interface(self):
+        return registry.get_interface(self._path, UNIT_INTERFACE)
+
     def kill(self, who, mode, signal):
         """Kill unit.
         
@@ -46,7 +80,7 @@ class Unit(SystemdDbusObject):
         @rtype: systemd.job.Job
         """
         try:
-            self._interface.KillUnit(who, mode, signal)
+            self._unit_interface.KillUnit(who, mode, signal)
         except dbus.exceptions.DBusException as error:
             print(error)
             raise SystemdError(error)
@@ -61,7 +95,7 @@ class Unit(SystemdDbusObject):
         @rtype: systemd.job.Job
         """
         try:
-            job_path = self._interface.Reload(mode)
+            job_path = self._unit_interface.Reload(mode)
             return job_if_exists(job_path)
         except dbus.exceptions.DBusException as error:
             raise SystemdError(error)
@@ -76,7 +110,7 @@ class Unit(SystemdDbusObject):
         @rtype: systemd.job.Job
         """
         try:
-            job_path = self._interface.ReloadOrRestart(mode)
+            job_path = self._unit_interface.ReloadOrRestart(mode)
             return job_if_exists(job_path)
         except dbus.exceptions.DBusException as error:
             raise SystemdError(error)
@@ -91,14 +125,14 @@ class Unit(SystemdDbusObject):
         @rtype: systemd.job.Job
         """
         try:
-            job_path = self._interface.ReloadOrTryRestart(mode)
+            job_path = self._unit_interface.ReloadOrTryRestart(mode)
             return job_if_exists(job_path)
         except dbus.exceptions.DBusException as error:
             raise SystemdError(error)
 
     def reset_failed(self):
         try:
-            self._interface.ResetFailed()
+            self._unit_interface.ResetFailed()
         except dbus.exceptions.DBusException as error:
             raise SystemdError(error)        
 
@@ -112,7 +146,7 @@ class Unit(SystemdDbusObject):
         @rtype: systemd.job.Job
         """
         try:
-            job_path = self._interface.Restart(mode)
+            job_path = self._unit_interface.Restart(mode)
             return job_if_exists(job_path)
         except dbus.exceptions.DBusException as error:
             raise SystemdError(error)
@@ -127,7 +161,7 @@ class Unit(SystemdDbusObject):
         @rtype: systemd.job.Job
         """
         try:
-            job_path = self._interface.Start(mode)
+            job_path = self._unit_interface.Start(mode)
             return job_if_exists(job_path)
         except dbus.exceptions.DBusException as error:
             raise SystemdError(error)
@@ -142,7 +176,7 @@ class Unit(SystemdDbusObject):
         @rtype: systemd.job.Job
         """
         try:
-            job_path = self._interface.Stop(mode)
+            job_path = self._unit_interface.Stop(mode)
             return job_if_exists(job_path)
         except dbus.exceptions.DBusException as error:
             raise SystemdError(error)
@@ -157,7 +191,33 @@ class Unit(SystemdDbusObject):
         @rtype: L{systemd.job.Job}
         """
         try:
-            job_path = self._interface.TryRestart(mode)
+            job_path = self._unit_interface.TryRestart(mode)
             return job_if_exists(job_path)
         except dbus.exceptions.DBusException as error:
             raise SystemdError(error)
+
+
+class UnitRecord(collections.namedtuple('UnitRecord', (
+        'name', 'description', 'load_state', 'active_state', 'sub_state', 'following', 'unit_path',
+        'job_id', 'job_type', 'job_path'))):
+    """One entry of the ListUnits reply, with native values and no proxy behind it.
+
+    Enough for most monitoring (names and states); use materialize() to get a full L{Unit} when needed.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_dbus(cls, unit):
+        return cls(str(unit[0]), str(unit[1]), str(unit[2]), str(unit[3]), str(unit[4]), str(unit[5]),
+                   str(unit[6]), int(unit[7]), str(unit[8]), str(unit[9]))
+
+    def materialize(self, watch=True, lazy=False, manager=None):
+        """Return the L{Unit} this record describes (of the subclass matching its type, see
+        L{systemd.unittypes.unit_class}), from the identity map of manager if one is given."""
+        # Imported here: the typed unit classes are subclasses of Unit, so unittypes imports this module.
+        from .unittypes import unit_class
+        cls = unit_class(self.name)
+        if manager is not None:
+            return manager._get_object(cls, self.unit_path, watch=watch, lazy=lazy)
+        return cls(self.unit_path, watch=watch, lazy=lazy)
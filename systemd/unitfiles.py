@@ -0,0 +1,222 @@
+"""Cache of unit file listings and enablement states, invalidated when unit files change.
+
+ListUnitFiles and GetUnitFileState make systemd rescan its unit search paths on every call.  UnitFileCache keeps their
+results until something may have changed them: an inotify event in one of the search paths (or in a .wants/.requires
+directory below them), a UnitFilesChanged or Reloading signal, or an enable/disable made through the Manager.
+"""
+
+import collections
+import errno
+import os
+import struct
+import threading
+import time
+
+from .bus import registry, SYSTEMD_OBJECT_PATH, MANAGER_INTERFACE
+from .signals import dispatcher
+
+
+SEARCH_PATHS = (
+    '/etc/systemd/system',
+    '/run/systemd/system',
+    '/run/systemd/transient',
+    '/run/systemd/generator',
+    '/run/systemd/generator.early',
+    '/run/systemd/generator.late',
+    '/usr/local/lib/systemd/system',
+    '/usr/lib/systemd/system',
+    '/lib/systemd/system',
+)
+
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, 'O_CLOEXEC', 0o2000000)
+
+WATCH_MASK = (IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF |
+              IN_MOVE_SELF)
+
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class Inotify(object):
+    """Minimal non-blocking inotify watch over directories and their immediate subdirectories (ctypes, Linux only).
+
+    @raise OSError: Raised when inotify is not available.
+    """
+
+    def __init__(self, paths):
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self._watches = {}
+        for path in paths:
+            self.add_watch(path)
+            if os.path.isdir(path):
+                for name in os.listdir(path):
+                    if os.path.isdir(os.path.join(path, name)):
+                        self.add_watch(os.path.join(path, name))
+
+    def add_watch(self, path):
+        wd = self._add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd >= 0:
+            self._watches[wd] = path
+
+    def read_events(self):
+        """Return the number of events received since the last call, without blocking."""
+        count = 0
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except OSError as error:
+                if error.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    return count
+                raise
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                count += 1
+                # New .wants/.requires/.d directories must be watched too.
+                if mask & IN_CREATE and mask & IN_ISDIR and wd in self._watches:
+                    self.add_watch(os.path.join(self._watches[wd], os.fsdecode(name)))
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class UnitFileCache(object):
+    """Cache the results of ListUnitFiles and GetUnitFileState.
+
+    @param paths: Directories to watch with inotify; if inotify is not available, only signals and explicit
+    invalidate() calls invalidate the cache.
+    @param max_age: If set, entries older than this many seconds are fetched again regardless.
+    @param signals: If False, the UnitFilesChanged and Reloading signals are not listened to, so that GLib is not
+    needed (see L{systemd.manager.Manager}); changes are then only seen through inotify.
+
+    Counters are kept in `stats` (hits, misses and invalidations by cause); staleness() and max_hit_age tell how old
+    the data being served is.
+    """
+
+    def __init__(self, paths=SEARCH_PATHS, max_age=None, signals=True):
+        self.max_age = max_age
+        self._signals = signals
+        self.stats = collections.Counter()
+        self.max_hit_age = 0.0
+        self._files = None
+        self._files_time = None
+        self._states = {}
+        self._lock = threading.RLock()
+        try:
+            self._inotify = Inotify(paths)
+        except (OSError, AttributeError):
+            self._inotify = None
+        if signals:
+            dispatcher.connect('UnitFilesChanged', self._on_unit_files_changed)
+            dispatcher.connect('Reloading', self._on_reloading)
+            dispatcher.connect('Reconnected', self._on_reconnected)
+
+    def close(self):
+        if self._signals:
+            dispatcher.disconnect('UnitFilesChanged', self._on_unit_files_changed)
+            dispatcher.disconnect('Reloading', self._on_reloading)
+            dispatcher.disconnect('Reconnected', self._on_reconnected)
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    def __del__(self):
+        if self._inotify is not None:
+            self._inotify.close()
+
+    def _on_unit_files_changed(self):
+        self.invalidate('signal')
+
+    def _on_reloading(self, active):
+        self.invalidate('signal')
+
+    def _on_reconnected(self, cause):
+        # Signals may have been missed meanwhile, and daemon-reexec reloads the unit files anyway.
+        self.invalidate('reconnect')
+
+    def invalidate(self, cause='explicit'):
+        with self._lock:
+            self._files = self._files_time = None
+            self._states.clear()
+            self.stats['invalidations_%s' % cause] += 1
+
+    @property
+    def _interface(self):
+        return registry.get_interface(SYSTEMD_OBJECT_PATH, MANAGER_INTERFACE)
+
+    def _check(self):
+        if self._inotify is not None and self._inotify.read_events():
+            self.invalidate('inotify')
+
+    def _fresh(self, fetched_at):
+        if fetched_at is None:
+            return False
+        age = time.time() - fetched_at
+        if self.max_age is not None and age > self.max_age:
+            self.stats['expired'] += 1
+            return False
+        self.max_hit_age = max(self.max_hit_age, age)
+        return True
+
+    def list_unit_files(self):
+        """@rtype: list of 2-tuples of (unit file path, enablement status)"""
+        with self._lock:
+            self._check()
+            if self._fresh(self._files_time):
+                self.stats['hits'] += 1
+                return list(self._files)
+            self.stats['misses'] += 1
+            now = time.time()
+            self._files = [(str(path), str(state)) for path, state in self._interface.ListUnitFiles()]
+            self._files_time = now
+            # The listing answers state lookups too.
+            for path, state in self._files:
+                self._states[os.path.basename(path)] = (state, now)
+            return list(self._files)
+
+    def get_unit_file_state(self, file_):
+        """@rtype: enablement status; one of {'enabled', 'disabled', 'static', ...}"""
+        with self._lock:
+            self._check()
+            entry = self._states.get(file_)
+            if entry is not None and self._fresh(entry[1]):
+                self.stats['hits'] += 1
+                return entry[0]
+            self.stats['misses'] += 1
+            now = time.time()
+            state = str(self._interface.GetUnitFileState(file_))
+            self._states[file_] = (state, now)
+            return state
+
+    def staleness(self):
+        """Seconds since the oldest data currently cached was fetched (0 if nothing is cached)."""
+        with self._lock:
+            times = [fetched_at for state, fetched_at in self._states.values()]
+            if self._files_time is not None:
+                times.append(self._files_time)
+            return time.time() - min(times) if times else 0.0
+
+    def hit_rate(self):
+        lookups = self.stats['hits'] + self.stats['misses']
+        return float(self.stats['hits']) / lookups if lookups else 0.0
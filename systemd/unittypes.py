@@ -0,0 +1,43 @@
+"""The typed unit classes, by unit type.
+
+A typed unit (ie: L{systemd.service.Service}) is a L{systemd.unit.Unit} whose `properties` also hold those of the
+interface of its type, fetched with the same GetAll call: ActiveState and MainPID of a service cost one round trip
+instead of two.  The Manager builds units of the class matching the suffix of their name.
+"""
+
+from .unit import Unit, unit_name
+from .automount import Automount
+from .device import Device
+from .mount import Mount
+from .path import Path
+from .scope import Scope
+from .service import Service
+from .slice import Slice
+from .snapshot import Snapshot
+from .socket import Socket
+from .swap import Swap
+from .target import Target
+from .timer import Timer
+
+
+UNIT_CLASSES = {
+    'automount': Automount,
+    'device': Device,
+    'mount': Mount,
+    'path': Path,
+    'scope': Scope,
+    'service': Service,
+    'slice': Slice,
+    'snapshot': Snapshot,
+    'socket': Socket,
+    'swap': Swap,
+    'target': Target,
+    'timer': Timer,
+}
+
+
+def unit_class(name=None, path=None):
+    """Return the class of the unit called name (or whose object path is path); L{Unit} for an unknown type."""
+    if name is None:
+        name = unit_name(path)
+    return UNIT_CLASSES.get(str(name).rpartition('.')[2], Unit)
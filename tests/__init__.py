@@ -1 +1,23 @@
-from manager_test import *
\ No newline at end of file
+from .manager_test import *
+from .introspection_test import *
+from .lazy_test import *
+from .filtered_test import *
+from .aio_test import *
+from .bulk_test import *
+from .unitfiles_test import *
+from .events_test import *
+from .benchmark_test import *
+from .metrics_test import *
+from .import_test import *
+from .decode_test import *
+from .property_test import *
+from .unittypes_test import *
+from .depgraph_test import *
+from .transient_test import *
+from .setproperties_test import *
+from .reconnect_test import *
+from .private_test import *
+from .deltas_test import *
+from .dispatcher_test import *
+from .records_test import *
+from .identity_test import *
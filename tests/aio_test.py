@@ -0,0 +1,80 @@
+import asyncio
+
+from tests import fake_systemd
+
+
+class AsyncManagerTest(fake_systemd.FakeSystemdTestCase):
+
+    units = 50
+
+    def run_async(self, coroutine):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coroutine)
+        finally:
+            loop.close()
+
+    def test_concurrent_start_unit(self):
+        from systemd.aio import AsyncManager, AsyncJob
+
+        async def start_all():
+            manager = AsyncManager(max_in_flight=10)
+            names = [fake_systemd.unit_name(i) for i in range(50)]
+            return await asyncio.gather(*[manager.start_unit(name, 'replace') for name in names])
+
+        jobs = self.run_async(start_all())
+        self.assertEqual(len(jobs), 50)
+        self.assertTrue(all(isinstance(job, AsyncJob) for job in jobs))
+
+    def test_iter_units(self):
+        from systemd.aio import AsyncManager
+
+        async def collect():
+            manager = AsyncManager()
+            return [(await unit.get_properties()).Id async for unit in manager.iter_units()]
+
+        self.assertEqual(sorted(self.run_async(collect())), [fake_systemd.unit_name(i) for i in range(50)])
+
+    def test_error(self):
+        from systemd.aio import AsyncManager
+        from systemd.exceptions import SystemdError
+
+        async def get_missing():
+            return await AsyncManager().get_unit('missing.service')
+
+        with self.assertRaises(SystemdError) as cm:
+            self.run_async(get_missing())
+        self.assertEqual(cm.exception.name, 'NoSuchUnit')
+
+    def test_wait_jobs(self):
+        from systemd.aio import AsyncManager
+
+        async def start_and_wait():
+            manager = AsyncManager()
+            await manager.subscribe()
+            jobs = [await manager.start_unit(fake_systemd.unit_name(i), 'replace') for i in range(5)]
+            return await manager.wait_jobs(jobs, timeout=10)
+
+        self.assertEqual(set(self.run_async(start_and_wait()).values()), set(['done']))
+
+    def test_loop_of_each_call(self):
+        from systemd.aio import AsyncManager
+        # Made outside of any loop, then used from one loop after the other.
+        manager = AsyncManager()
+        for i in range(2):
+            unit = self.run_async(manager.get_unit(self.names[i]))
+            self.assertEqual(self.run_async(unit.get_property('Id')), self.names[i])
+
+    def test_wait_vanished_jobs(self):
+        from systemd.aio import AsyncJob, AsyncManager
+        from systemd.job import JOB_RESULT_UNKNOWN, tracker
+        paths = ['/org/freedesktop/systemd1/job/%d' % (9000 + i) for i in range(3)]
+
+        async def wait_vanished():
+            manager = AsyncManager()
+            await manager.subscribe()
+            # Never started, so gone without any JobRemoved signal.
+            return await manager.wait_jobs([AsyncJob(path) for path in paths], timeout=5)
+
+        self.assertEqual(set(self.run_async(wait_vanished()).values()), set([JOB_RESULT_UNKNOWN]))
+        self.assertFalse(any(path in tracker._callbacks for path in paths))
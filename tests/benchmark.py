@@ -0,0 +1,324 @@
+"""Benchmarks of the library against the fake systemd of tests.fake_systemd.
+
+    python -m tests.benchmark --units 1000 --jobs 100 --repeat 5 --output bench_output.txt
+
+Each benchmark writes one JSON object per line: its name, the number of units, the timings of its runs in seconds
+(min, median, mean) and the D-Bus method calls the fake systemd received during the last run, so that a regression
+shows up either as time or as extra round trips.  Memory benchmarks also report the bytes held by what their run
+built (`bytes`, `bytes_per_unit`); run them with --units 10000 to see a large host.  Latency benchmarks make one call
+per unit and also report the time of one call (`min_per_unit`).  Runs in any Linux sandbox with dbus-daemon, dbus-python and
+PyGObject; nothing touches the systemd of the machine.
+"""
+
+import argparse
+import collections
+import gc
+import itertools
+import json
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from tests import fake_systemd
+
+
+BENCHMARKS = collections.OrderedDict()
+
+
+def benchmark(name, memory=False, per_unit=False):
+    def register(fn):
+        fn.memory = memory
+        fn.per_unit = per_unit
+        BENCHMARKS[name] = fn
+        return fn
+    return register
+
+
+class Context(object):
+    """What each benchmark gets: the running fake service, the unit names and a Manager built outside the timing."""
+
+    def __init__(self, service, n_units):
+        from systemd.manager import Manager
+        self.service = service
+        self.names = [fake_systemd.unit_name(i) for i in range(n_units)]
+        self.manager = Manager()
+        # Registries made by benchmarks of their own; their connections are closed before the fake service stops.
+        self.registries = []
+
+    def close(self):
+        for registry in self.registries:
+            registry.configure()
+
+
+# Each benchmark takes a Context, does any setup it needs, and returns the function to time.
+
+def _python(code, *args):
+    return lambda: subprocess.check_call([sys.executable, '-c', code] + list(args), cwd=fake_systemd.ROOT_DIR)
+
+
+@benchmark('import[python]')
+def bench_import_python(ctx):
+    # The start-up time of the interpreter alone, to subtract from the other import benchmarks.
+    return _python('pass')
+
+
+@benchmark('import[systemd]')
+def bench_import_systemd(ctx):
+    return _python('import systemd')
+
+
+@benchmark('import[systemd.manager]')
+def bench_import_manager(ctx):
+    return _python('import systemd.manager')
+
+
+@benchmark('cli[list_units]')
+def bench_cli_list_units(ctx):
+    # A whole short-lived process: import, one ListUnits call, exit.
+    return _python('import sys; from systemd.bus import registry; registry.configure(address=sys.argv[1]); '
+                   'from systemd.manager import Manager; Manager(signals=False).list_units(records=True)',
+                   ctx.service.address)
+
+@benchmark('manager_init')
+def bench_manager_init(ctx):
+    from systemd.manager import Manager
+    return Manager
+
+
+@benchmark('list_units[records]')
+def bench_list_units_records(ctx):
+    return lambda: ctx.manager.list_units(records=True)
+
+
+@benchmark('list_units[lazy,nowatch]')
+def bench_list_units_nowatch(ctx):
+    return lambda: ctx.manager.list_units(watch=False)
+
+
+@benchmark('list_units[lazy,watch]')
+def bench_list_units_watch(ctx):
+    return lambda: ctx.manager.list_units(watch=True)
+
+
+@benchmark('list_units[loaded,watch]')
+def bench_list_units_loaded(ctx):
+    from systemd.manager import Manager
+    # A fresh identity map each run, or the units of the previous run would be reused.
+    return lambda: Manager().list_units(watch=True, lazy=False)
+
+
+@benchmark('iter_units[lazy,watch]')
+def bench_iter_units(ctx):
+    return lambda: sum(1 for unit in ctx.manager.iter_units(watch=True))
+
+
+@benchmark('list_jobs')
+def bench_list_jobs(ctx):
+    return lambda: ctx.manager.list_jobs(records=True)
+
+
+@benchmark('get_unit')
+def bench_get_unit(ctx):
+    from systemd.manager import Manager
+
+    def run():
+        manager = Manager()
+        return [manager.get_unit(name) for name in ctx.names]
+    return run
+
+
+@benchmark('fetch_properties')
+def bench_fetch_properties(ctx):
+    return lambda: ctx.manager.fetch_properties(ctx.names)
+
+
+def _reload_on_signal(ctx, invalidate):
+    from systemd.signals import dispatcher
+    units = ctx.manager.list_units(watch=True, lazy=False)
+
+    def run():
+        expected = dispatcher.stats['dispatched'] + len(units)
+        ctx.service.touch(ctx.names, invalidate)
+        fake_systemd.pump(lambda: dispatcher.stats['dispatched'] >= expected)
+    return run
+
+
+@benchmark('reload_on_signal[changed]')
+def bench_reload_on_signal(ctx):
+    return _reload_on_signal(ctx, False)
+
+
+@benchmark('reload_on_signal[invalidated]')
+def bench_reload_on_invalidation(ctx):
+    return _reload_on_signal(ctx, True)
+
+
+def _unit_properties(ctx):
+    from systemd.bus import registry, PROPERTIES_INTERFACE
+    from systemd.decode import decoder
+    from systemd.unit import UNIT_INTERFACE, unit_path
+    properties = registry.get_interface(unit_path(ctx.names[0]), PROPERTIES_INTERFACE).GetAll(UNIT_INTERFACE)
+    return decoder.decode_all(UNIT_INTERFACE, properties)
+
+
+@benchmark('memory[properties,dict]', memory=True)
+def bench_memory_dict(ctx):
+    from systemd.property import Property
+    properties = _unit_properties(ctx)
+
+    def run():
+        objs = []
+        for i in range(len(ctx.names)):
+            obj = Property()
+            for key, value in properties.items():
+                setattr(obj, key, value)
+            objs.append(obj)
+        return objs
+    return run
+
+
+@benchmark('memory[properties,compact]', memory=True)
+def bench_memory_compact(ctx):
+    from systemd.property import CompactProperty, property_table
+    from systemd.unit import UNIT_INTERFACE
+    properties = _unit_properties(ctx)
+    return lambda: [CompactProperty(property_table(UNIT_INTERFACE), properties) for i in range(len(ctx.names))]
+
+
+@benchmark('memory[list_units,loaded]', memory=True)
+def bench_memory_units(ctx):
+    from systemd.manager import Manager
+    return lambda: Manager(signals=False).list_units(lazy=False)
+
+
+@benchmark('start_units+wait')
+def bench_start_units(ctx):
+    def run():
+        jobs = ctx.manager.start_units(ctx.names, 'replace', max_in_flight=256)
+        return ctx.manager.wait_jobs(jobs.values(), timeout=60)
+    return run
+
+
+@benchmark('stop_units+wait')
+def bench_stop_units(ctx):
+    def run():
+        jobs = ctx.manager.stop_units(ctx.names, 'replace', max_in_flight=256)
+        return ctx.manager.wait_jobs(jobs.values(), timeout=60)
+    return run
+
+
+@benchmark('set_units_properties[unchanged]')
+def bench_set_units_properties(ctx):
+    units = ctx.manager.list_units(watch=True, lazy=False)
+    updates = dict((name, {'MemoryMax': 2 ** 30, 'TasksMax': 512}) for name in ctx.names)
+    # The first write changes every unit; the timed ones find nothing to send, as in a steady control loop.
+    ctx.manager.set_units_properties(updates, runtime=True)
+    return lambda: (units, ctx.manager.set_units_properties(updates, runtime=True))
+
+
+@benchmark('transient_launcher+wait')
+def bench_transient_launcher(ctx):
+    batches = itertools.count()
+
+    def run():
+        # Transient unit names cannot be reused, so each run launches new ones.
+        launcher = ctx.manager.transient_launcher(max_in_flight=256)
+        batch = next(batches)
+        for i in range(len(ctx.names)):
+            launcher.launch('bench-%d-%d.service' % (batch, i), {'ExecStart': ['/bin/true'], 'MemoryMax': 2 ** 28})
+        return launcher.wait(timeout=60)
+    return run
+
+
+def _call_latency(ctx, mode):
+    from systemd.bus import BusRegistry, PROPERTIES_INTERFACE
+    from systemd.unit import UNIT_INTERFACE, unit_path
+    # A registry of its own, so the other benchmarks keep going through the bus.
+    registry = BusRegistry()
+    ctx.registries.append(registry)
+    registry.configure(address=ctx.service.address, mode=mode, private_address=ctx.service.private_address)
+    interfaces = [registry.get_interface(unit_path(name), PROPERTIES_INTERFACE) for name in ctx.names]
+    # One blocking round trip after the other, as an agent polling a property makes them.
+    return lambda: [interface.Get(UNIT_INTERFACE, 'ActiveState') for interface in interfaces]
+
+
+@benchmark('call_latency[bus]', per_unit=True)
+def bench_call_latency_bus(ctx):
+    return _call_latency(ctx, 'bus')
+
+
+@benchmark('call_latency[private]', per_unit=True)
+def bench_call_latency_private(ctx):
+    # Straight to the stand-in for /run/systemd/private, without the bus daemon in between.
+    return _call_latency(ctx, 'private')
+
+
+def run_benchmark(name, ctx, repeat):
+    memory = BENCHMARKS[name].memory
+    per_unit = BENCHMARKS[name].per_unit
+    fn = BENCHMARKS[name](ctx)
+    timings = []
+    held = None
+    for i in range(repeat):
+        gc.collect()
+        ctx.service.reset_call_counts()
+        if memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+        if memory:
+            gc.collect()
+            held = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+        del result
+    timings.sort()
+    extra = []
+    if held is not None:
+        extra = [('bytes', held), ('bytes_per_unit', held / len(ctx.names))]
+    if per_unit:
+        extra = [('min_per_unit', timings[0] / len(ctx.names))]
+    return collections.OrderedDict([
+        ('benchmark', name),
+        ('units', len(ctx.names)),
+        ('repeat', repeat),
+        ('min', timings[0]),
+        ('median', timings[len(timings) // 2]),
+        ('mean', sum(timings) / len(timings)),
+        ('calls', ctx.service.call_counts()),
+    ] + extra)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--units', type=int, default=1000, help='number of synthetic units')
+    parser.add_argument('--jobs', type=int, default=100, help='number of synthetic queued jobs')
+    parser.add_argument('--repeat', type=int, default=5, help='runs of each benchmark')
+    parser.add_argument('--output', default='-', help='file to write the results to (JSON lines); - for stdout')
+    parser.add_argument('benchmarks', nargs='*', help='benchmarks to run (all by default): %s' % ', '.join(BENCHMARKS))
+    args = parser.parse_args(argv)
+
+    if not fake_systemd.is_available():
+        parser.error('dbus-daemon, dbus-python and PyGObject are required')
+    from systemd.bus import registry
+    service = fake_systemd.FakeSystemdService(units=args.units, jobs=args.jobs, job_delay=0, private=True)
+    output = sys.stdout if args.output == '-' else open(args.output, 'w')
+    ctx = None
+    try:
+        registry.configure(address=service.address)
+        ctx = Context(service, args.units)
+        for name in args.benchmarks or BENCHMARKS:
+            output.write(json.dumps(run_benchmark(name, ctx, args.repeat)) + '\n')
+            output.flush()
+    finally:
+        if ctx is not None:
+            ctx.close()
+        registry.configure()
+        service.stop()
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == '__main__':
+    main()
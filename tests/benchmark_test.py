@@ -0,0 +1,28 @@
+import json
+import os
+import tempfile
+import unittest
+
+from tests import fake_systemd
+
+
+@fake_systemd.skip_unless_available
+class BenchmarkTest(unittest.TestCase):
+    """Every benchmark runs and reports, so the suite does not rot between uses."""
+
+    def test_all_benchmarks(self):
+        from tests import benchmark
+        fd, output = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            benchmark.main(['--units', '20', '--jobs', '5', '--repeat', '1', '--output', output])
+            with open(output) as f:
+                results = [json.loads(line) for line in f]
+        finally:
+            os.unlink(output)
+        self.assertEqual([result['benchmark'] for result in results], list(benchmark.BENCHMARKS))
+        by_name = dict((result['benchmark'], result) for result in results)
+        self.assertEqual(by_name['list_units[records]']['calls'], {'ListUnits': 1})
+        self.assertEqual(by_name['get_unit']['calls'].get('GetUnit'), 20)
+        # The peer-to-peer calls reached the fake systemd without the bus in between.
+        self.assertEqual(by_name['call_latency[private]']['calls'], {'Get': 20})
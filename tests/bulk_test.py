@@ -0,0 +1,57 @@
+from tests import fake_systemd
+
+
+class BulkTest(fake_systemd.FakeSystemdTestCase):
+    """Pipelined calls on many units against the fake systemd."""
+
+    units = 30
+
+    def setUp(self):
+        from systemd.manager import Manager
+        self.manager = Manager()
+
+    def test_start_units(self):
+        from systemd.exceptions import SystemdError
+        from systemd.job import Job
+        self.service.reset_call_counts()
+        results = self.manager.start_units(self.names + ['missing.service'], 'replace', max_in_flight=8)
+        self.assertEqual(list(results), self.names + ['missing.service'])
+        self.assertTrue(all(isinstance(results[name], Job) for name in self.names))
+        self.assertIsInstance(results['missing.service'], SystemdError)
+        self.assertEqual(self.service.call_counts()['StartUnit'], 31)
+
+    def test_wait_jobs(self):
+        jobs = self.manager.restart_units(self.names, 'replace')
+        results = self.manager.wait_jobs(jobs.values(), timeout=10)
+        self.assertEqual(set(results.values()), set(['done']))
+        # Finished jobs resolve from the recorded JobRemoved signals, without waiting.
+        self.assertEqual(list(jobs.values())[0].wait(timeout=0), 'done')
+
+    def test_fetch_properties(self):
+        from systemd.exceptions import SystemdError
+        self.service.reset_call_counts()
+        results = self.manager.fetch_properties(
+            self.names + ['missing.service'],
+            interfaces=('org.freedesktop.systemd1.Unit', 'org.freedesktop.systemd1.Service'), max_in_flight=8)
+        self.assertEqual(self.service.call_counts()['GetAll'], 2 * 31)
+        self.assertEqual(results[self.names[3]]['Id'], self.names[3])
+        self.assertIn('MainPID', results[self.names[3]])
+        self.assertIsInstance(results['missing.service'], SystemdError)
+
+        results = self.manager.fetch_properties(self.names, names=['ActiveState'])
+        self.assertEqual(set(len(properties) for properties in results.values()), set([1]))
+
+    def test_errors_are_wrapped(self):
+        from systemd.bus import registry
+        from systemd.exceptions import SystemdError
+        units = self.manager.iter_units()
+        # Nothing listens there, so every call fails to connect.
+        registry.configure(address='unix:path=/nonexistent/bus')
+        self.addCleanup(registry.configure, address=self.service.address)
+        with self.assertRaises(SystemdError):
+            self.manager.start_units(self.names, 'replace')
+        with self.assertRaises(SystemdError):
+            self.manager.fetch_properties(self.names)
+        # Raised as the generator is iterated, not when it is made.
+        with self.assertRaises(SystemdError):
+            next(units)
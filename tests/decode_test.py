@@ -0,0 +1,62 @@
+import datetime
+import unittest
+
+from tests import fake_systemd
+
+try:
+    import dbus
+except ImportError:
+    dbus = None
+
+
+@unittest.skipIf(dbus is None, 'dbus-python is required')
+class DecodeTest(unittest.TestCase):
+    """Conversion of dbus-python values to native types."""
+
+    def test_native(self):
+        from systemd.decode import native
+        value = native(dbus.Struct((dbus.String('a'), dbus.UInt32(1), dbus.Boolean(True),
+                                    dbus.Array([dbus.ObjectPath('/x')], signature='o'),
+                                    dbus.Dictionary({dbus.String('k'): dbus.Double(0.5)}, signature='sv'),
+                                    dbus.Array([dbus.Byte(104), dbus.Byte(105)], signature='y'))))
+        self.assertEqual(value, ('a', 1, True, ('/x',), {'k': 0.5}, b'hi'))
+        self.assertEqual([type(item) for item in value], [str, int, bool, tuple, dict, bytes])
+        self.assertIs(type(value[3][0]), str)
+
+    def test_times(self):
+        from systemd.decode import decoder
+        decode = decoder.decode
+        interface = 'org.freedesktop.systemd1.Unit'
+        self.assertEqual(decode(interface, 'ActiveEnterTimestamp', dbus.UInt64(1500000000 * 10 ** 6)),
+                         datetime.datetime(2017, 7, 14, 2, 40, tzinfo=datetime.timezone.utc))
+        self.assertIsNone(decode(interface, 'InactiveExitTimestamp', dbus.UInt64(0)))
+        self.assertEqual(decode(interface, 'ActiveEnterTimestampMonotonic', dbus.UInt64(5 * 10 ** 6)),
+                         datetime.timedelta(seconds=5))
+        self.assertEqual(decode(interface, 'JobTimeoutUSec', dbus.UInt64(1500)), datetime.timedelta(microseconds=1500))
+        self.assertIsNone(decode(interface, 'JobTimeoutUSec', dbus.UInt64(2 ** 64 - 1)))
+        self.assertEqual(decode('org.freedesktop.systemd1.Service', 'CPUUsageNSec', dbus.UInt64(2 * 10 ** 9)),
+                         datetime.timedelta(seconds=2))
+        self.assertEqual(decode('org.freedesktop.systemd1.Timer', 'LastTriggerUSec', dbus.UInt64(10 ** 6)),
+                         datetime.datetime(1970, 1, 1, 0, 0, 1, tzinfo=datetime.timezone.utc))
+
+
+class DecodedPropertiesTest(fake_systemd.FakeSystemdTestCase):
+    """Properties of units are stored as native values."""
+
+    units = 2
+
+    def test_unit_properties(self):
+        from systemd.manager import Manager
+        properties = Manager().get_unit(fake_systemd.unit_name(0)).properties
+        self.assertIs(type(properties.Id), str)
+        self.assertIs(type(properties.CanStart), bool)
+        self.assertEqual(properties.Job, (0, '/'))
+        self.assertEqual(properties.Names, (fake_systemd.unit_name(0),))
+        self.assertIsNone(properties.ActiveEnterTimestamp)
+
+    def test_fetched_properties(self):
+        from systemd.manager import Manager
+        name = fake_systemd.unit_name(1)
+        properties = Manager().fetch_properties([name], interfaces=('org.freedesktop.systemd1.Service',))[name]
+        self.assertIs(type(properties['MainPID']), int)
+        self.assertEqual(properties['MemoryMax'], 2 ** 64 - 1)
@@ -0,0 +1,35 @@
+from tests import fake_systemd
+
+
+class PropertiesChangedTest(fake_systemd.FakeSystemdTestCase):
+    """PropertiesChanged signals are merged into the loaded properties of a watched unit."""
+
+    units = 2
+
+    def setUp(self):
+        from systemd.manager import Manager
+        self.manager = Manager()
+        self.unit = self.manager.get_unit(self.names[0])
+        self.unit.properties.Id
+
+    def test_changed_and_invalidated(self):
+        from systemd.base import SystemdDbusObject
+        stats = SystemdDbusObject.property_stats.copy()
+        self.service.reset_call_counts()
+        self.service.change_properties(
+            self.names[0],
+            {'ActiveState': 'active', 'SubState': 'running'},
+            {'UnitFileState': 'disabled', 'Description': 'Changed'})
+        applied = stats['deltas_applied']
+        fake_systemd.pump(lambda: SystemdDbusObject.property_stats['deltas_applied'] > applied, timeout=5)
+
+        properties = self.unit.properties
+        self.assertEqual((properties.ActiveState, properties.SubState), ('active', 'running'))
+        self.assertEqual((properties.UnitFileState, properties.Description), ('disabled', 'Changed'))
+        # The other properties were kept rather than fetched again.
+        self.assertEqual(properties.Id, self.names[0])
+        # Only the invalidated properties were fetched, one Get each.
+        self.assertEqual(self.service.call_counts(), {'Get': 2})
+        self.assertEqual(SystemdDbusObject.property_stats['deltas_applied'], stats['deltas_applied'] + 1)
+        self.assertEqual(SystemdDbusObject.property_stats['fallback_fetches'], stats['fallback_fetches'] + 2)
+        self.assertEqual(SystemdDbusObject.property_stats['marked_stale'], stats['marked_stale'])
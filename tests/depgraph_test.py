@@ -0,0 +1,96 @@
+from tests import fake_systemd
+
+
+class DependencyGraphTest(fake_systemd.FakeSystemdTestCase):
+    """The dependency graph is built from one sweep and then follows signals."""
+
+    units = 6
+
+    @classmethod
+    def setUpClass(cls):
+        super(DependencyGraphTest, cls).setUpClass()
+        # 0 requires 1, which wants 2; 3 is bound to 1 and ordered after it.
+        cls.service.set_dependencies(cls.names[0], 'Requires', [cls.names[1]])
+        cls.service.set_dependencies(cls.names[1], 'Wants', [cls.names[2]])
+        cls.service.set_dependencies(cls.names[3], 'BindsTo', [cls.names[1]])
+        cls.service.set_dependencies(cls.names[3], 'After', [cls.names[1]])
+        cls.service.set_dependencies(cls.names[1], 'After', [cls.names[2]])
+
+    def setUp(self):
+        from gi.repository import GLib
+        from systemd.manager import Manager
+        self.manager = Manager()
+        # The signals of the cleanup of the previous test arrived before the replies to the calls made above: dispatch
+        # them now, so that they are not taken for the signals of this test.
+        while GLib.MainContext.default().iteration(False):
+            pass
+        self.service.reset_call_counts()
+        self.graph = self.manager.dependency_graph()
+
+    def tearDown(self):
+        self.graph.close()
+
+    def pump(self, condition):
+        fake_systemd.pump(condition, timeout=5)
+
+    def test_one_sweep(self):
+        self.assertEqual(len(self.graph), 6)
+        self.assertEqual(self.graph.dependencies(self.names[0]), set([self.names[1]]))
+        counts = self.service.call_counts()
+        self.assertEqual(counts['ListUnits'], 1)
+        self.assertEqual(counts['GetAll'], 6)
+        # Queries are answered from the index.
+        self.graph.reverse_dependencies(self.names[1])
+        self.assertEqual(self.service.call_counts()['GetAll'], 6)
+
+    def test_queries(self):
+        names = self.names
+        self.assertEqual(self.graph.reverse_dependencies(names[1]), set([names[0], names[3]]))
+        self.assertEqual(self.graph.reverse_dependencies(names[2], kinds=('Wants',)), set([names[1]]))
+        self.assertEqual(self.graph.closure(names[0]), set([names[1], names[2]]))
+        self.assertEqual(self.graph.closure(names[2], reverse=True), set([names[0], names[1], names[3]]))
+        # Wants does not propagate stops.
+        self.assertEqual(self.graph.affected_by_stop(names[1]), set([names[0], names[3]]))
+        self.assertEqual(self.graph.affected_by_stop(names[2]), set())
+        self.assertEqual(self.graph.order([names[3], names[0], names[1], names[2]]),
+                         [names[0], names[2], names[1], names[3]])
+
+    def set_dependencies(self, name, kind, names, invalidate=False):
+        """Set dependencies on the fake for this test only; they are cleared again even if the test fails."""
+        self.addCleanup(self.service.set_dependencies, name, kind, [])
+        self.service.set_dependencies(name, kind, names, invalidate)
+
+    def test_cycle(self):
+        from systemd.depgraph import DependencyCycle
+        self.graph.build()
+        self.set_dependencies(self.names[2], 'After', [self.names[3]])
+        self.pump(lambda: self.graph.stats['deltas_applied'] >= 1)
+        with self.assertRaises(DependencyCycle) as context:
+            self.graph.order(self.names[1:4])
+        self.assertEqual(context.exception.units, self.names[1:4])
+
+    def test_incremental(self):
+        names = self.names
+        self.graph.build()
+        self.service.reset_call_counts()
+
+        self.set_dependencies(names[4], 'Requires', [names[5]])
+        self.pump(lambda: self.graph.stats['deltas_applied'] >= 1)
+        self.assertEqual(self.graph.reverse_dependencies(names[5]), set([names[4]]))
+
+        self.set_dependencies(names[5], 'Wants', [names[0]], invalidate=True)
+        self.pump(lambda: self.graph.stats['deltas_applied'] >= 2)
+        self.assertEqual(self.graph.dependencies(names[5]), set([names[0]]))
+        self.assertEqual(self.graph.stats['refetches'], 1)
+
+        self.service.add_unit('extra.service')
+        self.pump(lambda: self.graph.stats['units_new'] >= 1)
+        self.assertIn('extra.service', self.graph)
+        self.service.remove_unit('extra.service')
+        self.pump(lambda: self.graph.stats['units_removed'] >= 1)
+        self.assertNotIn('extra.service', self.graph)
+
+        self.assertEqual(self.graph.stats['builds'], 1)
+        counts = self.service.call_counts()
+        self.assertEqual(counts.get('ListUnits', 0), 0)
+        self.assertEqual(counts['GetAll'], 2)
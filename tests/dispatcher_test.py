@@ -0,0 +1,28 @@
+from tests import fake_systemd
+
+
+class SignalMatchTest(fake_systemd.FakeSystemdTestCase):
+    """Watched units share a single PropertiesChanged match rule on the connection."""
+
+    units = 20
+
+    def properties_changed_rules(self):
+        from systemd.bus import registry
+        connection = registry.get_connection()
+        bus = connection.get_object('org.freedesktop.DBus', '/org/freedesktop/DBus')
+        rules = bus.GetAllMatchRules(dbus_interface='org.freedesktop.DBus.Debug.Stats')
+        return [str(rule) for rule in rules[connection.get_unique_name()] if "member='PropertiesChanged'" in rule]
+
+    def test_one_match_rule(self):
+        from systemd.manager import Manager
+        from systemd.signals import dispatcher
+        units = Manager().list_units(watch=True)
+        self.assertEqual(len(units), self.units)
+        self.assertTrue(all(dispatcher.is_watched(unit) for unit in units))
+        self.assertEqual(len(self.properties_changed_rules()), 1)
+
+        # The rule is the dispatcher's, not the units': it stays when they stop watching.
+        for unit in units:
+            unit.unwatch()
+        self.assertFalse(any(dispatcher.is_watched(unit) for unit in units))
+        self.assertEqual(len(self.properties_changed_rules()), 1)
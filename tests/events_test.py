@@ -0,0 +1,54 @@
+from tests import fake_systemd
+
+
+class EventStreamTest(fake_systemd.FakeSystemdTestCase):
+    """Typed events from the signals of the fake systemd."""
+
+    units = 10
+    job_delay = 0.05
+
+    def setUp(self):
+        from systemd.manager import Manager
+        self.manager = Manager()
+
+    def collect(self, events, count, member):
+        received = []
+        while sum(1 for event in received if type(event).__name__ == member) < count:
+            event = events.get(timeout=5)
+            self.assertIsNotNone(event, 'timed out waiting for %s' % member)
+            received.append(event)
+        return received
+
+    def test_job_events(self):
+        from systemd.events import JobNew, JobRemoved, PropertiesChanged
+        with self.manager.events() as events:
+            self.manager.start_units(self.names, 'replace')
+            received = self.collect(events, 10, 'JobRemoved')
+        self.assertEqual(sorted(event.unit_name for event in received if isinstance(event, JobNew)), self.names)
+        self.assertEqual(set(event.result for event in received if isinstance(event, JobRemoved)), set(['done']))
+        self.assertTrue(any(isinstance(event, PropertiesChanged) and event.changed.get('ActiveState') == 'active'
+                            for event in received))
+
+    def test_coalescing(self):
+        from systemd.events import PropertiesChanged
+        with self.manager.events(members=['PropertiesChanged', 'JobRemoved'], coalesce=0.5) as events:
+            self.manager.restart_units(self.names, 'replace')
+            received = self.collect(events, 10, 'JobRemoved')
+            changes = [event for event in received if isinstance(event, PropertiesChanged)]
+            # The Job and ActiveState updates of each unit arrive within the window and are merged.
+            self.assertEqual(len(changes), 10)
+            self.assertGreater(events.stats['coalesced'], 0)
+
+    def test_overflow(self):
+        with self.manager.events(members=['JobNew'], maxsize=3, overflow='drop_newest') as events:
+            jobs = self.manager.stop_units(self.names, 'replace')
+            self.manager.wait_jobs(jobs.values(), timeout=5)
+            # Every JobNew signal is dispatched before the stream is read (by the main loop thread, if another test
+            # started it, else while waiting).
+            fake_systemd.pump(lambda: events.stats['received'] == 10, timeout=5)
+            self.assertEqual(len(events), 3)
+            while events.get(timeout=0) is not None:
+                pass
+            self.assertEqual(events.stats['delivered'], 3)
+            self.assertEqual(events.stats['dropped'], 7)
+            self.assertEqual(events.high_water, 3)
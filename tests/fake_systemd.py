@@ -0,0 +1,650 @@
+"""A fake org.freedesktop.systemd1 service running on a private dbus-daemon.
+
+Tests and benchmarks use it to exercise the library against a real D-Bus connection without touching (or halting!) the
+systemd of the machine they run on.  The service runs in a subprocess:
+
+    python -m tests.fake_systemd --address <bus address> --units 100 --jobs 10 [--private <socket path>]
+
+and counts every method call it receives, which the client can read back through CallCounts() on the
+net.python_systemd.FakeSystemd interface of /org/freedesktop/systemd1.  Calls to that interface itself are not
+counted, so the counts are only those of the library under test.  With --private, it also serves peer-to-peer
+connections on a socket of its own, standing in for /run/systemd/private.
+"""
+
+import argparse
+import collections
+import gc
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+try:
+    import dbus
+    import dbus.bus
+    import dbus.lowlevel
+    import dbus.server
+    import dbus.service
+    import dbus.mainloop.glib
+except ImportError:
+    dbus = None
+
+try:
+    from gi.repository import GLib
+except ImportError:
+    GLib = None
+
+
+BUS_NAME = 'org.freedesktop.systemd1'
+MANAGER_PATH = '/org/freedesktop/systemd1'
+MANAGER_IFACE = 'org.freedesktop.systemd1.Manager'
+UNIT_IFACE = 'org.freedesktop.systemd1.Unit'
+SERVICE_IFACE = 'org.freedesktop.systemd1.Service'
+JOB_IFACE = 'org.freedesktop.systemd1.Job'
+CONTROL_IFACE = 'net.python_systemd.FakeSystemd'
+PROPERTIES_IFACE = 'org.freedesktop.DBus.Properties'
+
+BUS_CONFIG = """<!DOCTYPE busconfig PUBLIC "-//freedesktop//DTD D-Bus Bus Configuration 1.0//EN"
+ "http://www.freedesktop.org/standards/dbus/1.0/busconfig.dtd">
+<busconfig>
+  <type>session</type>
+  <listen>unix:dir=%s</listen>
+  <auth>EXTERNAL</auth>
+  <policy context="default">
+    <allow send_destination="*" eavesdrop="true"/>
+    <allow eavesdrop="true"/>
+    <allow own="*"/>
+  </policy>
+</busconfig>
+"""
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def is_available():
+    return dbus is not None and GLib is not None and shutil.which('dbus-daemon') is not None
+
+
+def skip_unless_available(obj):
+    return unittest.skipUnless(is_available(), 'dbus-python, PyGObject and dbus-daemon are required')(obj)
+
+
+def escape_path(name):
+    """Escape a unit name the way systemd does for object paths (ie: 'sshd.service' -> 'sshd_2eservice')."""
+    return ''.join(c if c.isalpha() or (i > 0 and c.isdigit()) else '_%02x' % ord(c) for i, c in enumerate(name))
+
+
+def unit_path(name):
+    return '%s/unit/%s' % (MANAGER_PATH, escape_path(name))
+
+
+def unit_name(i):
+    return 'fake-%05d.service' % i
+
+
+def pump(condition, timeout=30):
+    """Dispatch signals from the default GLib main context until condition() is true."""
+    context = GLib.MainContext.default()
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise RuntimeError('timed out waiting for signals')
+        if not context.iteration(False):
+            time.sleep(0.001)
+
+
+def _no_such_unit(name):
+    return dbus.exceptions.DBusException('Unit %s not loaded.' % name, name='org.freedesktop.systemd1.NoSuchUnit')
+
+
+if dbus is not None:
+
+    class PropertiesObject(dbus.service.Object):
+        """A D-Bus object implementing org.freedesktop.DBus.Properties over a dict per interface."""
+
+        # Exported on the bus and on every peer-to-peer connection.
+        SUPPORTS_MULTIPLE_CONNECTIONS = True
+
+        def __init__(self, conn, object_path, peers=()):
+            dbus.service.Object.__init__(self, conn, object_path)
+            for peer in peers:
+                self.add_to_connection(peer, object_path)
+            self.interfaces = collections.OrderedDict()
+
+        def update(self, interface, **changed):
+            self.interfaces[interface].update(changed)
+            self.PropertiesChanged(interface, changed, [])
+
+        @dbus.service.method(PROPERTIES_IFACE, in_signature='ss', out_signature='v')
+        def Get(self, interface, name):
+            for iface, properties in self.interfaces.items():
+                if interface in ('', iface) and name in properties:
+                    return properties[name]
+            raise dbus.exceptions.DBusException(
+                'Unknown property %s' % name, name='org.freedesktop.DBus.Error.UnknownProperty')
+
+        @dbus.service.method(PROPERTIES_IFACE, in_signature='s', out_signature='a{sv}')
+        def GetAll(self, interface):
+            if interface == '':
+                merged = {}
+                for properties in self.interfaces.values():
+                    merged.update(properties)
+                return merged
+            try:
+                return self.interfaces[interface]
+            except KeyError:
+                raise dbus.exceptions.DBusException(
+                    "Unknown interface '%s'." % interface, name='org.freedesktop.DBus.Error.UnknownInterface')
+
+        @dbus.service.method(PROPERTIES_IFACE, in_signature='ssv', out_signature='')
+        def Set(self, interface, name, value):
+            self.update(interface, **{name: value})
+
+        @dbus.service.signal(PROPERTIES_IFACE, signature='sa{sv}as')
+        def PropertiesChanged(self, interface, changed, invalidated):
+            pass
+
+    class FakeUnit(PropertiesObject):
+
+        def __init__(self, systemd, name):
+            PropertiesObject.__init__(self, systemd.conn, unit_path(name), systemd.peers)
+            self.systemd = systemd
+            self.name = name
+            self.path = unit_path(name)
+            self.interfaces[UNIT_IFACE] = {
+                'Id': dbus.String(name),
+                'Names': dbus.Array([name], signature='s'),
+                'Description': dbus.String('Fake unit %s' % name),
+                'LoadState': dbus.String('loaded'),
+                'ActiveState': dbus.String('inactive'),
+                'SubState': dbus.String('dead'),
+                'Following': dbus.String(''),
+                'FragmentPath': dbus.String('/etc/systemd/system/%s' % name),
+                'UnitFileState': dbus.String('enabled'),
+                'Requires': dbus.Array([], signature='s'),
+                'Wants': dbus.Array([], signature='s'),
+                'After': dbus.Array([], signature='s'),
+                'Before': dbus.Array([], signature='s'),
+                'RequiredBy': dbus.Array([], signature='s'),
+                'WantedBy': dbus.Array([], signature='s'),
+                'ActiveEnterTimestamp': dbus.UInt64(0),
+                'InactiveEnterTimestamp': dbus.UInt64(0),
+                'CanStart': dbus.Boolean(True),
+                'CanStop': dbus.Boolean(True),
+                'Job': dbus.Struct((dbus.UInt32(0), dbus.ObjectPath('/')), signature='uo'),
+            }
+            if name.endswith('.service'):
+                self.interfaces[SERVICE_IFACE] = {
+                    'Type': dbus.String('simple'),
+                    'Restart': dbus.String('no'),
+                    'MainPID': dbus.UInt32(0),
+                    'ExecMainPID': dbus.UInt32(0),
+                    'MemoryCurrent': dbus.UInt64(2 ** 64 - 1),
+                    'CPUQuotaPerSecUSec': dbus.UInt64(2 ** 64 - 1),
+                    'MemoryMax': dbus.UInt64(2 ** 64 - 1),
+                    'TasksMax': dbus.UInt64(2 ** 64 - 1),
+                }
+
+        def record(self):
+            unit = self.interfaces[UNIT_IFACE]
+            job_id, job_path = unit['Job']
+            job_type = self.systemd.jobs[job_id].job_type if job_id in self.systemd.jobs else ''
+            return dbus.Struct(
+                (unit['Id'], unit['Description'], unit['LoadState'], unit['ActiveState'], unit['SubState'],
+                 unit['Following'], dbus.ObjectPath(self.path), job_id, dbus.String(job_type),
+                 dbus.ObjectPath(job_path)),
+                signature='ssssssouso')
+
+        def enqueue(self, job_type):
+            return self.systemd.enqueue(self, job_type).path
+
+        def set_properties(self, properties):
+            """Apply (name, value) pairs, each to the interface having that property (else the Unit interface)."""
+            changed = collections.OrderedDict()
+            for name, value in properties:
+                interface = next((iface for iface, props in self.interfaces.items() if name in props), UNIT_IFACE)
+                changed.setdefault(interface, {})[str(name)] = value
+            for interface, values in changed.items():
+                self.update(interface, **values)
+
+        @dbus.service.method(UNIT_IFACE, in_signature='s', out_signature='o')
+        def Start(self, mode):
+            return self.enqueue('start')
+
+        @dbus.service.method(UNIT_IFACE, in_signature='s', out_signature='o')
+        def Stop(self, mode):
+            return self.enqueue('stop')
+
+        @dbus.service.method(UNIT_IFACE, in_signature='s', out_signature='o')
+        def Restart(self, mode):
+            return self.enqueue('restart')
+
+        @dbus.service.method(UNIT_IFACE, in_signature='s', out_signature='o')
+        def Reload(self, mode):
+            return self.enqueue('reload')
+
+    class FakeJob(PropertiesObject):
+
+        def __init__(self, systemd, job_id, unit, job_type):
+            self.path = '%s/job/%d' % (MANAGER_PATH, job_id)
+            PropertiesObject.__init__(self, systemd.conn, self.path, systemd.peers)
+            self.systemd = systemd
+            self.id = job_id
+            self.unit = unit
+            self.job_type = job_type
+            self.interfaces[JOB_IFACE] = {
+                'Id': dbus.UInt32(job_id),
+                'Unit': dbus.Struct((unit.name, dbus.ObjectPath(unit.path)), signature='so'),
+                'JobType': dbus.String(job_type),
+                'State': dbus.String('waiting'),
+            }
+
+        def record(self):
+            return dbus.Struct(
+                (dbus.UInt32(self.id), self.unit.name, self.job_type, dbus.String('waiting'),
+                 dbus.ObjectPath(self.path), dbus.ObjectPath(self.unit.path)),
+                signature='usssoo')
+
+        @dbus.service.method(JOB_IFACE, in_signature='', out_signature='')
+        def Cancel(self):
+            self.systemd.finish(self, 'canceled')
+
+    class FakeManager(PropertiesObject):
+
+        def __init__(self, systemd):
+            PropertiesObject.__init__(self, systemd.conn, MANAGER_PATH, systemd.peers)
+            self.systemd = systemd
+            self.interfaces[MANAGER_IFACE] = {
+                'Version': dbus.String('fake'),
+                'Architecture': dbus.String('x86-64'),
+                'NNames': dbus.UInt32(0),
+                'NJobs': dbus.UInt32(0),
+            }
+
+        def unit(self, name):
+            try:
+                return self.systemd.units[name]
+            except KeyError:
+                raise _no_such_unit(name)
+
+        @dbus.service.method(MANAGER_IFACE, in_signature='', out_signature='')
+        def Subscribe(self):
+            pass
+
+        @dbus.service.method(MANAGER_IFACE, in_signature='', out_signature='')
+        def Unsubscribe(self):
+            pass
+
+        @dbus.service.method(MANAGER_IFACE, in_signature='s', out_signature='o')
+        def GetUnit(self, name):
+            return self.unit(name).path
+
+        @dbus.service.method(MANAGER_IFACE, in_signature='s', out_signature='o')
+        def LoadUnit(self, name):
+            return self.unit(name).path
+
+        @dbus.service.method(MANAGER_IFACE, in_signature='u', out_signature='o', message_keyword='message')
+        def GetUnitByPID(self, pid, message):
+            # Like sd-bus, refuse arguments that do not match the signature exactly.
+            if message.get_signature() != 'u':
+                raise dbus.exceptions.DBusException(
+                    'Invalid signature %s' % message.get_signature(), name='org.freedesktop.DBus.Error.InvalidArgs')
+            raise dbus.exceptions.DBusException(
+                'No unit for PID %d is loaded.' % pid, name='org.freedesktop.systemd1.NoSuchUnit')
+
+        @dbus.service.method(MANAGER_IFACE, in_signature='u', out_signature='o')
+        def GetJob(self, job_id):
+            try:
+                return self.systemd.jobs[job_id].path
+            except KeyError:
+                raise dbus.exceptions.DBusException(
+                    'Job %d does not exist.' % job_id, name='org.freedesktop.systemd1.NoSuchJob')
+
+        @dbus.service.method(MANAGER_IFACE, in_signature='', out_signature='a(ssssssouso)')
+        def ListUnits(self):
+            return [unit.record() for unit in self.systemd.units.values()]
+
+        @dbus.service.method(MANAGER_IFACE, in_signature='as', out_signature='a(ssssssouso)')
+        def ListUnitsFiltered(self, states):
+            return [record for record in self.ListUnits() if set(states) & set(record[2:5])]
+
+        # No ListUnitsByPatterns, so that clients fall back to filtering ListUnits themselves.
+        @dbus.service.method(MANAGER_IFACE, in_signature='as', out_signature='a(ssssssouso)')
+        def ListUnitsByNames(self, names):
+            return [self.unit(name).record() for name in names]
+
+        @dbus.service.method(MANAGER_IFACE, in_signature='', out_signature='a(usssoo)')
+        def ListJobs(self):
+            return [job.record() for job in self.systemd.jobs.values()]
+
+        @dbus.service.method(MANAGER_IFACE, in_signature='', out_signature='a(ss)')
+        def ListUnitFiles(self):
+            return [('/usr/lib/systemd/system/' + name, 'enabled') for name in self.systemd.units]
+
+        @dbus.service.method(MANAGER_IFACE, in_signature='s', out_signature='s')
+        def GetUnitFileState(self, name):
+            self.unit(name)
+            return 'enabled'
+
+        @dbus.service.method(MANAGER_IFACE, in_signature='ssa(sv)a(sa(sv))', out_signature='o')
+        def StartTransientUnit(self, name, mode, properties, aux):
+            if name in self.systemd.units:
+                raise dbus.exceptions.DBusException(
+                    'Unit %s already exists.' % name, name='org.freedesktop.systemd1.UnitExists')
+            for aux_name, aux_properties in aux:
+                self.systemd.add_unit(aux_name).set_properties(aux_properties)
+            unit = self.systemd.add_unit(name)
+            unit.set_properties(properties)
+            return unit.enqueue('start')
+
+        @dbus.service.method(MANAGER_IFACE, in_signature='sba(sv)', out_signature='')
+        def SetUnitProperties(self, name, runtime, properties):
+            self.unit(name).set_properties(properties)
+
+        @dbus.service.method(MANAGER_IFACE, in_signature='ss', out_signature='o')
+        def StartUnit(self, name, mode):
+            return self.unit(name).enqueue('start')
+
+        @dbus.service.method(MANAGER_IFACE, in_signature='ss', out_signature='o')
+        def StopUnit(self, name, mode):
+            return self.unit(name).enqueue('stop')
+
+        @dbus.service.method(MANAGER_IFACE, in_signature='ss', out_signature='o')
+        def RestartUnit(self, name, mode):
+            return self.unit(name).enqueue('restart')
+
+        @dbus.service.method(MANAGER_IFACE, in_signature='ss', out_signature='o')
+        def ReloadUnit(self, name, mode):
+            return self.unit(name).enqueue('reload')
+
+        @dbus.service.signal(MANAGER_IFACE, signature='uos')
+        def JobNew(self, job_id, job_path, unit):
+            pass
+
+        @dbus.service.signal(MANAGER_IFACE, signature='uoss')
+        def JobRemoved(self, job_id, job_path, unit, result):
+            pass
+
+        @dbus.service.signal(MANAGER_IFACE, signature='so')
+        def UnitNew(self, name, path):
+            pass
+
+        @dbus.service.signal(MANAGER_IFACE, signature='so')
+        def UnitRemoved(self, name, path):
+            pass
+
+        @dbus.service.method(CONTROL_IFACE, in_signature='', out_signature='a{su}')
+        def CallCounts(self):
+            return dict(self.systemd.call_counts)
+
+        @dbus.service.method(CONTROL_IFACE, in_signature='', out_signature='')
+        def ResetCallCounts(self):
+            self.systemd.call_counts.clear()
+
+        @dbus.service.method(CONTROL_IFACE, in_signature='asb', out_signature='')
+        def Touch(self, names, invalidate):
+            """Emit PropertiesChanged for the ActiveEnterTimestamp of each unit; only its name if invalidate."""
+            for name in names:
+                unit = self.unit(name)
+                unit.interfaces[UNIT_IFACE]['ActiveEnterTimestamp'] += 1
+                if invalidate:
+                    unit.PropertiesChanged(UNIT_IFACE, {}, ['ActiveEnterTimestamp'])
+                else:
+                    unit.PropertiesChanged(
+                        UNIT_IFACE, {'ActiveEnterTimestamp': unit.interfaces[UNIT_IFACE]['ActiveEnterTimestamp']}, [])
+
+        @dbus.service.method(CONTROL_IFACE, in_signature='ssasb', out_signature='')
+        def SetDependencies(self, name, kind, names, invalidate):
+            """Set a dependency property (ie: Requires) of a unit and emit PropertiesChanged for it."""
+            unit = self.unit(name)
+            value = unit.interfaces[UNIT_IFACE][kind] = dbus.Array(names, signature='s')
+            if invalidate:
+                unit.PropertiesChanged(UNIT_IFACE, {}, [kind])
+            else:
+                unit.PropertiesChanged(UNIT_IFACE, {kind: value}, [])
+
+        @dbus.service.method(CONTROL_IFACE, in_signature='sa{sv}a{sv}', out_signature='')
+        def ChangeProperties(self, name, changed, invalidated):
+            """Set Unit properties of a unit and emit one PropertiesChanged: with the values of changed, and only the
+            names of invalidated."""
+            unit = self.unit(name)
+            unit.interfaces[UNIT_IFACE].update(changed)
+            unit.interfaces[UNIT_IFACE].update(invalidated)
+            unit.PropertiesChanged(UNIT_IFACE, changed, list(invalidated))
+
+        @dbus.service.method(CONTROL_IFACE, in_signature='s', out_signature='')
+        def AddUnit(self, name):
+            self.systemd.add_unit(name)
+
+        @dbus.service.method(CONTROL_IFACE, in_signature='s', out_signature='')
+        def RemoveUnit(self, name):
+            self.systemd.remove_unit(name)
+
+    class FakeSystemd(object):
+        """The state of the fake systemd: its units, its jobs and the number of method calls received."""
+
+        def __init__(self, conn, n_units=0, n_jobs=0, job_delay=0.01):
+            self.conn = conn
+            self.job_delay = job_delay
+            self.call_counts = collections.Counter()
+            self.units = collections.OrderedDict()
+            self.jobs = collections.OrderedDict()
+            self.peers = []
+            self._next_job_id = 1
+            conn.add_message_filter(self._count_call)
+            self.manager = FakeManager(self)
+            for i in range(n_units):
+                self.add_unit(unit_name(i))
+            # Jobs that stay queued until canceled, for listings.
+            for i in range(n_jobs):
+                self.enqueue(self.units[unit_name(i % n_units)], 'start', persistent=True)
+
+        def _count_call(self, conn, message):
+            if isinstance(message, dbus.lowlevel.MethodCallMessage) and message.get_interface() != CONTROL_IFACE:
+                self.call_counts[message.get_member()] += 1
+            # Anything else (ie: None) would mean the message was handled, and the call would get no reply.
+            return dbus.lowlevel.HANDLER_RESULT_NOT_YET_HANDLED
+
+        def _objects(self):
+            return [self.manager] + list(self.units.values()) + list(self.jobs.values())
+
+        def add_peer(self, conn):
+            """Serve conn, a new peer-to-peer connection to the private socket, until it is closed."""
+            self.peers.append(conn)
+            conn.add_message_filter(self._count_call)
+            for obj in self._objects():
+                obj.add_to_connection(conn, obj.__dbus_object_path__)
+            conn.call_on_disconnection(self._remove_peer)
+
+        def _remove_peer(self, conn):
+            # Not from the disconnection callback itself: dbus-python loses track of the server's connections if the
+            # last reference to one goes away in there.
+            GLib.idle_add(self._forget_peer, conn)
+
+        def _forget_peer(self, conn):
+            self.peers.remove(conn)
+            for obj in self._objects():
+                obj.remove_from_connection(conn)
+            return False
+
+        def add_unit(self, name):
+            unit = self.units[name] = FakeUnit(self, name)
+            self.manager.UnitNew(name, unit.path)
+            return unit
+
+        def remove_unit(self, name):
+            unit = self.units.pop(name)
+            unit.remove_from_connection()
+            self.manager.UnitRemoved(name, unit.path)
+
+        def enqueue(self, unit, job_type, persistent=False):
+            job = FakeJob(self, self._next_job_id, unit, job_type)
+            self._next_job_id += 1
+            self.jobs[job.id] = job
+            unit.update(UNIT_IFACE, Job=dbus.Struct((dbus.UInt32(job.id), dbus.ObjectPath(job.path)), signature='uo'))
+            self.manager.JobNew(job.id, job.path, unit.name)
+            if not persistent:
+                GLib.timeout_add(int(self.job_delay * 1000), self.finish, job, 'done')
+            return job
+
+        def finish(self, job, result):
+            if self.jobs.pop(job.id, None) is None:
+                return False
+            unit = job.unit
+            if result == 'done':
+                if job.job_type == 'stop':
+                    unit.update(UNIT_IFACE, ActiveState=dbus.String('inactive'), SubState=dbus.String('dead'))
+                else:
+                    unit.update(UNIT_IFACE, ActiveState=dbus.String('active'), SubState=dbus.String('running'))
+            unit.update(UNIT_IFACE, Job=dbus.Struct((dbus.UInt32(0), dbus.ObjectPath('/')), signature='uo'))
+            job.remove_from_connection()
+            self.manager.JobRemoved(job.id, job.path, unit.name, result)
+            return False
+
+
+class PrivateBus(object):
+    """A dbus-daemon started in a temporary directory, stopped with stop()."""
+
+    def __init__(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='python-systemd-')
+        config = os.path.join(self.tmpdir, 'bus.conf')
+        with open(config, 'w') as f:
+            f.write(BUS_CONFIG % self.tmpdir)
+        self.process = subprocess.Popen(
+            ['dbus-daemon', '--config-file=%s' % config, '--print-address=1', '--nofork', '--nopidfile'],
+            stdout=subprocess.PIPE, universal_newlines=True)
+        self.address = self.process.stdout.readline().strip()
+
+    def stop(self):
+        self.process.terminate()
+        self.process.wait()
+        self.process.stdout.close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+
+class FakeSystemdService(object):
+    """A private bus with the fake systemd running on it, for use from tests and benchmarks."""
+
+    def __init__(self, units=10, jobs=0, job_delay=0.01, private=False):
+        self.bus = PrivateBus()
+        self.address = self.bus.address
+        self._args = ['--units', str(units), '--jobs', str(jobs), '--job-delay', str(job_delay)]
+        # The stand-in for /run/systemd/private, if asked for.
+        self.private_address = None
+        if private:
+            path = os.path.join(self.bus.tmpdir, 'private')
+            self.private_address = 'unix:path=%s' % path
+            self._args += ['--private', path]
+        self._start()
+        self._conn = dbus.bus.BusConnection(self.address)
+
+    def _start(self):
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'tests.fake_systemd', '--address', self.address] + self._args,
+            cwd=ROOT_DIR, stdout=subprocess.PIPE, universal_newlines=True)
+        if self.process.stdout.readline().strip() != 'READY':
+            self.stop()
+            raise RuntimeError('fake systemd failed to start')
+
+    def reexecute(self):
+        """Restart the fake systemd on the same bus, like daemon-reexec: the bus name gets a new owner, which has
+        forgotten subscriptions and the changes made since it started."""
+        self._stop_process()
+        self._start()
+
+    def _control(self):
+        return dbus.Interface(self._conn.get_object(BUS_NAME, MANAGER_PATH, introspect=False), CONTROL_IFACE)
+
+    def call_counts(self):
+        return dict((str(k), int(v)) for k, v in self._control().CallCounts().items())
+
+    def reset_call_counts(self):
+        self._control().ResetCallCounts()
+
+    def touch(self, names, invalidate=False):
+        self._control().Touch(names, invalidate)
+
+    def set_dependencies(self, name, kind, names, invalidate=False):
+        self._control().SetDependencies(name, kind, names, invalidate, signature='ssasb')
+
+    def change_properties(self, name, changed, invalidated):
+        self._control().ChangeProperties(name, changed, invalidated, signature='sa{sv}a{sv}')
+
+    def add_unit(self, name):
+        self._control().AddUnit(name)
+
+    def remove_unit(self, name):
+        self._control().RemoveUnit(name)
+
+    def _stop_process(self):
+        self.process.terminate()
+        self.process.wait()
+        self.process.stdout.close()
+
+    def stop(self):
+        self._stop_process()
+        self.bus.stop()
+
+
+@skip_unless_available
+class FakeSystemdTestCase(unittest.TestCase):
+    """Tests run against one fake systemd, started for their class, with the registry pointed at its bus meanwhile.
+
+    Subclasses size the fake with the class attributes below and find the names of its units in `names`; they are
+    skipped like this class when the fake cannot run.
+    """
+
+    units = 10
+    # Jobs queued from the start (one per unit in turn), which stay until canceled.
+    jobs = 0
+    job_delay = 0.01
+    private = False
+
+    @classmethod
+    def setUpClass(cls):
+        from systemd.bus import registry
+        from systemd.job import tracker
+        cls.service = FakeSystemdService(units=cls.units, jobs=cls.jobs, job_delay=cls.job_delay, private=cls.private)
+        registry.configure(address=cls.service.address)
+        # Each fake numbers its jobs from 1: the results remembered from the previous one would be taken for theirs.
+        tracker.results.clear()
+        cls.names = [unit_name(i) for i in range(cls.units)]
+
+    @classmethod
+    def tearDownClass(cls):
+        from systemd.bus import registry
+        # Managers left in reference cycles Unsubscribe() when collected: from this fake, not from the next one.
+        gc.collect()
+        registry.configure()
+        cls.service.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--address', required=True, help='address of the bus to register on')
+    parser.add_argument('--units', type=int, default=10, help='number of synthetic units')
+    parser.add_argument('--jobs', type=int, default=0, help='number of synthetic jobs that stay queued')
+    parser.add_argument('--job-delay', type=float, default=0.01, help='seconds before a job completes')
+    parser.add_argument('--private', help='path of a socket to also serve peer-to-peer connections on')
+    args = parser.parse_args(argv)
+
+    dbus.mainloop.glib.DBusGMainLoop(set_as_default=True)
+    conn = dbus.bus.BusConnection(args.address)
+    systemd = FakeSystemd(conn, n_units=args.units, n_jobs=args.jobs, job_delay=args.job_delay)
+    name = dbus.service.BusName(BUS_NAME, conn)
+    if args.private:
+        # Left behind by a previous instance (see FakeSystemdService.reexecute()).
+        if os.path.exists(args.private):
+            os.unlink(args.private)
+        server = dbus.server.Server('unix:path=%s' % args.private)
+        server.on_connection_added.append(systemd.add_peer)
+    print('READY')
+    sys.stdout.flush()
+    GLib.MainLoop().run()
+
+
+if __name__ == '__main__':
+    main()
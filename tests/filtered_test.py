@@ -0,0 +1,44 @@
+from tests import fake_systemd
+
+
+class FilteredListingTest(fake_systemd.FakeSystemdTestCase):
+    """list_units() filters with the methods the daemon has, and on this side with the others."""
+
+    units = 5
+
+    def setUp(self):
+        from systemd.manager import Manager
+        self.manager = Manager()
+        self.service.reset_call_counts()
+
+    def test_filtered_listing(self):
+        job = self.manager.start_unit(self.names[0], 'replace')
+        self.manager.wait_jobs([job], timeout=5)
+        self.service.reset_call_counts()
+
+        active = self.manager.list_units(records=True, states=['active'])
+        self.assertEqual(self.manager.last_list_method, 'ListUnitsFiltered')
+        self.assertEqual([record.name for record in active], [self.names[0]])
+
+        # The fake systemd has no ListUnitsByPatterns.
+        records = self.manager.list_units(records=True, patterns=['fake-0000[12].service'])
+        self.assertEqual(self.manager.last_list_method, 'client')
+        self.assertEqual([record.name for record in records], self.names[1:3])
+        self.assertEqual(self.service.call_counts(),
+                         {'ListUnitsFiltered': 1, 'ListUnitsByPatterns': 1, 'ListUnits': 1})
+
+        # Which is not tried again.
+        self.manager.list_units(records=True, patterns=['*'])
+        self.assertEqual(self.service.call_counts()['ListUnitsByPatterns'], 1)
+        self.assertEqual(self.manager.list_stats, {'ListUnitsFiltered': 1, 'client': 2})
+
+    def test_names_and_states(self):
+        job = self.manager.start_unit(self.names[0], 'replace')
+        self.manager.wait_jobs([job], timeout=5)
+
+        # ListUnitsByNames takes no states: they are filtered on this side.
+        records = self.manager.list_units(records=True, names=self.names[:3], states=['active'])
+        self.assertEqual(self.manager.last_list_method, 'ListUnitsByNames')
+        self.assertEqual([record.name for record in records], [self.names[0]])
+        records = self.manager.list_units(records=True, names=self.names[:3], patterns=['fake-0000[12].service'])
+        self.assertEqual([record.name for record in records], self.names[1:3])
@@ -0,0 +1,40 @@
+from tests import fake_systemd
+
+
+class IdentityMapTest(fake_systemd.FakeSystemdTestCase):
+    """A Manager hands out one live object per path, and forgets the units and jobs systemd removes."""
+
+    units = 4
+
+    def setUp(self):
+        from systemd.manager import Manager
+        self.manager = Manager()
+
+    def pump(self, condition):
+        fake_systemd.pump(condition, timeout=5)
+
+    def test_same_object(self):
+        unit = self.manager.get_unit(self.names[0])
+        self.assertIs(self.manager.get_unit(self.names[0]), unit)
+        units = self.manager.list_units()
+        self.assertTrue(any(listed is unit for listed in units))
+        # The objects are held weakly: those of the other units are only there while units holds them.
+        self.assertEqual(self.manager.identity_stats, {'hits': 2, 'misses': len(self.names)})
+
+    def test_unit_removed(self):
+        name = self.names[-1]
+        unit = self.manager.get_unit(name)
+        self.service.remove_unit(name)
+        try:
+            self.pump(lambda: self.manager.identity_stats['evictions'] == 1)
+        finally:
+            # Back for the other tests, as a new object.
+            self.service.add_unit(name)
+        self.assertIsNot(self.manager.get_unit(name), unit)
+        self.assertEqual(self.manager.identity_stats['misses'], 2)
+
+    def test_job_removed(self):
+        job = self.manager.start_unit(self.names[0], 'replace')
+        self.assertIs(self.manager.get_job(job.properties.Id), job)
+        self.assertEqual(self.manager.wait_jobs([job], timeout=5)[job], 'done')
+        self.pump(lambda: self.manager.identity_stats['evictions'] == 1)
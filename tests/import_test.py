@@ -0,0 +1,38 @@
+import subprocess
+import sys
+import unittest
+
+from tests import fake_systemd
+
+
+def imported_modules(code):
+    """Run code in a new interpreter and return the names of the modules it imported."""
+    output = subprocess.check_output(
+        [sys.executable, '-c', code + '; import sys; print(" ".join(sys.modules))'], cwd=fake_systemd.ROOT_DIR,
+        universal_newlines=True)
+    return set(output.split())
+
+
+@unittest.skipIf(fake_systemd.dbus is None, 'dbus-python is required')
+class ImportTest(unittest.TestCase):
+    """Importing the package loads only what is used, and never GLib."""
+
+    def test_lazy_submodules(self):
+        modules = imported_modules('import systemd')
+        self.assertNotIn('systemd.manager', modules)
+        self.assertNotIn('dbus', modules)
+        self.assertIn('systemd.manager', imported_modules('import systemd; systemd.Manager'))
+
+    def test_no_main_loop_at_import(self):
+        modules = imported_modules('import systemd.manager, systemd.unit, systemd.job, systemd.target')
+        self.assertNotIn('gi', modules)
+        self.assertNotIn('gobject', modules)
+        self.assertNotIn('asyncio', modules)
+
+    def test_no_main_loop_without_signals(self):
+        self.assertNotIn('gi', imported_modules(
+            'import systemd.bus, systemd.manager; systemd.bus.registry.configure(address="unix:path=/nonexistent"); '
+            'systemd.manager.Manager(signals=False)'))
+        self.assertNotIn('gi', imported_modules(
+            'import systemd.bus, systemd.manager; systemd.bus.registry.configure(address="unix:path=/nonexistent"); '
+            'systemd.manager.Manager(cache_unit_files=True, signals=False)'))
@@ -0,0 +1,34 @@
+from tests import fake_systemd
+
+
+class IntrospectionTest(fake_systemd.FakeSystemdTestCase):
+    """Proxies must not introspect: each object should cost a single GetAll before its first real call."""
+
+    units = 20
+
+    def setUp(self):
+        from systemd.manager import Manager
+        self.manager = Manager()
+        self.service.reset_call_counts()
+
+    def test_no_introspect_calls(self):
+        unit = self.manager.get_unit(fake_systemd.unit_name(1))
+        self.assertEqual(unit.properties.Id, fake_systemd.unit_name(1))
+        unit.start('replace')
+        for unit in self.manager.iter_units(watch=False):
+            unit.properties.ActiveState
+        self.assertEqual(self.service.call_counts().get('Introspect', 0), 0)
+
+    def test_one_round_trip_per_object(self):
+        units = self.manager.list_units(watch=False, lazy=False)
+        counts = self.service.call_counts()
+        self.assertEqual(counts['ListUnits'], 1)
+        self.assertEqual(counts['GetAll'], len(units))
+        self.assertEqual(sum(counts.values()), 1 + len(units))
+
+    def test_schema_signatures(self):
+        from systemd.exceptions import SystemdError
+        # 'u' rather than the 'i' dbus-python would guess from a Python int.
+        with self.assertRaises(SystemdError) as cm:
+            self.manager.get_unit_by_pid(1)
+        self.assertEqual(cm.exception.name, 'NoSuchUnit')
@@ -0,0 +1,33 @@
+from tests import fake_systemd
+
+
+class LazyListingTest(fake_systemd.FakeSystemdTestCase):
+    """Listed objects fetch their properties when first read: all at once, or one at a time with lazy='each'."""
+
+    units = 5
+
+    def setUp(self):
+        from systemd.manager import Manager
+        self.manager = Manager()
+        self.service.reset_call_counts()
+
+    def tearDown(self):
+        # Unsubscribe now, not whenever the test case is freed: it would be counted in the calls of the next test.
+        del self.manager
+
+    def test_lazy_listing(self):
+        units = self.manager.list_units(watch=False)
+        self.assertEqual(self.service.call_counts(), {'ListUnits': 1})
+        self.service.reset_call_counts()
+        units[0].properties.ActiveState
+        units[0].properties.SubState
+        self.assertEqual(self.service.call_counts().get('GetAll'), 1)
+
+    def test_lazy_each(self):
+        units = self.manager.list_units(watch=False, lazy='each')
+        self.service.reset_call_counts()
+        # Properties of the Service interface, the first one a service unit looks a property up in.
+        units[0].properties.MainPID
+        units[0].properties.MainPID
+        units[0].properties.Type
+        self.assertEqual(self.service.call_counts(), {'Get': 2})
@@ -0,0 +1,49 @@
+from tests import fake_systemd
+
+
+class MetricsTest(fake_systemd.FakeSystemdTestCase):
+    """Calls reported to the metrics hooks, blocking, pipelined and failed."""
+
+    units = 5
+
+    def setUp(self):
+        from systemd import metrics
+        from systemd.manager import Manager
+        self.manager = Manager()
+        self.collector = metrics.enable()
+
+    def tearDown(self):
+        from systemd import metrics
+        metrics.disable(self.collector)
+
+    def test_calls(self):
+        from systemd.exceptions import SystemdError
+        self.manager.list_units(lazy=False)
+        self.assertRaises(SystemdError, self.manager.get_unit, 'missing.service')
+        report = self.collector.report()
+        self.assertEqual(report['org.freedesktop.systemd1.Manager.ListUnits']['calls'], 1)
+        get_all = report['org.freedesktop.DBus.Properties.GetAll']
+        self.assertEqual(get_all['calls'], 5)
+        self.assertGreater(get_all['properties'], 5)
+        self.assertEqual(sum(get_all['histogram'].values()), 5)
+        self.assertEqual(report['org.freedesktop.systemd1.Manager.GetUnit']['errors'],
+                         {'org.freedesktop.systemd1.NoSuchUnit': 1})
+
+    def test_pipelined_calls(self):
+        names = [fake_systemd.unit_name(i) for i in range(5)]
+        self.manager.fetch_properties(names)
+        self.assertEqual(self.collector.report()['org.freedesktop.DBus.Properties.GetAll']['calls'], 5)
+
+    def test_hook(self):
+        from systemd import metrics
+        from systemd.exceptions import SystemdError
+        calls = []
+        metrics.add_hook(calls.append)
+        try:
+            # The fake systemd has no GetDefaultTarget.
+            self.assertRaises(SystemdError, self.manager.get_default_target)
+        finally:
+            metrics.remove_hook(calls.append)
+        self.assertEqual([(call.interface, call.method, call.error) for call in calls],
+                         [('org.freedesktop.systemd1.Manager', 'GetDefaultTarget',
+                           'org.freedesktop.DBus.Error.UnknownMethod')])
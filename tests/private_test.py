@@ -0,0 +1,78 @@
+from tests import fake_systemd
+
+
+class PrivateConnectionTest(fake_systemd.FakeSystemdTestCase):
+    """Calls and signals go over a peer-to-peer connection to the private socket, or the bus as a fallback."""
+
+    units = 4
+    private = True
+
+    def setUp(self):
+        self.service.reset_call_counts()
+
+    def pump(self, condition):
+        fake_systemd.pump(condition, timeout=5)
+
+    def test_private(self):
+        from systemd.bus import registry
+        from systemd.manager import Manager
+        lookups = registry.stats['owner_lookups']
+        registry.configure(address=self.service.address, mode='private',
+                           private_address=self.service.private_address)
+        self.assertTrue(registry.peer)
+        self.assertIsNone(registry.get_owner())
+        self.assertEqual(registry.stats['owner_lookups'], lookups)
+
+        manager = Manager()
+        unit = manager.get_unit(self.names[0])
+        self.assertEqual(unit.properties.Id, self.names[0])
+        self.assertEqual(manager.start_unit(self.names[1], 'fail').wait(timeout=5), 'done')
+        self.assertEqual(self.service.call_counts()['GetUnit'], 1)
+
+        # Signals arrive without a sender.
+        timestamp = unit.properties.ActiveEnterTimestamp
+        self.service.touch([self.names[0]])
+        self.pump(lambda: unit.properties.ActiveEnterTimestamp != timestamp)
+
+    def test_retry(self):
+        import os
+        from systemd.bus import registry
+        from systemd.manager import Manager
+        from systemd.signals import dispatcher
+        # Where the private socket will be once the fake is back, as after a daemon-reexec.
+        path = self.service.private_address[len('unix:path='):]
+        link = path + '-later'
+        fallbacks, retries = registry.stats['private_fallbacks'], registry.stats['private_retries']
+        registry.configure(address=self.service.address, mode='auto', private_address='unix:path=' + link)
+        self.addCleanup(os.remove, link)
+        manager = Manager()
+        self.assertFalse(registry.peer)
+        self.assertEqual(registry.stats['private_fallbacks'], fallbacks + 1)
+
+        os.symlink(path, link)
+        with manager.events(members=['Reconnected']) as events:
+            self.service.reexecute()
+            # Recovered from the new owner first, then moved over to the private socket.
+            self.pump(lambda: events.stats['received'] >= 2)
+            self.assertEqual([events.get(timeout=1).cause for i in range(2)], ['owner_changed', 'replaced'])
+        self.assertEqual(registry.stats['private_retries'], retries + 1)
+        self.assertTrue(registry.peer)
+        self.assertIs(dispatcher._connection, registry.get_connection())
+        self.assertEqual(manager.start_unit(self.names[2], 'fail').wait(timeout=5), 'done')
+
+    def test_fallback(self):
+        import dbus.exceptions
+        from systemd.bus import registry
+        from systemd.manager import Manager
+        missing = self.service.private_address + '-missing'
+        fallbacks = registry.stats['private_fallbacks']
+        registry.configure(address=self.service.address, mode='auto', private_address=missing)
+        self.assertFalse(registry.peer)
+        self.assertEqual(registry.stats['private_fallbacks'], fallbacks + 1)
+        self.assertEqual(Manager(signals=False).get_unit(self.names[0]).properties.Id, self.names[0])
+
+        registry.configure(address=self.service.address, mode='private', private_address=missing)
+        with self.assertRaises(dbus.exceptions.DBusException):
+            registry.get_connection()
+        with self.assertRaises(ValueError):
+            registry.configure(mode='direct')
@@ -0,0 +1,53 @@
+import copy
+import pickle
+import unittest
+
+from systemd.property import CompactProperty, Property, PropertyTable
+
+
+class CompactPropertyTest(unittest.TestCase):
+    """Attribute access on CompactProperty behaves like on Property."""
+
+    def setUp(self):
+        self.table = PropertyTable()
+        self.first = CompactProperty(self.table, {'Id': 'a.service', 'ActiveState': 'active'})
+        self.second = CompactProperty(self.table, {'Id': 'b.service'})
+
+    def test_get(self):
+        self.assertEqual(self.first.Id, 'a.service')
+        self.assertEqual(self.second.Id, 'b.service')
+        self.assertEqual(getattr(self.second, 'ActiveState', None), None)
+        self.assertRaises(AttributeError, getattr, self.first, 'Missing')
+
+    def test_set(self):
+        self.second.ActiveState = 'failed'
+        self.second.MainPID = 42
+        self.assertEqual((self.second.ActiveState, self.second.MainPID), ('failed', 42))
+        # The new name is shared through the table, not the value.
+        self.assertFalse(hasattr(self.first, 'MainPID'))
+        self.assertEqual(self.table.names, ['Id', 'ActiveState', 'MainPID'])
+
+    def test_delete(self):
+        del self.first.ActiveState
+        self.assertFalse(hasattr(self.first, 'ActiveState'))
+        self.assertRaises(AttributeError, delattr, self.first, 'ActiveState')
+        self.assertEqual(self.first._asdict(), {'Id': 'a.service'})
+
+    def test_no_dict(self):
+        self.assertNotIn('__dict__', CompactProperty.__slots__)
+        # vars() still works, on a copy.
+        vars(self.first)['Id'] = 'changed.service'
+        self.assertEqual(vars(self.first), {'Id': 'a.service', 'ActiveState': 'active'})
+
+    def test_copy_and_pickle(self):
+        for duplicate in (copy.copy(self.first), copy.deepcopy(self.first)):
+            self.assertEqual(duplicate._asdict(), self.first._asdict())
+            self.assertIs(duplicate._table, self.table)
+            duplicate.ActiveState = 'failed'
+            self.assertEqual(self.first.ActiveState, 'active')
+        unpickled = pickle.loads(pickle.dumps(self.first))
+        self.assertEqual(unpickled._asdict(), self.first._asdict())
+        self.assertEqual(unpickled.Id, 'a.service')
+
+    def test_isinstance(self):
+        self.assertIsInstance(self.first, Property)
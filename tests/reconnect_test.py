@@ -0,0 +1,76 @@
+from tests import fake_systemd
+
+
+class ReconnectTest(fake_systemd.FakeSystemdTestCase):
+    """Objects survive a re-exec of systemd and a lost connection, and are refreshed lazily afterwards."""
+
+    units = 4
+
+    def setUp(self):
+        from systemd.manager import Manager
+        self.manager = Manager()
+        self.unit = self.manager.get_unit(self.names[0])
+        self.unit.properties.ActiveState
+
+    def pump(self, condition):
+        fake_systemd.pump(condition, timeout=5)
+
+    def test_reexecute(self):
+        from systemd.signals import dispatcher
+        recoveries = dispatcher.stats['recoveries_owner_changed']
+        with self.manager.events(members=['Reconnected']) as events:
+            self.service.reexecute()
+            self.pump(lambda: dispatcher.stats['recoveries_owner_changed'] > recoveries)
+            self.assertEqual(events.get(timeout=1).cause, 'owner_changed')
+        self.assertIsNotNone(dispatcher.last_recovery)
+        # The new systemd was subscribed to again, and nothing was fetched until read.
+        counts = self.service.call_counts()
+        self.assertGreaterEqual(counts['Subscribe'], 1)
+        self.assertEqual(counts.get('GetAll', 0), 0)
+        self.assertEqual(self.unit.properties.ActiveState, 'inactive')
+        self.assertEqual(self.service.call_counts()['GetAll'], 1)
+        self.assertIs(self.manager.get_unit(self.names[0]), self.unit)
+
+    def test_connection_lost(self):
+        from systemd.bus import registry
+        from systemd.signals import dispatcher
+        lost, recoveries = registry.stats['connections_lost'], dispatcher.stats['recoveries_reconnected']
+        connection = registry.get_connection()
+        connection.close()
+        self.pump(lambda: dispatcher.stats['recoveries_reconnected'] > recoveries)
+        self.assertEqual(registry.stats['connections_lost'], lost + 1)
+        self.assertIsNot(registry.get_connection(), connection)
+        self.assertEqual(self.unit.properties.ActiveState, 'inactive')
+
+        # Signals arrive over the new connection.
+        timestamp = self.unit.properties.ActiveEnterTimestamp
+        self.service.touch([self.names[0]])
+        self.pump(lambda: self.unit.properties.ActiveEnterTimestamp != timestamp)
+
+    def test_replaced(self):
+        from systemd.bus import registry
+        from systemd.signals import dispatcher
+        replacements = dispatcher.stats['recoveries_replaced']
+        with self.manager.events(members=['Reconnected']) as events:
+            registry.configure(address=self.service.address)
+            # Moved over right away, without waiting for the old connection to report its disconnection.
+            self.assertIs(dispatcher._connection, registry.get_connection())
+            self.assertEqual(dispatcher.stats['recoveries_replaced'], replacements + 1)
+            self.assertEqual(events.get(timeout=1).cause, 'replaced')
+        # The Manager subscribed again on the new connection, so job results still arrive.
+        job = self.manager.start_unit(self.names[1], 'replace')
+        self.assertEqual(job.wait(timeout=5), 'done')
+        self.assertEqual(self.unit.properties.ActiveState, 'inactive')
+
+    def test_tracker_resubscribed(self):
+        from systemd.bus import registry
+        from systemd.job import tracker
+        tracker.start()
+        self.assertTrue(tracker.started())
+        self.service.reset_call_counts()
+        registry.configure(address=self.service.address)
+        # The tracker subscribed again on the new connection, without waiting for a JobTracker.start().
+        self.assertTrue(tracker.started())
+        self.assertGreaterEqual(self.service.call_counts()['Subscribe'], 1)
+        job = self.manager.start_unit(self.names[2], 'replace')
+        self.assertEqual(job.wait(timeout=5), 'done')
@@ -0,0 +1,55 @@
+from tests import fake_systemd
+
+
+class RecordsTest(fake_systemd.FakeSystemdTestCase):
+    """UnitRecord/JobRecord listings carry native values, and materialize() into objects without extra calls."""
+
+    units = 5
+    jobs = 1
+
+    def setUp(self):
+        from systemd.manager import Manager
+        self.manager = Manager()
+        self.service.reset_call_counts()
+
+    def test_unit_records(self):
+        records = dict((record.name, record) for record in self.manager.list_units(records=True))
+        self.assertEqual(self.service.call_counts(), {'ListUnits': 1})
+        self.assertEqual(sorted(records), self.names)
+
+        # The first unit has the job queued by the fake.
+        record = records[self.names[0]]
+        self.assertEqual(record, (
+            self.names[0], 'Fake unit %s' % self.names[0], 'loaded', 'inactive', 'dead', '',
+            fake_systemd.unit_path(self.names[0]), 1, 'start', '/org/freedesktop/systemd1/job/1'))
+        self.assertEqual([type(value) for value in record], [str] * 7 + [int, str, str])
+        self.assertEqual(records[self.names[1]][7:], (0, '', '/'))
+
+        self.service.reset_call_counts()
+        unit = record.materialize(lazy=True, manager=self.manager)
+        self.assertEqual(self.service.call_counts(), {})
+        self.assertEqual(unit.properties.ActiveState, 'inactive')
+        self.assertEqual(self.service.call_counts(), {'GetAll': 1})
+        self.assertIs(record.materialize(manager=self.manager), unit)
+
+        # Loaded right away otherwise, and read without any call afterwards.
+        self.service.reset_call_counts()
+        unit = records[self.names[1]].materialize(watch=False)
+        self.assertEqual(self.service.call_counts(), {'GetAll': 1})
+        self.assertEqual(unit.properties.Id, self.names[1])
+        self.assertEqual(self.service.call_counts(), {'GetAll': 1})
+
+    def test_job_records(self):
+        records = self.manager.list_jobs(records=True)
+        self.assertEqual(self.service.call_counts(), {'ListJobs': 1})
+        self.assertEqual(records, [(1, self.names[0], 'start', 'waiting', '/org/freedesktop/systemd1/job/1',
+                                    fake_systemd.unit_path(self.names[0]))])
+        record = records[0]
+        self.assertEqual((record.id, record.unit_name, record.job_type), (1, self.names[0], 'start'))
+        self.assertEqual([type(value) for value in record], [int] + [str] * 5)
+
+        self.service.reset_call_counts()
+        job = record.materialize(lazy=True, manager=self.manager)
+        self.assertEqual(self.service.call_counts(), {})
+        self.assertEqual(job.properties.JobType, 'start')
+        self.assertEqual(self.service.call_counts(), {'GetAll': 1})
@@ -0,0 +1,59 @@
+from tests import fake_systemd
+
+
+class SetUnitPropertiesTest(fake_systemd.FakeSystemdTestCase):
+    """Properties of many units are set with pipelined calls, skipping those that would not change."""
+
+    units = 10
+
+    def setUp(self):
+        from systemd.manager import Manager
+        self.manager = Manager()
+        self.units = self.manager.list_units(watch=True, lazy=False)
+        self.service.reset_call_counts()
+
+    def test_set_unit_properties(self):
+        from systemd.exceptions import SystemdError
+        self.manager.set_unit_properties(self.names[0], True, {'MemoryMax': 2 ** 20})
+        self.assertEqual(self.service.call_counts()['SetUnitProperties'], 1)
+        with self.assertRaises(SystemdError):
+            self.manager.set_unit_properties('missing.service', True, {'MemoryMax': 2 ** 20})
+
+    def test_skip_unchanged(self):
+        updates = dict((name, {'MemoryMax': 2 ** 30, 'CPUQuota': '50%', 'TasksMax': None}) for name in self.names)
+        results = self.manager.set_units_properties(updates, runtime=True, max_in_flight=4)
+        self.assertEqual(self.service.call_counts()['SetUnitProperties'], 10)
+        # TasksMax is already infinite.
+        self.assertEqual(results[self.names[0]], ['MemoryMax', 'CPUQuotaPerSecUSec'])
+        self.assertEqual(self.manager.property_write_stats['skipped'], 10)
+
+        # The cache was updated with what was written: nothing left to send.
+        results = self.manager.set_units_properties(updates, runtime=True)
+        self.assertEqual(self.service.call_counts()['SetUnitProperties'], 10)
+        self.assertEqual(results[self.names[0]], [])
+
+        updates = {self.names[3]: {'MemoryMax': 2 ** 31}, self.names[4]: {'MemoryMax': 2 ** 30}}
+        results = self.manager.set_units_properties(updates, runtime=True)
+        self.assertEqual(results, {self.names[3]: ['MemoryMax'], self.names[4]: []})
+        self.assertEqual(self.units[3].properties.MemoryMax, 2 ** 31)
+
+    def test_errors(self):
+        from systemd.exceptions import SystemdError
+        results = self.manager.set_units_properties({'missing.service': {'MemoryMax': 1}, self.names[5]: {'Nice': 1}})
+        self.assertIsInstance(results['missing.service'], SystemdError)
+        self.assertEqual(results[self.names[5]], ['Nice'])
+        with self.assertRaises(ValueError):
+            self.manager.set_units_properties({self.names[5]: {'Unknown': 1}})
+
+    def test_lazy_properties_not_loaded(self):
+        from systemd.manager import Manager
+        from systemd.unit import unit_path
+        manager = Manager(signals=False)
+        units = manager.list_units(watch=False, lazy='each')
+        unit = [unit for unit in units if unit._path == unit_path(self.names[6])][0]
+        unit.properties.MainPID
+        self.service.reset_call_counts()
+        # Only the properties already fetched are updated: the others would cost a Get each.
+        manager.set_units_properties({self.names[6]: {'MemoryMax': 2 ** 20}}, runtime=True)
+        self.assertEqual(self.service.call_counts(), {'SetUnitProperties': 1})
+        self.assertNotIn('MemoryMax', vars(unit.properties))
@@ -0,0 +1,79 @@
+import datetime
+import unittest
+
+from tests import fake_systemd
+
+
+@unittest.skipIf(fake_systemd.dbus is None, 'dbus-python is required')
+class EncodeTest(unittest.TestCase):
+    """Unit properties are sent with the D-Bus type systemd expects."""
+
+    def test_types(self):
+        import dbus
+        from systemd.encode import encode_value, UINT64_MAX
+        self.assertIsInstance(encode_value('MemoryMax', 512)[1], dbus.UInt64)
+        self.assertEqual(encode_value('TasksMax', None), ('TasksMax', UINT64_MAX))
+        self.assertEqual(encode_value('RuntimeMaxUSec', datetime.timedelta(seconds=2))[1], 2000000)
+        self.assertIsInstance(encode_value('Nice', 5)[1], dbus.Int32)
+        self.assertIsInstance(encode_value('RemainAfterExit', True)[1], dbus.Boolean)
+        self.assertEqual(encode_value('Environment', ('A=1', 'B=2'))[1].signature, 's')
+        self.assertIsInstance(encode_value('Custom', dbus.Int64(-1))[1], dbus.Int64)
+        with self.assertRaises(ValueError):
+            encode_value('Custom', 1)
+
+    def test_cpu_quota(self):
+        from systemd.encode import encode_value
+        self.assertEqual(encode_value('CPUQuota', '150%'), ('CPUQuotaPerSecUSec', 1500000))
+        self.assertEqual(encode_value('CPUQuota', 20), ('CPUQuotaPerSecUSec', 200000))
+
+    def test_commands(self):
+        from systemd.encode import encode_value
+        name, value = encode_value('ExecStart', ['/bin/sleep', '1'])
+        self.assertEqual(value.signature, '(sasb)')
+        self.assertEqual(value, [('/bin/sleep', ['/bin/sleep', '1'], False)])
+        name, value = encode_value('ExecStartPre', [('/bin/true', ['true'], True), ['/bin/false']])
+        self.assertEqual(value, [('/bin/true', ['true'], True), ('/bin/false', ['/bin/false'], False)])
+
+    def test_complete_types(self):
+        from systemd.encode import complete_types
+        self.assertEqual(complete_types('ssa(sv)a(sa(sv))'), ['s', 's', 'a(sv)', 'a(sa(sv))'])
+        self.assertEqual(complete_types('a{sv}aay'), ['a{sv}', 'aay'])
+
+
+class TransientUnitTest(fake_systemd.FakeSystemdTestCase):
+    """Transient units are created with typed properties, one at a time or with pipelined launches."""
+
+    units = 1
+
+    def setUp(self):
+        from systemd.manager import Manager
+        self.manager = Manager()
+        self.service.reset_call_counts()
+
+    def test_start_transient_unit(self):
+        import dbus
+        from systemd.bus import registry, PROPERTIES_INTERFACE
+        from systemd.exceptions import SystemdError
+        from systemd.unit import unit_path
+        properties = {'Description': 'backup', 'ExecStart': ['/bin/backup'], 'MemoryMax': 2 ** 20}
+        job = self.manager.start_transient_unit('run-backup.service', 'fail', properties)
+        self.assertEqual(job.wait(timeout=5), 'done')
+        interface = registry.get_interface(unit_path('run-backup.service'), PROPERTIES_INTERFACE)
+        self.assertIsInstance(interface.Get('org.freedesktop.systemd1.Service', 'MemoryMax'), dbus.UInt64)
+        with self.assertRaises(SystemdError):
+            self.manager.start_transient_unit('run-backup.service', 'fail', properties)
+
+    def test_launcher(self):
+        launcher = self.manager.transient_launcher(max_in_flight=8)
+        finished = []
+        for i in range(40):
+            launcher.launch('batch-%d.service' % i, {'ExecStart': ['/bin/true'], 'TasksMax': 16},
+                            callback=finished.append)
+        launcher.launch('batch-0.service', {'ExecStart': ['/bin/true']}, callback=finished.append)
+        self.assertEqual(launcher.wait(timeout=5), [])
+        self.assertEqual(len(finished), 41)
+        self.assertEqual(launcher.stats['done'], 40)
+        self.assertEqual(launcher.stats['call_errors'], 1)
+        self.assertEqual(len(launcher.latencies()), 41)
+        self.assertTrue(all(launch.duration >= launch.latency for launch in finished if launch.result))
+        self.assertEqual(self.service.call_counts()['StartTransientUnit'], 41)
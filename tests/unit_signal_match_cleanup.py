@@ -1,5 +1,5 @@
 """
-Any arrangement other than list_units(watch=True) works well.
+Every arrangement works, list_units(watch=True) too: watched units share a single match rule.
 """
 
 import systemd.manager
@@ -18,3 +18,7 @@ for unit in mgr.iter_units(watch=False):
 print('C' * 20)
 for unit in mgr.list_units(watch=False):
     print('C {}'.format(unit))
+
+print('D' * 20)
+for unit in mgr.list_units(watch=True):
+    print('D {}'.format(unit))
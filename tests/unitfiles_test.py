@@ -0,0 +1,72 @@
+import os
+import shutil
+import tempfile
+
+from tests import fake_systemd
+
+
+class UnitFileCacheTest(fake_systemd.FakeSystemdTestCase):
+    """Unit file listings and states served from the cache until a watched directory changes."""
+
+    units = 5
+
+    def setUp(self):
+        from systemd.unitfiles import UnitFileCache
+        self.directory = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.directory, 'multi-user.target.wants'))
+        self.cache = UnitFileCache(paths=[self.directory])
+        self.service.reset_call_counts()
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.directory)
+
+    def test_hits(self):
+        name = fake_systemd.unit_name(0)
+        self.assertEqual(len(self.cache.list_unit_files()), 5)
+        self.assertEqual(len(self.cache.list_unit_files()), 5)
+        # The listing also answers state lookups.
+        self.assertEqual(self.cache.get_unit_file_state(name), 'enabled')
+        self.assertEqual(self.service.call_counts().get('ListUnitFiles'), 1)
+        self.assertEqual(self.service.call_counts().get('GetUnitFileState'), None)
+        self.assertEqual(self.cache.stats['hits'], 2)
+        self.assertAlmostEqual(self.cache.hit_rate(), 2.0 / 3)
+
+    def test_inotify_invalidation(self):
+        if self.cache._inotify is None:
+            self.skipTest('inotify is not available')
+        self.cache.list_unit_files()
+        # Enabling a unit creates a symlink in a .wants directory.
+        os.symlink('/dev/null', os.path.join(self.directory, 'multi-user.target.wants', 'x.service'))
+        self.cache.list_unit_files()
+        self.assertEqual(self.service.call_counts().get('ListUnitFiles'), 2)
+        self.assertEqual(self.cache.stats['invalidations_inotify'], 1)
+
+    def test_explicit_invalidation(self):
+        self.cache.get_unit_file_state(fake_systemd.unit_name(1))
+        self.assertGreaterEqual(self.cache.staleness(), 0)
+        self.cache.invalidate()
+        self.assertEqual(self.cache.staleness(), 0)
+        self.cache.get_unit_file_state(fake_systemd.unit_name(1))
+        self.assertEqual(self.service.call_counts().get('GetUnitFileState'), 2)
+
+    def test_same_values_uncached(self):
+        from systemd.manager import Manager
+        manager = Manager(signals=False)
+        files = manager.list_unit_files()
+        self.assertEqual(files, self.cache.list_unit_files())
+        self.assertEqual(set(type(item) for item in files), set([tuple]))
+        self.assertEqual(set(type(value) for item in files for value in item), set([str]))
+        state = manager.get_unit_file_state(fake_systemd.unit_name(0))
+        self.assertEqual((state, type(state)), ('enabled', str))
+
+    def test_without_signals(self):
+        from systemd.manager import Manager
+        from systemd.signals import dispatcher
+        listeners = dict((member, len(refs)) for member, refs in dispatcher._listeners.items())
+        manager = Manager(cache_unit_files=True, signals=False)
+        self.assertEqual(dict((member, len(refs)) for member, refs in dispatcher._listeners.items()), listeners)
+        manager.list_unit_files()
+        manager.list_unit_files()
+        self.assertEqual(self.service.call_counts().get('ListUnitFiles'), 1)
+        manager.unit_file_cache.close()
@@ -0,0 +1,61 @@
+import unittest
+
+from tests import fake_systemd
+
+
+@unittest.skipIf(fake_systemd.dbus is None, 'dbus-python is required')
+class UnitClassTest(unittest.TestCase):
+    """The class of a unit is chosen from the suffix of its name or path."""
+
+    def test_unit_class(self):
+        from systemd.unit import Unit, unit_path
+        from systemd.unittypes import unit_class
+        from systemd.service import Service
+        from systemd.target import Target
+        self.assertIs(unit_class('sshd.service'), Service)
+        self.assertIs(unit_class('multi-user.target'), Target)
+        self.assertIs(unit_class(path=unit_path('getty@tty1.service')), Service)
+        self.assertIs(unit_class('unknown.type'), Unit)
+
+    def test_unit_name(self):
+        from systemd.unit import unit_name, unit_path
+        for name in ('sshd.service', 'getty@tty1.service', '-.mount', 'dev-sda1.device', '0day.timer'):
+            self.assertEqual(unit_name(unit_path(name)), name)
+
+
+class TypedUnitTest(fake_systemd.FakeSystemdTestCase):
+    """Units of a known type hold the properties of both interfaces, fetched with one call."""
+
+    units = 3
+
+    def setUp(self):
+        from systemd.manager import Manager
+        self.manager = Manager()
+        self.service.reset_call_counts()
+
+    def test_one_get_all(self):
+        from systemd.service import Service
+        unit = self.manager.get_unit(fake_systemd.unit_name(0))
+        self.assertIsInstance(unit, Service)
+        self.assertEqual(unit.properties.ActiveState, 'inactive')
+        self.assertEqual(unit.properties.MainPID, 0)
+        self.assertEqual(self.service.call_counts()['GetAll'], 1)
+
+    def test_list_units(self):
+        from systemd.service import Service
+        units = self.manager.list_units(watch=False, lazy=False)
+        self.assertTrue(all(isinstance(unit, Service) for unit in units))
+        self.assertEqual(self.service.call_counts()['GetAll'], len(units))
+
+    def test_unit_methods(self):
+        unit = self.manager.get_unit(fake_systemd.unit_name(1))
+        job = unit.start('replace')
+        self.assertEqual(job.wait(timeout=5), 'done')
+
+    def test_lazy_each(self):
+        from systemd.service import Service
+        unit = Service(fake_systemd.unit_path(fake_systemd.unit_name(2)), watch=False, lazy='each')
+        self.assertEqual(unit.properties.Type, 'simple')
+        self.assertEqual(unit.properties.SubState, 'dead')
+        with self.assertRaises(AttributeError):
+            unit.properties.NoSuchProperty